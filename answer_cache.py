@@ -0,0 +1,179 @@
+"""
+Answer Cache Module
+Semantic cache for retrieval-augmented answers. A new question whose
+embedding is close enough to a previously answered one gets the stored answer
+back without retrieval or a Claude call, as long as the index it was answered
+from is unchanged and the entry is younger than the TTL.
+
+Entries are (question embedding, answer), kept per namespace (log analysis,
+training suggestions) in SQLite, so all API workers share them. Retrieved
+chunk ids are not stored: an answer is only served for the index version it
+was retrieved from, and any change to the index bumps that version.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+from metrics import record_cache
+
+# Configuration
+ANSWER_CACHE_DB = "answer_cache.db"
+SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))  # cosine similarity of the questions
+TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL", "3600"))
+MAX_ENTRIES = 2000  # per namespace; least recently used entries are evicted beyond this
+
+# Namespaces
+LOG_ANALYSIS = "log_analysis"
+TRAINING = "training"
+
+
+class AnswerCache:
+    """SQLite-backed semantic cache with an in-memory copy of the embeddings."""
+
+    def __init__(
+        self,
+        encoder_getter: Callable,
+        db_path: str = ANSWER_CACHE_DB,
+        threshold: float = SIMILARITY_THRESHOLD,
+        ttl: int = TTL_SECONDS,
+        max_entries: int = MAX_ENTRIES,
+    ):
+        self.encoder_getter = encoder_getter
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._matrices = {}  # (namespace, index version) -> (entry ids, creation times, embedding matrix)
+        self._data_version = None
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS answers (
+                    id INTEGER PRIMARY KEY,
+                    namespace TEXT,
+                    index_version TEXT,
+                    question TEXT,
+                    embedding BLOB,
+                    answer TEXT,
+                    created_at REAL,
+                    last_used REAL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_ns ON answers(namespace, index_version)")
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = self.encoder_getter().encode([question], normalize_embeddings=True)
+        return np.asarray(vector, dtype=np.float32)[0]
+
+    def _candidates(self, namespace: str, index_version: str):
+        # Other workers write to the same database; PRAGMA data_version changes when they commit
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._matrices.clear()
+            self._data_version = data_version
+
+        key = (namespace, index_version)
+        if key not in self._matrices:
+            rows = self._conn.execute(
+                "SELECT id, created_at, embedding FROM answers WHERE namespace = ? AND index_version = ? AND created_at > ?",
+                (namespace, index_version, time.time() - self.ttl),
+            ).fetchall()
+            ids = [row[0] for row in rows]
+            created = np.array([row[1] for row in rows], dtype=np.float64)
+            matrix = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows]) if rows else None
+            self._matrices[key] = (ids, created, matrix)
+        return self._matrices[key]
+
+    def lookup(self, namespace: str, vector: np.ndarray, index_version: str) -> Optional[str]:
+        """Return the answer of the most similar fresh question, if it is similar enough."""
+        with self._lock:
+            ids, created, matrix = self._candidates(namespace, index_version)
+            if matrix is None:
+                return None
+            scores = matrix @ vector
+            # The matrix outlives the TTL of its rows; expired ones must not shadow a fresh match
+            scores[created <= time.time() - self.ttl] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+
+            row = self._conn.execute("SELECT question, answer FROM answers WHERE id = ?", (ids[best],)).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), ids[best]))
+        print(f"[INFO] Answer cache hit ({namespace}, similarity {scores[best]:.3f} to {row[0]!r})")
+        return row[1]
+
+    def put(self, namespace: str, question: str, vector: np.ndarray, index_version: str, answer: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT INTO answers (namespace, index_version, question, embedding, answer, created_at, last_used)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (namespace, index_version, question, vector.astype(np.float32).tobytes(), answer, now, now),
+            )
+            # Entries for older index versions or past their TTL can never be served again
+            self._conn.execute(
+                "DELETE FROM answers WHERE namespace = ? AND (index_version != ? OR created_at <= ?)",
+                (namespace, index_version, now - self.ttl),
+            )
+            self._conn.execute(
+                """DELETE FROM answers WHERE id IN (
+                       SELECT id FROM answers WHERE namespace = ? ORDER BY last_used DESC LIMIT -1 OFFSET ?)""",
+                (namespace, self.max_entries),
+            )
+            self._matrices.pop((namespace, index_version), None)
+
+    def answer(
+        self,
+        namespace: str,
+        question: str,
+        index_version: str,
+        produce: Callable[[], str],
+    ) -> str:
+        """
+        Return a cached answer for a near-duplicate question or produce a new one.
+
+        Args:
+            namespace: Which kind of answer this is (LOG_ANALYSIS, TRAINING)
+            question: The user's question
+            index_version: Version of the index the answer is retrieved from;
+                entries from other versions are never returned, so this must
+                change whenever the indexed content does
+            produce: Runs retrieval and the LLM call, returns the answer
+
+        Returns:
+            The answer text
+        """
+        vector = self._embed(question)
+        cached = self.lookup(namespace, vector, index_version)
+        record_cache(f"answer_{namespace}", cached is not None)
+        if cached is not None:
+            return cached
+
+        answer = produce()
+        # Don't remember failures, so the next request retries the LLM
+        if not answer.startswith("Error"):
+            self.put(namespace, question, vector, index_version, answer)
+        return answer
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """Return the process-wide answer cache, creating it on first use."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                from training_store import get_encoder
+                _default_cache = AnswerCache(get_encoder)
+    return _default_cache
@@ -0,0 +1,103 @@
+"""
+Encode throughput and accuracy of the MiniLM inference backends.
+
+Loads each backend from encoder_backend and checks its embeddings against
+the torch reference on synthetic log chunks and queries. It measures batch
+encode throughput (ingest) and single-sentence latency (retrieval and
+training queries), then saves the results as JSON.
+
+Usage:
+    python benchmarks/encoder_benchmark.py
+    python benchmarks/encoder_benchmark.py --backends torch onnx-int8 --sentences 5000 --threads 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic  # noqa: E402
+from run_benchmarks import RESULTS_DIR, git_sha, percentile  # noqa: E402
+
+MIN_COSINE = 0.99  # below this, re-embed existing indexes before switching backends
+
+
+def corpus(count: int, seed: int) -> list:
+    text = synthetic.generate_log(lines=count * 5, seed=seed)
+    chunks = [text[i:i + 500] for i in range(0, len(text), 450)][:count]
+    return chunks + synthetic.generate_queries(max(count // 10, 10), "incident", seed=seed)
+
+
+def throughput(model, sentences: list, batch_size: int) -> float:
+    model.encode(sentences[:batch_size], batch_size=batch_size)  # warm-up
+    started = time.perf_counter()
+    model.encode(sentences, batch_size=batch_size, normalize_embeddings=True)
+    return len(sentences) / (time.perf_counter() - started)
+
+
+def single_latencies(model, queries: list) -> list:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        model.encode([query], normalize_embeddings=True)
+        latencies.append(time.perf_counter() - started)
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MiniLM backend throughput and accuracy")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 16, 64])
+    parser.add_argument("--threads", type=int, help="torch/ONNX Runtime intra-op threads (default: all cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/encoder-<sha>.json)")
+    args = parser.parse_args()
+
+    if args.threads:
+        os.environ["OMP_NUM_THREADS"] = str(args.threads)
+        import torch
+        torch.set_num_threads(args.threads)
+
+    from encoder_backend import compare_backends, load_encoder
+
+    sentences = corpus(args.sentences, args.seed)
+    queries = synthetic.generate_queries(200, "log", seed=args.seed + 1)
+    reference = load_encoder("torch")
+
+    rows = []
+    for backend in args.backends:
+        model = reference if backend == "torch" else load_encoder(backend)
+        row = {"backend": backend}
+        row.update(compare_backends(reference, model, sentences[:500]))
+        row["matches_torch"] = row["min_cosine"] >= MIN_COSINE
+        for batch_size in args.batch_sizes:
+            row[f"sentences_per_sec_b{batch_size}"] = round(throughput(model, sentences, batch_size), 1)
+        latencies = single_latencies(model, queries)
+        row["query_p50_ms"] = round(1000 * percentile(latencies, 50), 2)
+        row["query_p99_ms"] = round(1000 * percentile(latencies, 99), 2)
+        rows.append(row)
+        print(json.dumps(row, indent=2))
+
+    result = {
+        "git_sha": git_sha(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "results": rows,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"encoder-{result['git_sha']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"[INFO] Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Fake Claude CLI for offline benchmarks.
+
+Accepts the same invocation as the real CLI (``claude chat`` with the prompt on
+stdin), sleeps for a configurable latency and prints a canned answer that the
+backend can parse.
+
+Environment:
+    FAKE_CLAUDE_LATENCY   Mean latency in seconds (default 0.5)
+    FAKE_CLAUDE_JITTER    Uniform jitter in seconds added on top (default 0.1)
+    FAKE_CLAUDE_OUTPUT    Fixed output, overrides the built-in answers
+    FAKE_CLAUDE_SEED      Random seed for reproducible latencies
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+
+def answer(prompt: str) -> str:
+    if os.getenv("FAKE_CLAUDE_OUTPUT"):
+        return os.environ["FAKE_CLAUDE_OUTPUT"]
+    if "tool-calling assistant" in prompt:
+        return json.dumps({"tool_calls": [], "answer": f"Fake answer for a {len(prompt)} character prompt."})
+    if "Classify the user query" in prompt:
+        return "general_chat"
+    if "Golang code reviewer" in prompt:
+        return "## Critical Issues (must fix)\n- **main.go:1** - Fake review comment."
+    return f"Fake answer for a {len(prompt)} character prompt."
+
+
+def main():
+    prompt = sys.stdin.read()
+    seed = os.getenv("FAKE_CLAUDE_SEED")
+    rng = random.Random(f"{seed}:{prompt}" if seed is not None else None)
+    latency = float(os.getenv("FAKE_CLAUDE_LATENCY", "0.5"))
+    jitter = float(os.getenv("FAKE_CLAUDE_JITTER", "0.1"))
+    time.sleep(max(latency + rng.uniform(0, jitter), 0))
+    print(answer(prompt))
+
+
+if __name__ == "__main__":
+    main()
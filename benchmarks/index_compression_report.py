@@ -0,0 +1,138 @@
+"""
+Recall-vs-memory report for the compressed index types in vector_compression.
+
+For each index type it measures the in-memory size per vector, recall@k against
+exact float32 search (with and without the exact re-ranking step) and query
+latency. It then projects RAM for a target number of log chunks.
+
+Usage:
+    python benchmarks/index_compression_report.py                     # synthetic clustered vectors
+    python benchmarks/index_compression_report.py --source minilm --vectors 50000
+    python benchmarks/index_compression_report.py --project 50000000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic  # noqa: E402
+import vector_compression  # noqa: E402
+from run_benchmarks import RESULTS_DIR, git_sha  # noqa: E402
+
+DIMENSION = 384  # all-MiniLM-L6-v2
+
+
+def _normalize(vectors):
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def synthetic_vectors(count: int, queries: int, seed: int):
+    """Clustered unit vectors, roughly shaped like sentence embeddings of similar log lines."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(count // 100, 10), DIMENSION))
+    points = centers[rng.integers(len(centers), size=count + queries)]
+    points = points + 0.35 * rng.standard_normal(points.shape)
+    points = _normalize(points)
+    return points[:count], points[count:]
+
+
+def minilm_vectors(count: int, queries: int, seed: int):
+    """MiniLM embeddings of synthetic log chunks (slow: runs the real encoder)."""
+    from training_store import get_model
+
+    text = synthetic.generate_log(lines=count * 5, seed=seed)
+    chunks = [text[i:i + 500] for i in range(0, len(text), 450)][:count]
+    questions = synthetic.generate_queries(queries, "log", seed=seed)
+    model = get_model()
+    vectors = np.asarray(model.encode(chunks, normalize_embeddings=True, batch_size=128), dtype=np.float32)
+    query_vectors = np.asarray(model.encode(questions, normalize_embeddings=True), dtype=np.float32)
+    return vectors, query_vectors
+
+
+def recall(results, truth, k):
+    hits = sum(len(set(row[:k].tolist()) & set(gold[:k].tolist())) for row, gold in zip(results, truth))
+    return hits / (k * len(truth))
+
+
+def measure(kind, vectors, queries, truth, k):
+    import faiss
+
+    started = time.perf_counter()
+    index = vector_compression.build_index(vectors, kind)
+    build_seconds = time.perf_counter() - started
+    bytes_per_vector = len(faiss.serialize_index(index)) / len(vectors)
+
+    started = time.perf_counter()
+    approximate = vector_compression.search(index, queries, k)
+    search_ms = 1000 * (time.perf_counter() - started) / len(queries)
+
+    row = {
+        "index_type": kind,
+        "bytes_per_vector": round(bytes_per_vector, 1),
+        "build_seconds": round(build_seconds, 2),
+        "recall": round(recall(approximate, truth, k), 4),
+        "query_ms": round(search_ms, 3),
+    }
+    if not vector_compression.is_exact(index):
+        started = time.perf_counter()
+        reranked = vector_compression.search(index, queries, k, exact=vectors)
+        row["recall_reranked"] = round(recall(reranked, truth, k), 4)
+        row["query_ms_reranked"] = round(1000 * (time.perf_counter() - started) / len(queries), 3)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs memory for compressed embedding indexes")
+    parser.add_argument("--source", choices=["synthetic", "minilm"], default="synthetic")
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20, help="results per query (RETRIEVAL_CANDIDATES)")
+    parser.add_argument("--project", type=float, default=30e6, help="chunk count for the RAM projection")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/index-compression-<sha>.json)")
+    args = parser.parse_args()
+
+    load = synthetic_vectors if args.source == "synthetic" else minilm_vectors
+    vectors, queries = load(args.vectors, args.queries, args.seed)
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+
+    rows = []
+    for kind in vector_compression.INDEX_TYPES:
+        row = measure(kind, vectors, queries, truth, args.k)
+        row["projected_ram_gb"] = round(row["bytes_per_vector"] * args.project / 1e9, 2)
+        rows.append(row)
+
+    print(f"\n{len(vectors)} {args.source} vectors, {len(queries)} queries, recall@{args.k}, "
+          f"RAM projected for {args.project:,.0f} chunks (re-ranking vectors stay on disk: "
+          f"{4 * DIMENSION * args.project / 1e9:.1f} GB)\n")
+    print(f"{'type':<8}{'B/vector':>10}{'RAM GB':>10}{'recall':>9}{'reranked':>10}{'ms/query':>10}{'reranked':>10}")
+    for row in rows:
+        print(f"{row['index_type']:<8}{row['bytes_per_vector']:>10}{row['projected_ram_gb']:>10}{row['recall']:>9}"
+              f"{row.get('recall_reranked', '-'):>10}{row['query_ms']:>10}{row.get('query_ms_reranked', '-'):>10}")
+
+    result = {
+        "git_sha": git_sha(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": vars(args) | {"rerank_factor": vector_compression.RERANK_FACTOR,
+                                "nprobe": vector_compression.IVF_NPROBE,
+                                "pq_subvectors": vector_compression.PQ_SUBVECTORS},
+        "results": rows,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"index-compression-{result['git_sha']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\n[INFO] Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
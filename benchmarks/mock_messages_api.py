@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Local mock of the Anthropic Messages API with prompt caching, for offline checks.
+
+Serves ``POST /v1/messages`` in the API's response format. The prefix up to
+the last ``cache_control`` breakpoint (tools, then system, then messages) is
+cached for ``--ttl`` seconds once it reaches ``--min-cacheable-tokens``, and
+``usage`` reports cache writes, cache reads and uncached input like the real
+API. Latency grows with the uncached input, so caching shows up in timings
+too. Answers are canned: the first tool is called when tools are given.
+
+Usage:
+    python benchmarks/mock_messages_api.py --port 8765
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=mock LLM_BACKENDS=api uvicorn main_fastapi:app
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4
+BASE_LATENCY = 0.05  # seconds per request
+SECONDS_PER_UNCACHED_TOKEN = 0.0002  # prefill cost of input that isn't read from the cache
+
+
+def count_tokens(value) -> int:
+    return max(1, len(json.dumps(value, sort_keys=True)) // CHARS_PER_TOKEN)
+
+
+def _segments(body: dict) -> list:
+    """The cacheable units of a request in cache order, each with its cache_control flag."""
+    segments = [(tool, "cache_control" in tool) for tool in body.get("tools", [])]
+    system = body.get("system")
+    if isinstance(system, str):
+        segments.append((system, False))
+    elif system:
+        segments.extend((block, "cache_control" in block) for block in system)
+    for message in body.get("messages", []):
+        content = message["content"]
+        if isinstance(content, str):
+            segments.append(({"role": message["role"], "text": content}, False))
+        else:
+            segments.extend(({"role": message["role"], **block}, "cache_control" in block) for block in content)
+    return segments
+
+
+class PromptCache:
+    def __init__(self, min_tokens: int, ttl: float):
+        self.min_tokens = min_tokens
+        self.ttl = ttl
+        self._entries = {}  # prefix hash -> expires at
+        self._lock = threading.Lock()
+
+    def usage(self, body: dict) -> dict:
+        segments = _segments(body)
+        breakpoint_at = max((i for i, (_, marked) in enumerate(segments) if marked), default=-1)
+        prefix = [segment for segment, _ in segments[:breakpoint_at + 1]]
+        rest = [segment for segment, _ in segments[breakpoint_at + 1:]]
+        prefix_tokens = count_tokens(prefix) if prefix else 0
+        rest_tokens = count_tokens(rest) if rest else 0
+
+        usage = {"input_tokens": rest_tokens, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+        if prefix_tokens < self.min_tokens:
+            # Too short to cache: the real API silently processes it uncached
+            usage["input_tokens"] += prefix_tokens
+            return usage
+
+        key = hashlib.sha256(json.dumps([body.get("model"), prefix], sort_keys=True).encode("utf-8")).hexdigest()
+        now = time.monotonic()
+        with self._lock:
+            if self._entries.get(key, 0) > now:
+                usage["cache_read_input_tokens"] = prefix_tokens
+            else:
+                usage["cache_creation_input_tokens"] = prefix_tokens
+            self._entries[key] = now + self.ttl  # reads refresh the TTL
+        return usage
+
+
+def make_handler(cache: PromptCache, log: list):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.split("?")[0] != "/v1/messages":
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            usage = cache.usage(body)
+            time.sleep(BASE_LATENCY + SECONDS_PER_UNCACHED_TOKEN * (usage["input_tokens"] + usage["cache_creation_input_tokens"]))
+
+            if body.get("tools"):
+                content = [{"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:12]}", "name": body["tools"][0]["name"], "input": {}}]
+                stop_reason = "tool_use"
+            else:
+                content = [{"type": "text", "text": "Mock answer."}]
+                stop_reason = "end_turn"
+            usage["output_tokens"] = 10
+            log.append(usage)
+
+            payload = json.dumps({
+                "id": f"msg_{uuid.uuid4().hex[:12]}",
+                "type": "message",
+                "role": "assistant",
+                "model": body.get("model"),
+                "content": content,
+                "stop_reason": stop_reason,
+                "stop_sequence": None,
+                "usage": usage,
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start(port: int = 0, min_tokens: int = 1024, ttl: float = 300):
+    """Start the mock in a background thread; returns (server, base URL, usage log)."""
+    log = []
+    cache = PromptCache(min_tokens, ttl)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(cache, log))
+    server.cache = cache  # callers may adjust min_tokens before sending requests
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", log
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Anthropic Messages API with prompt caching")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--min-cacheable-tokens", type=int, default=1024)
+    parser.add_argument("--ttl", type=float, default=300, help="cache entry lifetime in seconds")
+    args = parser.parse_args()
+
+    server, url, _ = start(args.port, args.min_cacheable_tokens, args.ttl)
+    print(f"[INFO] Mock Messages API listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Prompt-cache check for the tool-routing call, against the local mock API.
+
+Starts benchmarks/mock_messages_api.py in-process, routes a series of
+different queries through ``llm_backend.call_tools`` with the real
+``TOOL_SCHEMAS`` and ``TOOL_SYSTEM_PROMPT`` (API backend), once with
+``PROMPT_CACHING`` on and once off, and reports cache-read tokens, uncached
+input tokens and latency per call. It also warns when the stable prefix is
+below the routing model's minimum cacheable length, in which case the API
+silently skips caching. The minimum defaults to that of the model the routing
+task actually uses (``MODELS["api"]`` at the ``TOOL_SELECTION`` tier).
+
+Usage:
+    python benchmarks/prompt_cache_check.py
+    python benchmarks/prompt_cache_check.py --calls 50 --min-cacheable-tokens 2048
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import mock_messages_api  # noqa: E402
+from run_benchmarks import RESULTS_DIR, git_sha, percentile  # noqa: E402
+
+QUERIES = [
+    "What's the weather in Paris?",
+    "Summarize my unread emails from today",
+    "What is 17% of 2,340?",
+    "Review https://github.com/octo/demo/pull/12",
+    "Any meetings tomorrow?",
+    "Weather in Berlin and Tokyo",
+]
+
+
+def min_cacheable_tokens(model: str) -> int:
+    """Shortest prefix the API caches for ``model``."""
+    return 2048 if "haiku" in model else 1024
+
+
+def run(calls: int, caching: bool, usage_log: list) -> dict:
+    import claude_client
+    from llm_backend import call_tools
+    from math_ai_agent_doc import TOOL_QUERY_PROMPT, TOOL_SCHEMAS, TOOL_SYSTEM_PROMPT
+
+    claude_client.PROMPT_CACHING = caching
+    latencies, usages = [], []
+    for i in range(calls):
+        query = QUERIES[i % len(QUERIES)]
+        prompt = TOOL_QUERY_PROMPT.format(today=date.today().isoformat(), context="", query=query)
+        start = time.perf_counter()
+        decision = call_tools(prompt, TOOL_SCHEMAS, TOOL_SYSTEM_PROMPT)
+        latencies.append(time.perf_counter() - start)
+        if decision.get("type") == "error":
+            raise SystemExit(f"[ERROR] Routing call failed: {decision['content']}")
+        usages.append(usage_log.pop())
+
+    latencies.sort()
+    # The first call writes the cache; the rest show the steady state
+    steady = usages[1:] or usages
+    return {
+        "caching": caching,
+        "calls": calls,
+        "cache_write_tokens": sum(u["cache_creation_input_tokens"] for u in usages),
+        "cache_read_tokens": sum(u["cache_read_input_tokens"] for u in usages),
+        "uncached_input_tokens": sum(u["input_tokens"] for u in usages),
+        "steady_hit_rate": round(sum(1 for u in steady if u["cache_read_input_tokens"]) / len(steady), 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt-cache check of the tool-routing prefix")
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--min-cacheable-tokens", type=int,
+                        help="model minimum: 1024 for Sonnet/Opus, 2048 for Haiku "
+                             "(default: that of the routing model)")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/prompt-cache-<sha>.json)")
+    args = parser.parse_args()
+
+    server, url, usage_log = mock_messages_api.start()
+    # Before importing the clients, which read these at import time
+    os.environ.update({"ANTHROPIC_BASE_URL": url, "ANTHROPIC_API_KEY": "mock", "LLM_BACKENDS": "api"})
+
+    from llm_backend import MODELS, TASK_TIERS, TOOL_SELECTION
+    from math_ai_agent_doc import TOOL_SCHEMAS, TOOL_SYSTEM_PROMPT
+
+    model = MODELS["api"][TASK_TIERS[TOOL_SELECTION]]
+    if args.min_cacheable_tokens is None:
+        args.min_cacheable_tokens = min_cacheable_tokens(model)
+    server.cache.min_tokens = args.min_cacheable_tokens
+
+    prefix_tokens = mock_messages_api.count_tokens([TOOL_SCHEMAS, TOOL_SYSTEM_PROMPT])
+    print(f"[INFO] Routing model: {model}, caches prefixes of {args.min_cacheable_tokens}+ tokens")
+    print(f"[INFO] Stable prefix: {len(TOOL_SCHEMAS)} tools + system prompt, ~{prefix_tokens} tokens")
+    if prefix_tokens < args.min_cacheable_tokens:
+        print(f"[WARNING] Prefix is below the {args.min_cacheable_tokens}-token minimum: "
+              "the API will not cache it (expect a 0% hit rate)")
+
+    rows = [run(args.calls, True, usage_log), run(args.calls, False, usage_log)]
+    server.shutdown()
+
+    print(f"\n{'caching':<9}{'written':>9}{'read':>9}{'uncached':>10}{'hit rate':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    for row in rows:
+        print(f"{'on' if row['caching'] else 'off':<9}{row['cache_write_tokens']:>9}{row['cache_read_tokens']:>9}"
+              f"{row['uncached_input_tokens']:>10}{row['steady_hit_rate']:>10}{row['p50_ms']:>9}{row['p95_ms']:>9}")
+
+    result = {
+        "git_sha": git_sha(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": vars(args) | {"model": model, "prefix_tokens": prefix_tokens},
+        "results": rows,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"prompt-cache-{result['git_sha']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\n[INFO] Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Offline benchmark runner.
+
+Runs the backend against a fake Claude CLI (``fake_claude.py``) and synthetic
+data in a throw-away workspace, measures throughput and latency percentiles
+per scenario and writes the results to ``benchmarks/results/`` as JSON, tagged
+with the current git commit so runs can be compared across commits.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --scenarios ask suggest_resolution --requests 100
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<baseline>.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+FAKE_CLAUDE = os.path.join(BENCH_DIR, "fake_claude.py")
+
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic  # noqa: E402
+
+SCENARIOS = ["ask", "analyze_log", "suggest_resolution", "upload_log", "upload_document", "pr_review"]
+SERIAL_SCENARIOS = {"upload_log", "pr_review"}  # rebuild shared state, so run one at a time
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def measure(func, inputs: list, concurrency: int) -> dict:
+    """Call ``func`` once per input from ``concurrency`` threads and summarize the latencies."""
+    latencies, errors = [], 0
+
+    def timed(item):
+        start = time.perf_counter()
+        try:
+            func(item)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, e
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for elapsed, error in pool.map(timed, inputs):
+            latencies.append(elapsed)
+            if error is not None:
+                errors += 1
+                print(f"[WARNING] Benchmark request failed: {error}")
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    return {
+        "requests": len(inputs),
+        "errors": errors,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(len(inputs) / wall, 3) if wall else 0.0,
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 50), 2),
+        "p95_ms": round(1000 * percentile(latencies, 95), 2),
+        "p99_ms": round(1000 * percentile(latencies, 99), 2),
+    }
+
+
+def git_sha() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def prepare_workspace(workdir: str, args):
+    """Fill the workspace with synthetic data and point the backend at the fake CLI."""
+    os.makedirs(os.path.join(workdir, "logs"), exist_ok=True)
+    for i in range(args.log_files):
+        with open(os.path.join(workdir, "logs", f"app-{i}.log"), "w") as f:
+            f.write(synthetic.generate_log(args.log_lines, seed=args.seed + i))
+    with open(os.path.join(workdir, "training_data.json"), "w") as f:
+        json.dump(synthetic.generate_training_issues(args.training_issues, seed=args.seed), f)
+
+    upstream, branch, _ = synthetic.make_pr_repos(os.path.join(workdir, "git"), files=args.pr_files, seed=args.seed)
+
+    os.environ.update({
+        "CLAUDE_CLI_COMMAND": FAKE_CLAUDE,
+        "FAKE_CLAUDE_LATENCY": str(args.latency),
+        "FAKE_CLAUDE_JITTER": str(args.jitter),
+        "FAKE_CLAUDE_SEED": str(args.seed),
+        "PR_REVIEW_UPSTREAM_URL": upstream,
+        "GITHUB_TOKEN": "benchmark",
+    })
+    os.chdir(workdir)
+    return upstream, branch
+
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    print(f"[INFO] Benchmark workspace: {workdir}")
+    upstream, branch = prepare_workspace(workdir, args)
+
+    # Import after the environment is set: the modules read it at import time
+    from fastapi.testclient import TestClient
+    import main_fastapi
+    import pr_review
+    from rag_log_analyzer import build_vectorstore_from_all_logs
+
+    pr_review.post_comment_to_github = lambda *a, **kw: None
+    client = TestClient(main_fastapi.app)  # no context manager: skip the calendar startup hook
+
+    def post(path, **kwargs):
+        resp = client.post(path, **kwargs)
+        resp.raise_for_status()
+        return resp
+
+    def pdf_bytes(i):
+        with open(synthetic.generate_pdf(f"doc-{i}.pdf", args.pdf_pages, seed=args.seed + i), "rb") as f:
+            return f.read()
+
+    # One extra input per scenario is spent on the warm-up request
+    n = args.requests + 1
+    scenarios = {
+        "ask": (
+            lambda q: post("/ask", json={"query": q}),
+            synthetic.generate_queries(n, "chat", seed=args.seed),
+        ),
+        "analyze_log": (
+            lambda q: post("/analyze-log", json={"query": q}),
+            synthetic.generate_queries(n, "log", seed=args.seed),
+        ),
+        "suggest_resolution": (
+            lambda q: post("/suggest-resolution", json={"query": q}),
+            synthetic.generate_queries(n, "incident", seed=args.seed),
+        ),
+        "upload_log": (
+            lambda i: post("/upload-log", files={
+                "file": (f"upload-{i}.log", synthetic.generate_log(args.log_lines, seed=args.seed + 1000 + i))
+            }),
+            list(range(args.index_requests + 1)),
+        ),
+        "upload_document": (
+            lambda i: post("/upload", files={"file": (f"doc-{i}.pdf", pdf_bytes(i))}),
+            list(range(args.index_requests + 1)),
+        ),
+        "pr_review": (
+            lambda i: asyncio.run(pr_review.handle_pull_request(upstream, branch, f"https://github.com/bench/repo/pull/{i}")),
+            list(range(args.index_requests + 1)),
+        ),
+    }
+
+    if "analyze_log" in args.scenarios:
+        build_vectorstore_from_all_logs()
+
+    results = {}
+    for name in args.scenarios:
+        func, inputs = scenarios[name]
+        concurrency = 1 if name in SERIAL_SCENARIOS else args.concurrency
+        func(inputs[0])  # warm-up: model loads and first-touch caches are not part of the measurement
+        print(f"[INFO] Running {name}: {len(inputs) - 1} requests, concurrency {concurrency}")
+        results[name] = measure(func, inputs[1:], concurrency)
+
+    return {
+        "git_sha": git_sha(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("compare", "output")},
+        "scenarios": results,
+    }
+
+
+def compare(current: dict, baseline: dict):
+    """Print a per-scenario comparison against a saved baseline."""
+    print(f"\nComparison: {baseline.get('git_sha')} -> {current.get('git_sha')}")
+    print(f"{'scenario':<20}{'metric':<16}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, stats in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            before, after = old.get(metric, 0), stats.get(metric, 0)
+            change = f"{100 * (after - before) / before:+.1f}%" if before else "n/a"
+            print(f"{name:<20}{metric:<16}{before:>12}{after:>12}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks with a fake Claude CLI")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=50, help="requests per query scenario")
+    parser.add_argument("--index-requests", type=int, default=5, help="requests for the upload and pr_review scenarios")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake CLI latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="fake CLI jitter in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--log-files", type=int, default=5)
+    parser.add_argument("--log-lines", type=int, default=5000)
+    parser.add_argument("--training-issues", type=int, default=500)
+    parser.add_argument("--pdf-pages", type=int, default=50)
+    parser.add_argument("--pr-files", type=int, default=20)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>-<sha>.json)")
+    parser.add_argument("--compare", help="baseline result file to compare against")
+    args = parser.parse_args()
+
+    # The run changes into the workspace, so resolve user paths first
+    args.output = os.path.abspath(args.output) if args.output else None
+    args.compare = os.path.abspath(args.compare) if args.compare else None
+
+    result = run(args)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{result['git_sha']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+
+    print(json.dumps(result["scenarios"], indent=2))
+    print(f"[INFO] Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Synthetic corpora for the offline benchmarks: application logs, training
+issues, multi-page PDFs and Go pull requests. All generators take a seed, so
+the same scenario produces the same data on every run.
+"""
+
+import os
+import random
+import subprocess
+from datetime import datetime, timedelta
+
+SERVICES = ["payments", "auth", "orders", "inventory", "gateway", "scheduler"]
+LEVELS = ["INFO"] * 12 + ["DEBUG"] * 6 + ["WARNING"] * 3 + ["ERROR"] * 2
+MESSAGES = [
+    "request completed in {n} ms",
+    "cache miss for key user:{n}",
+    "retrying connection to db-{n} (attempt {m})",
+    "queue depth is {n}",
+    "health check passed",
+    "processed batch {n} with {m} records",
+]
+ERRORS = [
+    "connection refused to postgres-{n}:5432",
+    "timeout after {n} ms waiting for upstream",
+    "OOMKilled: container exceeded memory limit {n}Mi",
+    "TLS handshake failed: certificate expired",
+    "nil pointer dereference in handler {n}",
+]
+WORDS = (
+    "cluster node pod deployment service ingress volume quota upgrade rollout latency throughput "
+    "operator controller reconcile network policy storage class manifest webhook certificate"
+).split()
+
+
+def generate_log(lines: int = 5000, seed: int = 0) -> str:
+    """Application log with a realistic mix of levels and occasional stack traces."""
+    rng = random.Random(seed)
+    ts = datetime(2025, 1, 1)
+    out = []
+    for _ in range(lines):
+        ts += timedelta(milliseconds=rng.randint(1, 2000))
+        level = rng.choice(LEVELS)
+        service = rng.choice(SERVICES)
+        template = rng.choice(ERRORS if level == "ERROR" else MESSAGES)
+        message = template.format(n=rng.randint(1, 9999), m=rng.randint(1, 9))
+        out.append(f"{ts.isoformat()} {level} [{service}] {message}")
+        if level == "ERROR" and rng.random() < 0.3:
+            out.append("Traceback (most recent call last):")
+            for depth in range(rng.randint(2, 5)):
+                out.append(f'  File "/app/{service}/module_{depth}.py", line {rng.randint(1, 500)}, in handler_{depth}')
+            out.append(f"RuntimeError: {message}")
+    return "\n".join(out) + "\n"
+
+
+def generate_training_issues(count: int = 200, seed: int = 0) -> list:
+    """Issue/resolution pairs in the training_data.json format."""
+    rng = random.Random(seed)
+    issues = []
+    for i in range(count):
+        service = rng.choice(SERVICES)
+        error = rng.choice(ERRORS).format(n=rng.randint(1, 9999))
+        issues.append({
+            "issue": f"{service} {error} after {' '.join(rng.sample(WORDS, 3))}",
+            "resolution": f"Step {i}: " + " ".join(rng.sample(WORDS, 8)),
+        })
+    return issues
+
+
+def generate_queries(count: int, kind: str, seed: int = 0) -> list:
+    """Benchmark queries; ``kind`` is "log", "incident" or "chat"."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        service = rng.choice(SERVICES)
+        if kind == "log":
+            queries.append(f"why did {service} log errors around {rng.choice(WORDS)}")
+        elif kind == "incident":
+            queries.append(f"{service} {rng.choice(ERRORS).format(n=rng.randint(1, 9999))}")
+        else:
+            queries.append(f"explain {rng.choice(WORDS)} and {rng.choice(WORDS)} in kubernetes")
+    return queries
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def generate_pdf(path: str, pages: int = 50, lines_per_page: int = 45, seed: int = 0) -> str:
+    """Write a plain-text PDF (Helvetica, one content stream per page) that PdfReader can extract."""
+    rng = random.Random(seed)
+    objects = []  # object bodies, numbered from 1
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # filled in below
+    pages_obj = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for p in range(pages):
+        lines = [f"Section {p + 1}. " + " ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 14 TL 40 800 Td " + " ".join(f"({_pdf_escape(l)}) Tj T*" for l in lines) + " ET"
+        data = stream.encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_obj, font, content)
+        ))
+
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+
+def _go_file(rng: random.Random, package: str, functions: int) -> str:
+    body = [f"package {package}", "", 'import "fmt"', ""]
+    for i in range(functions):
+        name = f"{rng.choice(WORDS).capitalize()}{i}"
+        body += [
+            f"func {name}(n int) error {{",
+            f"\tif n > {rng.randint(1, 100)} {{",
+            f'\t\treturn fmt.Errorf("{name} failed for %d", n)',
+            "\t}",
+            "\treturn nil",
+            "}",
+            "",
+        ]
+    return "\n".join(body)
+
+
+def make_pr_repos(workdir: str, files: int = 20, seed: int = 0):
+    """
+    Create a local repository whose ``feature`` branch adds Go code on top of ``master``.
+
+    The same repository serves as the contributor's fork (cloned and checked
+    out) and as the upstream remote the branch is diffed against.
+
+    Returns:
+        Tuple of (fork repo path, branch name, upstream repo path)
+    """
+    rng = random.Random(seed)
+    upstream = os.path.join(workdir, "upstream")
+    os.makedirs(upstream, exist_ok=True)
+
+    def git(*args, cwd=upstream):
+        subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+    git("init", "-q", "-b", "master")
+    git("config", "user.email", "bench@example.com")
+    git("config", "user.name", "bench")
+    for i in range(files):
+        os.makedirs(os.path.join(upstream, f"pkg/mod{i}"), exist_ok=True)
+        with open(os.path.join(upstream, f"pkg/mod{i}/mod.go"), "w") as f:
+            f.write(_go_file(rng, f"mod{i}", 5))
+    git("add", ".")
+    git("commit", "-q", "-m", "base")
+
+    git("checkout", "-q", "-b", "feature")
+    for i in range(files):
+        with open(os.path.join(upstream, f"pkg/mod{i}/mod.go"), "a") as f:
+            f.write(_go_file(rng, f"mod{i}", 3).split("\n", 4)[-1])
+    git("commit", "-q", "-am", "feature")
+    git("checkout", "-q", "master")
+    return upstream, "feature", upstream
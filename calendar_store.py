@@ -0,0 +1,289 @@
+"""
+Calendar Event Store Module
+Keeps a local, indexed copy of the primary Google Calendar and keeps it fresh
+with incremental syncs (Calendar API ``syncToken``s) instead of calling
+``events().list`` for every day view.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import pytz
+
+from metrics import track
+
+# Configuration
+CALENDAR_CACHE_FILE = "calendar_cache.json"
+CALENDAR_TIMEZONE = "Asia/Kolkata"
+SYNC_INTERVAL = 300  # seconds between background refreshes
+PAGE_SIZE = 250
+
+
+def _parse_event_time(value: dict, tz) -> Optional[datetime]:
+    """Convert an event ``start``/``end`` dict into an aware datetime."""
+    if not value:
+        return None
+    if "dateTime" in value:
+        return datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+    if "date" in value:
+        day = datetime.strptime(value["date"], "%Y-%m-%d")
+        return tz.localize(day)
+    return None
+
+
+class CalendarEventStore:
+    """
+    Local copy of one calendar, indexed by start time.
+
+    The first ``sync()`` downloads every event and stores the returned
+    ``nextSyncToken``; later syncs only fetch what changed since then. Our own
+    inserts and deletes are applied immediately through ``apply_insert`` and
+    ``apply_delete`` so the UI sees them before the next sync round.
+    """
+
+    def __init__(
+        self,
+        service_factory: Callable,
+        calendar_id: str = "primary",
+        cache_file: Optional[str] = CALENDAR_CACHE_FILE,
+        timezone: str = CALENDAR_TIMEZONE,
+    ):
+        self.service_factory = service_factory
+        self.calendar_id = calendar_id
+        self.cache_file = cache_file
+        self.tz = pytz.timezone(timezone)
+
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()  # serializes the initial sync
+        self._events = {}        # event id -> event resource
+        self._bounds = {}        # event id -> (start, end)
+        self._index = []         # sorted list of (start, event id)
+        self._max_duration = timedelta(0)
+        self._sync_token = None
+        self._synced = False
+
+        self._stop = threading.Event()
+        self._refresher = None
+
+        self._load_cache()
+
+    # --------------------------- index maintenance ---------------------------
+
+    def _add(self, event: dict):
+        event_id = event["id"]
+        self._remove(event_id)
+
+        start = _parse_event_time(event.get("start"), self.tz)
+        if start is None:
+            return
+        end = _parse_event_time(event.get("end"), self.tz) or start
+
+        self._events[event_id] = event
+        self._bounds[event_id] = (start, end)
+        insort(self._index, (start, event_id))
+        if end - start > self._max_duration:
+            self._max_duration = end - start
+
+    def _remove(self, event_id: str):
+        bounds = self._bounds.pop(event_id, None)
+        self._events.pop(event_id, None)
+        if bounds is None:
+            return
+        pos = bisect_left(self._index, (bounds[0], event_id))
+        if pos < len(self._index) and self._index[pos] == (bounds[0], event_id):
+            del self._index[pos]
+
+    def _reset(self):
+        self._events.clear()
+        self._bounds.clear()
+        self._index.clear()
+        self._max_duration = timedelta(0)
+        self._sync_token = None
+
+    # ------------------------------ persistence ------------------------------
+
+    def _load_cache(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            with self._lock:
+                for event in data.get("events", []):
+                    self._add(event)
+                self._sync_token = data.get("sync_token")
+                self._synced = self._sync_token is not None
+            print(f"[INFO] Loaded {len(self._events)} cached calendar events")
+        except Exception as e:
+            print(f"[WARNING] Ignoring unreadable calendar cache: {str(e)}")
+            with self._lock:
+                self._reset()
+
+    def _save_cache(self):
+        if not self.cache_file:
+            return
+        with self._lock:
+            data = {"sync_token": self._sync_token, "events": list(self._events.values())}
+        # Unique temp name: every worker process saves the same cache file
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.cache_file)),
+            prefix=os.path.basename(self.cache_file) + ".",
+            suffix=".tmp",
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    # --------------------------------- sync ----------------------------------
+
+    def sync(self) -> int:
+        """
+        Pull changes from Google Calendar into the local store.
+
+        Uses the stored sync token when there is one, and falls back to a full
+        sync when Google reports the token as expired (HTTP 410).
+
+        Returns:
+            Number of added, updated or removed events
+        """
+        from googleapiclient.errors import HttpError
+
+        service = self.service_factory()
+        with self._lock:
+            token = self._sync_token
+
+        try:
+            items, next_token = self._fetch(service, token)
+        except HttpError as e:
+            if token is None or e.resp.status != 410:
+                raise
+            print("[INFO] Calendar sync token expired, running full sync")
+            token = None
+            items, next_token = self._fetch(service, None)
+
+        with self._lock:
+            if token is None:
+                self._reset()
+            for event in items:
+                if event.get("status") == "cancelled":
+                    self._remove(event["id"])
+                else:
+                    self._add(event)
+            self._sync_token = next_token
+            self._synced = True
+
+        self._save_cache()
+        print(f"[INFO] Calendar sync applied {len(items)} changes ({'full' if token is None else 'incremental'})")
+        return len(items)
+
+    def _fetch(self, service, sync_token: Optional[str]):
+        items = []
+        page_token = None
+        while True:
+            params = {
+                "calendarId": self.calendar_id,
+                "singleEvents": True,
+                "maxResults": PAGE_SIZE,
+            }
+            if sync_token:
+                params["syncToken"] = sync_token
+            if page_token:
+                params["pageToken"] = page_token
+
+            with track("calendar_api"):
+                result = service.events().list(**params).execute()
+            items.extend(result.get("items", []))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return items, result.get("nextSyncToken")
+
+    def ensure_synced(self):
+        """Run the initial sync if the store has never been populated."""
+        if self._synced:
+            return
+        with self._sync_lock:
+            # Concurrent first requests wait for one sync instead of each running their own
+            if not self._synced:
+                self.sync()
+
+    # ------------------------------ local edits ------------------------------
+
+    def apply_insert(self, event: dict):
+        """Add an event we just created so it shows up before the next sync."""
+        with self._lock:
+            self._add(event)
+
+    def apply_delete(self, event_id: str):
+        """Drop an event we just deleted so it disappears before the next sync."""
+        with self._lock:
+            self._remove(event_id)
+
+    # -------------------------------- queries --------------------------------
+
+    def events_between(self, start: datetime, end: datetime) -> list:
+        """
+        Return events overlapping ``[start, end)``, ordered by start time.
+
+        Args:
+            start: Timezone-aware range start
+            end: Timezone-aware range end
+
+        Returns:
+            List of event resources as returned by the Calendar API
+        """
+        with self._lock:
+            lo = bisect_left(self._index, (start - self._max_duration,))
+            hi = bisect_right(self._index, (end,))
+            matches = []
+            for event_start, event_id in self._index[lo:hi]:
+                event_end = self._bounds[event_id][1]
+                if event_start < end and (event_end > start or event_start >= start):
+                    matches.append(self._events[event_id])
+            return matches
+
+    def events_on(self, date: str) -> list:
+        """Return the events of one day given as ``YYYY-MM-DD``."""
+        day = datetime.strptime(date, "%Y-%m-%d")
+        start_of_day = self.tz.localize(day)
+        return self.events_between(start_of_day, start_of_day + timedelta(days=1))
+
+    def upcoming(self, limit: int = 10) -> list:
+        """Return the next ``limit`` events starting from now."""
+        now = datetime.now(self.tz)
+        with self._lock:
+            pos = bisect_left(self._index, (now,))
+            return [self._events[event_id] for _, event_id in self._index[pos:pos + limit]]
+
+    # ------------------------------ background -------------------------------
+
+    def start_background_refresh(self, interval: int = SYNC_INTERVAL):
+        """Start a daemon thread that calls ``sync()`` every ``interval`` seconds."""
+        if self._refresher and self._refresher.is_alive():
+            return
+        self._stop.clear()
+        self._refresher = threading.Thread(
+            target=self._refresh_loop, args=(interval,), name="calendar-refresh", daemon=True
+        )
+        self._refresher.start()
+
+    def stop_background_refresh(self):
+        self._stop.set()
+        if self._refresher:
+            self._refresher.join(timeout=5)
+
+    def _refresh_loop(self, interval: int):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"[WARNING] Background calendar sync failed: {str(e)}")
+            self._stop.wait(interval)
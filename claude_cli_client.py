@@ -9,16 +9,20 @@ import tempfile
 import os
 from typing import Optional, Generator
 
+from llm_scheduler import LLMOverloaded, scheduler
+from metrics import track_llm
+
 # Configuration
-CLAUDE_CLI_COMMAND = "claude"  # Assumes 'claude' is in PATH
+CLAUDE_CLI_COMMAND = os.getenv("CLAUDE_CLI_COMMAND", "claude")  # Assumes 'claude' is in PATH
 DEFAULT_TIMEOUT = 120  # seconds
+DEFAULT_MODEL = "sonnet"
 
 
 def call_claude_cli(
     prompt: str,
     system_prompt: Optional[str] = None,
     timeout: int = DEFAULT_TIMEOUT,
-    model: str = "sonnet"
+    model: str = DEFAULT_MODEL
 ) -> str:
     """
     Call Claude CLI with a prompt and return the response.
@@ -43,19 +47,21 @@ def call_claude_cli(
         env.pop('CLAUDECODE', None)
 
         # Build the Claude CLI command
-        # Note: Claude CLI doesn't support --model flag in chat mode
-        cmd = [CLAUDE_CLI_COMMAND, "chat"]
+        cmd = [CLAUDE_CLI_COMMAND]
+        if model:
+            cmd += ["--model", model]
+        cmd.append("chat")
 
-        # Execute the command with prompt via stdin
-        result = subprocess.run(
+        # Execute the command with prompt via stdin, once the scheduler has a free slot
+        result = scheduler.run("cli", lambda remaining: subprocess.run(
             cmd,
             input=full_prompt,
             capture_output=True,
             text=True,
-            timeout=timeout,
+            timeout=min(timeout, remaining),
             check=False,
             env=env
-        )
+        ))
 
         # Check if we got a valid response in stdout
         response = result.stdout.strip()
@@ -79,6 +85,8 @@ def call_claude_cli(
         return f"Error: Claude CLI timed out after {timeout} seconds"
     except FileNotFoundError:
         return f"Error: Claude CLI command '{CLAUDE_CLI_COMMAND}' not found. Make sure it's installed and in PATH."
+    except LLMOverloaded:
+        raise  # shed by the scheduler, answered with 429/503
     except Exception as e:
         print(f"[ERROR] Claude CLI call failed: {str(e)}")
         return f"Error calling Claude CLI: {str(e)}"
@@ -103,16 +111,16 @@ def call_claude_cli_interactive(prompt: str, timeout: int = DEFAULT_TIMEOUT) ->
         # Build the Claude CLI command
         cmd = [CLAUDE_CLI_COMMAND, "chat"]
 
-        # Execute the command with prompt via stdin
-        result = subprocess.run(
+        # Execute the command with prompt via stdin, once the scheduler has a free slot
+        result = scheduler.run("cli", lambda remaining: subprocess.run(
             cmd,
             input=prompt,
             capture_output=True,
             text=True,
-            timeout=timeout,
+            timeout=min(timeout, remaining),
             check=False,
             env=env
-        )
+        ))
 
         # Check if we got a valid response in stdout
         response = result.stdout.strip()
@@ -136,63 +144,104 @@ def call_claude_cli_interactive(prompt: str, timeout: int = DEFAULT_TIMEOUT) ->
         return f"Error: Claude CLI timed out after {timeout} seconds"
     except FileNotFoundError:
         return f"Error: Claude CLI command '{CLAUDE_CLI_COMMAND}' not found. Make sure it's installed and in PATH."
+    except LLMOverloaded:
+        raise  # shed by the scheduler, answered with 429/503
     except Exception as e:
         print(f"[ERROR] Claude CLI call failed: {str(e)}")
         return f"Error calling Claude CLI: {str(e)}"
 
 
-def call_claude_cli_simple(prompt: str) -> str:
+class ClaudeCLIError(RuntimeError):
+    """The Claude CLI failed or could not be run; the message reads "Error..."."""
+
+
+def call_claude_cli_simple(prompt: str, model: Optional[str] = None, json_schema: Optional[dict] = None) -> str:
     """
     Simplified Claude CLI call using stdin.
     This is the most straightforward approach.
 
     Args:
         prompt: The user prompt/query
+        model: Model alias (haiku, sonnet, opus), defaults to the CLI's own default
+        json_schema: JSON schema the reply must match (``--json-schema``)
 
     Returns:
-        The text response from Claude CLI
+        The text response from Claude CLI, or an "Error..." message
+    """
+    try:
+        return complete_claude_cli(prompt, model, json_schema)
+    except ClaudeCLIError as e:
+        return str(e)
+
+
+def complete_claude_cli(prompt: str, model: Optional[str] = None, json_schema: Optional[dict] = None) -> str:
+    """
+    call_claude_cli_simple that signals failure instead of returning it as text.
+
+    Raises:
+        ClaudeCLIError: The CLI failed, timed out or is not installed
     """
+    return scheduler.run("cli", lambda timeout: _tracked_claude_cli(prompt, timeout, model, json_schema))
+
+
+def _tracked_claude_cli(prompt: str, timeout: float, model: Optional[str], json_schema: Optional[dict]) -> str:
+    with track_llm("cli"):
+        return _run_claude_cli(prompt, timeout, model, json_schema)
+
+
+def _run_claude_cli(
+    prompt: str,
+    timeout: float = DEFAULT_TIMEOUT,
+    model: Optional[str] = None,
+    json_schema: Optional[dict] = None,
+) -> str:
+    # The scheduler passes the time left until the request's deadline
+    timeout = min(timeout, DEFAULT_TIMEOUT)
     try:
         # Unset CLAUDECODE to avoid nested session errors
         env = os.environ.copy()
         env.pop('CLAUDECODE', None)
 
+        cmd = [CLAUDE_CLI_COMMAND]
+        if model:
+            cmd += ["--model", model]
+        if json_schema:
+            cmd += ["--json-schema", json.dumps(json_schema)]
+        cmd.append("chat")
+
         # Execute claude command with prompt via stdin
         result = subprocess.run(
-            [CLAUDE_CLI_COMMAND, "chat"],
+            cmd,
             input=prompt,
             capture_output=True,
             text=True,
-            timeout=DEFAULT_TIMEOUT,
+            timeout=timeout,
             check=False,
             env=env
         )
-
-        # Check if we got a valid response in stdout
-        response = result.stdout.strip()
-
-        # If there's a valid response, return it even if return code is non-zero
-        # (Claude CLI sometimes returns non-zero with warnings but still produces output)
-        if response:
-            if result.stderr:
-                print(f"[WARNING] Claude CLI stderr: {result.stderr.strip()}")
-            return response
-
-        # Only treat as error if we have no response
-        if result.returncode != 0:
-            error_msg = result.stderr.strip() if result.stderr else "Unknown error"
-            print(f"[ERROR] Claude CLI failed: {error_msg}")
-            return f"Error calling Claude CLI: {error_msg}"
-
-        return response
-
     except subprocess.TimeoutExpired:
-        return f"Error: Claude CLI timed out after {DEFAULT_TIMEOUT} seconds"
+        raise ClaudeCLIError(f"Error: Claude CLI timed out after {timeout:.0f} seconds")
     except FileNotFoundError:
-        return f"Error: Claude CLI command '{CLAUDE_CLI_COMMAND}' not found. Make sure it's installed and in PATH."
+        raise ClaudeCLIError(f"Error: Claude CLI command '{CLAUDE_CLI_COMMAND}' not found. Make sure it's installed and in PATH.")
     except Exception as e:
         print(f"[ERROR] Claude CLI call failed: {str(e)}")
-        return f"Error calling Claude CLI: {str(e)}"
+        raise ClaudeCLIError(f"Error calling Claude CLI: {str(e)}") from e
+
+    # Check if we got a valid response in stdout
+    response = result.stdout.strip()
+
+    # If there's a valid response, return it even if return code is non-zero
+    # (Claude CLI sometimes returns non-zero with warnings but still produces output)
+    if response:
+        if result.stderr:
+            print(f"[WARNING] Claude CLI stderr: {result.stderr.strip()}")
+        return response
+
+    error_msg = result.stderr.strip() if result.stderr else "Unknown error"
+    if result.returncode != 0:
+        print(f"[ERROR] Claude CLI failed: {error_msg}")
+        raise ClaudeCLIError(f"Error calling Claude CLI: {error_msg}")
+    raise ClaudeCLIError("Error: Claude CLI returned an empty response")
 
 
 # Main LLM function - generic name for flexibility
@@ -6,6 +6,8 @@ Replaces Ollama LLaMA3 with Anthropic's Claude API for faster, more reliable AI
 import os
 from anthropic import Anthropic
 from dotenv import load_dotenv
+from llm_scheduler import LLMOverloaded, scheduler
+from metrics import record_llm_usage, track_llm
 
 # Load environment variables
 load_dotenv()
@@ -16,8 +18,37 @@ client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 # Model configuration
 CLAUDE_MODEL = "claude-3-5-sonnet-20241022"  # Latest and fastest Claude model
 MAX_TOKENS = 4096
+# Mark the stable prefix (tools + system prompt) as a prompt-cache breakpoint
+PROMPT_CACHING = os.getenv("PROMPT_CACHING", "true").lower() in ("1", "true", "yes")
 
-def call_claude(prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = MAX_TOKENS) -> str:
+def _create_message(kwargs: dict, timeout: float):
+    # The scheduler passes the time left until the request's deadline
+    with track_llm("api"):
+        response = client.messages.create(**kwargs, timeout=timeout)
+    record_llm_usage("api", response.usage)
+    return response
+
+
+def _cached_prefix(kwargs: dict):
+    """
+    Put a cache breakpoint at the end of the stable prefix. The API caches
+    tools, then system, then messages, so a breakpoint on the system prompt
+    covers the tool catalogue too; the user message stays the dynamic suffix.
+    """
+    if kwargs.get("system"):
+        kwargs["system"] = [{"type": "text", "text": kwargs["system"], "cache_control": {"type": "ephemeral"}}]
+    elif kwargs.get("tools"):
+        kwargs["tools"] = kwargs["tools"][:-1] + [{**kwargs["tools"][-1], "cache_control": {"type": "ephemeral"}}]
+
+
+def call_claude(
+    prompt: str,
+    system_prompt: str = None,
+    temperature: float = 0.7,
+    max_tokens: int = MAX_TOKENS,
+    model: str = CLAUDE_MODEL,
+    cache_prefix: bool = False,
+) -> str:
     """
     Call Claude API with a prompt and return the response.
 
@@ -26,78 +57,77 @@ def call_claude(prompt: str, system_prompt: str = None, temperature: float = 0.7
         system_prompt: Optional system prompt to set context
         temperature: Randomness in responses (0.0 to 1.0)
         max_tokens: Maximum tokens in response
+        model: Claude model id
+        cache_prefix: Cache the system prompt (worth it only when it repeats across calls)
 
     Returns:
-        The text response from Claude
+        The text response from Claude, or an "Error..." message
     """
     try:
-        messages = [{"role": "user", "content": prompt}]
-
-        kwargs = {
-            "model": CLAUDE_MODEL,
-            "max_tokens": max_tokens,
-            "temperature": temperature,
-            "messages": messages
-        }
-
-        # Add system prompt if provided
-        if system_prompt:
-            kwargs["system"] = system_prompt
-
-        response = client.messages.create(**kwargs)
-
-        # Extract text from response
-        return response.content[0].text
-
+        return complete_claude(prompt, system_prompt, temperature, max_tokens, model, cache_prefix)
+    except LLMOverloaded:
+        raise  # shed by the scheduler, answered with 429/503
     except Exception as e:
         print(f"[ERROR] Claude API call failed: {str(e)}")
         return f"Error calling Claude API: {str(e)}"
 
 
-def call_claude_with_tools(prompt: str, tools: list = None, system_prompt: str = None) -> dict:
+def complete_claude(
+    prompt: str,
+    system_prompt: str = None,
+    temperature: float = 0.7,
+    max_tokens: int = MAX_TOKENS,
+    model: str = CLAUDE_MODEL,
+    cache_prefix: bool = False,
+) -> str:
+    """call_claude that raises the client's exception instead of returning an error message."""
+    messages = [{"role": "user", "content": prompt}]
+
+    kwargs = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "messages": messages
+    }
+
+    # Add system prompt if provided
+    if system_prompt:
+        kwargs["system"] = system_prompt
+    if cache_prefix and PROMPT_CACHING:
+        _cached_prefix(kwargs)
+
+    response = scheduler.run("api", lambda timeout: _create_message(kwargs, timeout))
+
+    # Extract text from response
+    return response.content[0].text
+
+
+def call_claude_with_tools(
+    prompt: str,
+    tools: list = None,
+    system_prompt: str = None,
+    model: str = CLAUDE_MODEL,
+    cache_prefix: bool = True,
+) -> dict:
     """
     Call Claude with tool/function calling support.
 
     Args:
         prompt: The user prompt/query
         tools: List of tool definitions in Claude format
-        system_prompt: Optional system prompt
+        system_prompt: Optional system prompt; keep it free of per-request
+            data so it stays cacheable
+        model: Claude model id
+        cache_prefix: Cache the tools and system prompt, which repeat on every routing call
 
     Returns:
-        dict with 'type' (text or tool_use) and 'content' or 'tool_calls'
+        dict with 'type' (text, tool_use or error) and 'content' or 'tool_calls'
+        (a list of {"name", "input"} dicts)
     """
     try:
-        messages = [{"role": "user", "content": prompt}]
-
-        kwargs = {
-            "model": CLAUDE_MODEL,
-            "max_tokens": MAX_TOKENS,
-            "messages": messages
-        }
-
-        if system_prompt:
-            kwargs["system"] = system_prompt
-
-        if tools:
-            kwargs["tools"] = tools
-
-        response = client.messages.create(**kwargs)
-
-        # Check if Claude wants to use a tool
-        if response.stop_reason == "tool_use":
-            tool_uses = [block for block in response.content if block.type == "tool_use"]
-            return {
-                "type": "tool_use",
-                "tool_calls": tool_uses
-            }
-        else:
-            # Regular text response
-            text_content = "".join([block.text for block in response.content if hasattr(block, 'text')])
-            return {
-                "type": "text",
-                "content": text_content
-            }
-
+        return complete_claude_with_tools(prompt, tools, system_prompt, model, cache_prefix)
+    except LLMOverloaded:
+        raise
     except Exception as e:
         print(f"[ERROR] Claude API call with tools failed: {str(e)}")
         return {
@@ -106,6 +136,48 @@ def call_claude_with_tools(prompt: str, tools: list = None, system_prompt: str =
         }
 
 
+def complete_claude_with_tools(
+    prompt: str,
+    tools: list = None,
+    system_prompt: str = None,
+    model: str = CLAUDE_MODEL,
+    cache_prefix: bool = True,
+) -> dict:
+    """call_claude_with_tools that raises the client's exception instead of returning an error dict."""
+    messages = [{"role": "user", "content": prompt}]
+
+    kwargs = {
+        "model": model,
+        "max_tokens": MAX_TOKENS,
+        "messages": messages
+    }
+
+    if system_prompt:
+        kwargs["system"] = system_prompt
+
+    if tools:
+        kwargs["tools"] = tools
+
+    if cache_prefix and PROMPT_CACHING:
+        _cached_prefix(kwargs)
+
+    response = scheduler.run("api", lambda timeout: _create_message(kwargs, timeout))
+
+    # Check if Claude wants to use a tool
+    if response.stop_reason == "tool_use":
+        tool_uses = [{"name": block.name, "input": block.input} for block in response.content if block.type == "tool_use"]
+        return {
+            "type": "tool_use",
+            "tool_calls": tool_uses
+        }
+    # Regular text response
+    text_content = "".join([block.text for block in response.content if hasattr(block, 'text')])
+    return {
+        "type": "text",
+        "content": text_content
+    }
+
+
 def call_claude_streaming(prompt: str, system_prompt: str = None):
     """
     Call Claude API with streaming enabled.
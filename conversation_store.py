@@ -0,0 +1,237 @@
+"""
+Conversation Store Module
+Server-side conversation sessions for ``/ask``. Each session keeps
+
+- the last few turns verbatim,
+- a running summary that older turns are folded into (one LLM call, run
+  after the response is sent),
+- entity slots (last email subject, last date, last PR) taken from the
+  questions and answers,
+
+so a follow-up ("summarize that email again", "what about the day after?")
+gets a compact context block whose size is bounded however long the
+conversation runs. Sessions live in SQLite, shared by all API workers, and
+expire after ``SESSION_TTL`` seconds without activity.
+"""
+
+import functools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable
+
+from llm_backend import SUMMARY, LLMResult, generate
+from prompt_builder import Section, build_prompt, fit_text
+
+# Configuration
+CONVERSATION_DB = "conversations.db"
+RECENT_TURNS = int(os.getenv("SESSION_RECENT_TURNS", "4"))  # turns kept verbatim
+SESSION_TTL = int(os.getenv("SESSION_TTL", "86400"))  # seconds of inactivity before a session is dropped
+SUMMARY_TOKENS = 400  # cap of the running summary in the context block
+TURN_TOKENS = 250  # cap of each question and answer in the context block
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and an assistant.
+Keep the facts, names, dates, email subjects, PR links and open questions the user may refer back to;
+leave out pleasantries. Write at most 150 words.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}
+
+Updated summary:"""
+
+# Entity slots and the patterns that fill them; a value in the question wins over one in the answer
+ENTITY_PATTERNS = {
+    "last email subject": re.compile(r"subject\s*(?:line\s*)?[:=]?\s*['\"“‘](?P<value>[^'\"”’]+)['\"”’]", re.I),
+    "last date": re.compile(r"\b(?P<value>\d{4}-\d{2}-\d{2})\b"),
+    "last PR": re.compile(r"(?P<value>https://github\.com/[\w.-]+/[\w.-]+/pull/\d+)"),
+}
+
+
+def extract_entities(text: str) -> dict:
+    """Entity slot values mentioned in ``text`` (the last mention of each wins)."""
+    found = {}
+    for slot, pattern in ENTITY_PATTERNS.items():
+        matches = list(pattern.finditer(text or ""))
+        if matches:
+            found[slot] = matches[-1].group("value").strip()
+    return found
+
+
+class ConversationStore:
+    """SQLite-backed sessions with recent turns, a rolling summary and entity slots."""
+
+    def __init__(
+        self,
+        llm: Callable[[str], LLMResult] = functools.partial(generate, task=SUMMARY),
+        db_path: str = CONVERSATION_DB,
+        recent_turns: int = RECENT_TURNS,
+        ttl: int = SESSION_TTL,
+    ):
+        self.llm = llm
+        self.recent_turns = recent_turns
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    summary TEXT DEFAULT '',
+                    entities TEXT DEFAULT '{}',
+                    version INTEGER DEFAULT 0,
+                    updated_at REAL
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS turns (
+                    id INTEGER PRIMARY KEY,
+                    session_id TEXT,
+                    question TEXT,
+                    answer TEXT,
+                    created_at REAL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_turns_session ON turns(session_id, id)")
+
+    def _session(self, session_id: str):
+        """(summary, entities, version) of a live session, or None."""
+        row = self._conn.execute(
+            "SELECT summary, entities, version FROM sessions WHERE session_id = ? AND updated_at > ?",
+            (session_id, time.time() - self.ttl),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2]
+
+    def _turns(self, session_id: str, limit: int = -1):
+        rows = self._conn.execute(
+            "SELECT id, question, answer FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+            (session_id, limit),
+        ).fetchall()
+        return rows[::-1]
+
+    def get(self, session_id: str) -> dict:
+        """Summary, entity slots and stored turns of a session."""
+        with self._lock:
+            session = self._session(session_id)
+            turns = self._turns(session_id) if session else []
+        summary, entities, _ = session or ("", {}, 0)
+        return {
+            "session_id": session_id,
+            "summary": summary,
+            "entities": entities,
+            "turns": [{"question": q, "answer": a} for _, q, a in turns],
+        }
+
+    def context(self, session_id: str) -> str:
+        """
+        Compact context block for the next question: summary, entity slots and
+        the recent turns, each capped. Empty for a new session.
+        """
+        with self._lock:
+            session = self._session(session_id)
+            if session is None:
+                return ""
+            summary, entities, _ = session
+            turns = self._turns(session_id, self.recent_turns)
+
+        parts = []
+        if summary:
+            parts.append("Summary of the earlier conversation:\n" + fit_text(summary, SUMMARY_TOKENS))
+        if entities:
+            parts.append("Known from the conversation: " + "; ".join(f"{slot} = {value}" for slot, value in entities.items()))
+        if turns:
+            parts.append("Recent turns:\n" + "\n".join(
+                f"User: {fit_text(q, TURN_TOKENS)}\nAssistant: {fit_text(a, TURN_TOKENS)}" for _, q, a in turns
+            ))
+        return "\n\n".join(parts)
+
+    def record(self, session_id: str, question: str, answer) -> bool:
+        """
+        Store a turn and update the entity slots.
+
+        Returns:
+            True if the session has turns beyond the verbatim window, i.e. ``compact`` has work to do
+        """
+        answer = answer if isinstance(answer, str) else json.dumps(answer, default=str)
+        now = time.time()
+        with self._lock, self._conn:
+            # Expired sessions can never be continued
+            expired = now - self.ttl
+            self._conn.execute(
+                "DELETE FROM turns WHERE session_id IN (SELECT session_id FROM sessions WHERE updated_at <= ?)", (expired,)
+            )
+            self._conn.execute("DELETE FROM sessions WHERE updated_at <= ?", (expired,))
+
+            summary, entities, version = self._session(session_id) or ("", {}, 0)
+            entities.update(extract_entities(answer))
+            entities.update(extract_entities(question))  # the user's own words win
+            self._conn.execute(
+                """INSERT INTO sessions (session_id, summary, entities, version, updated_at) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(session_id) DO UPDATE SET entities = excluded.entities, updated_at = excluded.updated_at""",
+                (session_id, summary, json.dumps(entities), version, now),
+            )
+            self._conn.execute(
+                "INSERT INTO turns (session_id, question, answer, created_at) VALUES (?, ?, ?, ?)",
+                (session_id, question, answer, now),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM turns WHERE session_id = ?", (session_id,)).fetchone()[0]
+        return count > self.recent_turns
+
+    def compact(self, session_id: str):
+        """Fold the turns older than the verbatim window into the running summary."""
+        with self._lock:
+            session = self._session(session_id)
+            turns = self._turns(session_id)[:-self.recent_turns or None] if session else []
+        if not turns:
+            return
+        summary, _, version = session
+
+        prompt = build_prompt(SUMMARY_PROMPT, [
+            Section("summary", summary or "(none yet)", priority=1),
+            Section("turns", chunks=[f"User: {q}\nAssistant: {a}" for _, q, a in turns], separator="\n", priority=2),
+        ])
+        result = self.llm(prompt)
+        updated = result.text.strip()
+        if not result.ok or not updated:
+            print(f"[WARNING] Conversation summary update failed for {session_id}: {updated[:200]}")
+            return
+
+        with self._lock, self._conn:
+            # Another worker compacted the session meanwhile: keep its summary, ours is stale
+            cursor = self._conn.execute(
+                "UPDATE sessions SET summary = ?, version = version + 1 WHERE session_id = ? AND version = ?",
+                (updated, session_id, version),
+            )
+            folded = cursor.rowcount > 0
+            if folded:
+                self._conn.execute(
+                    f"DELETE FROM turns WHERE id IN ({','.join('?' * len(turns))})", [turn_id for turn_id, _, _ in turns]
+                )
+        if folded:
+            print(f"[INFO] Folded {len(turns)} turns into the summary of session {session_id}")
+
+    def delete(self, session_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_conversation_store() -> ConversationStore:
+    """Return the process-wide conversation store, creating it on first use."""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = ConversationStore()
+    return _default_store
@@ -0,0 +1,177 @@
+"""
+Document Extraction Module
+Shared text extraction for uploaded documents: uploads are streamed to disk in
+chunks with a size cap, PDF pages are extracted in parallel across a process
+pool, and extracted text is cached by file hash so the same file is never
+parsed twice.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+from PyPDF2 import PdfReader
+
+from metrics import record_cache, track
+
+# Configuration
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 200 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+EXTRACT_CACHE_DIR = "extracted_text"
+PAGES_PER_TASK = 25  # PDFs up to this many pages are extracted in-process
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class UnsupportedFormatError(ValueError):
+    """Raised for files that are neither PDF nor plain text."""
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Uploads extract on thread-pool workers; concurrent first calls must share one pool
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 2)
+    return _pool
+
+
+def shutdown_pool():
+    """Stop the extraction worker processes (on application shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def upload_filename(filename: Optional[str]) -> str:
+    """
+    The bare file name of an upload, without any client-side directories.
+
+    Raises:
+        HTTPException: 400 for an empty name or one that is only a path
+    """
+    name = os.path.basename((filename or "").replace("\\", "/")).strip()
+    if name in ("", ".", ".."):
+        raise HTTPException(status_code=400, detail="Upload needs a file name")
+    return name
+
+
+async def save_upload(file: UploadFile, directory: str, max_bytes: int = MAX_UPLOAD_BYTES):
+    """
+    Stream an upload to ``directory`` without holding it in memory.
+
+    The content goes to a temporary file first and replaces the destination
+    only once it is complete, so a rejected or failed upload never touches an
+    existing file of the same name.
+
+    Args:
+        file: Incoming FastAPI upload
+        directory: Destination directory
+        max_bytes: Uploads larger than this are rejected with HTTP 413
+
+    Returns:
+        Tuple of (saved file path, SHA-256 of the content)
+
+    Raises:
+        HTTPException: 400 for a missing file name, 413 for an oversized upload
+    """
+    file_path = os.path.join(directory, upload_filename(file.filename))
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    tmp = tempfile.NamedTemporaryFile(dir=directory, prefix=".upload-", suffix=".tmp", delete=False)
+    try:
+        with tmp:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File exceeds the {max_bytes} byte upload limit")
+                digest.update(chunk)
+                tmp.write(chunk)
+        os.replace(tmp.name, file_path)
+    except BaseException:
+        os.remove(tmp.name)
+        raise
+
+    return file_path, digest.hexdigest()
+
+
+def _extract_page_range(path: str, start: int, end: int) -> str:
+    # Runs in a worker process; each worker opens its own reader
+    reader = PdfReader(path)
+    return "\n".join(reader.pages[i].extract_text() or "" for i in range(start, end))
+
+
+def _extract_pdf(path: str) -> str:
+    page_count = len(PdfReader(path).pages)
+    if page_count <= PAGES_PER_TASK:
+        return _extract_page_range(path, 0, page_count)
+
+    ranges = [(start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK)]
+    pool = _get_pool()
+    futures = [pool.submit(_extract_page_range, path, start, end) for start, end in ranges]
+    return "\n".join(future.result() for future in futures)
+
+
+def extract_text(path: str, digest: Optional[str] = None) -> str:
+    """
+    Extract the text of a .pdf or .txt file, using the hash-keyed cache.
+
+    Args:
+        path: File to read
+        digest: SHA-256 of the file if already known (e.g. from save_upload)
+
+    Returns:
+        The extracted text
+
+    Raises:
+        UnsupportedFormatError: For file types other than .pdf and .txt
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise UnsupportedFormatError(f"Unsupported file format: {extension or path}")
+
+    digest = digest or file_hash(path)
+    cache_path = os.path.join(EXTRACT_CACHE_DIR, f"{digest}.txt")
+    if os.path.exists(cache_path):
+        record_cache("extracted_text", True)
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return f.read()
+    record_cache("extracted_text", False)
+
+    if extension == ".pdf":
+        with track("pdf_extraction"):
+            text = _extract_pdf(path)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+
+    os.makedirs(EXTRACT_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, cache_path)
+    return text
+
@@ -0,0 +1,197 @@
+"""
+Document Index Module
+Persistent vector index of uploaded documents (kept apart from the log index
+in rag_log_analyzer). Documents are chunked, embedded once and deduplicated by
+content hash, so follow-up questions only send the relevant passages to Claude.
+"""
+
+import json
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+from file_lock import file_lock
+from llm_backend import call_claude
+from prompt_builder import Section, build_prompt
+from metrics import track
+from rag_log_analyzer import get_embeddings
+from index_server import remote
+
+# Configuration
+DOC_INDEX_DIR = "doc_embeddings"
+MANIFEST_FILE = os.path.join(DOC_INDEX_DIR, "manifest.json")
+LOCK_FILE = os.path.join(DOC_INDEX_DIR, ".lock")
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+RETRIEVAL_CANDIDATES = 8
+
+DOC_QA_PROMPT = """Answer the question using only the following passages from uploaded documents.
+If the passages do not contain the answer, say so.
+
+Passages:
+{context}
+
+Question: {query}"""
+
+_lock = threading.Lock()
+_db = None
+_manifest = None
+_loaded_version = None  # on-disk version _db and _manifest were read from
+_positions = None  # content hash -> index positions of its chunks
+
+
+def _disk_version():
+    try:
+        stat = os.stat(os.path.join(DOC_INDEX_DIR, "index.faiss"))
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load(locked: bool = False):
+    """
+    Load the index and manifest, and reload them when another worker has
+    saved a newer version. ``locked``: the caller already holds LOCK_FILE.
+    """
+    global _db, _manifest, _loaded_version, _positions
+    if _manifest is not None and _disk_version() == _loaded_version:
+        return
+    if not locked:
+        with file_lock(LOCK_FILE, shared=True):
+            return _load(locked=True)
+
+    version = _disk_version()
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            _manifest = json.load(f)
+    else:
+        _manifest = {}
+    if version is None:
+        _db = None
+    else:
+        from langchain_community.vectorstores import FAISS
+        with track("index_load"):
+            _db = FAISS.load_local(DOC_INDEX_DIR, get_embeddings(), allow_dangerous_deserialization=True)
+    _loaded_version = version
+    _positions = None
+
+
+def _document_positions() -> dict:
+    global _positions
+    if _positions is None:
+        _positions = {}
+        for position, doc_id in _db.index_to_docstore_id.items():
+            digest = _db.docstore.search(doc_id).metadata.get("digest")
+            _positions.setdefault(digest, []).append(position)
+    return _positions
+
+
+@remote
+def warm():
+    """Load the embedding model and the document index ahead of the first request."""
+    get_embeddings()
+    with _lock:
+        _load()
+
+
+@remote
+def list_documents() -> dict:
+    """Indexed documents as {content hash: {"source": filename, "chunks": n}}."""
+    with _lock:
+        _load()
+        return dict(_manifest)
+
+
+@remote
+def add_document(text: str, source: str, digest: str) -> bool:
+    """
+    Chunk, embed and index a document unless the same content is already indexed.
+
+    Args:
+        text: Extracted document text
+        source: Original filename, kept as metadata
+        digest: SHA-256 of the file content, used for deduplication
+
+    Returns:
+        True if the document was indexed, False if it was already present
+    """
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    global _db, _loaded_version, _positions
+    # Workers without the index server share the files: pick up what the others
+    # added before adding to it, or their documents are lost on save
+    with _lock, file_lock(LOCK_FILE):
+        _load(locked=True)
+        if digest in _manifest:
+            print(f"[INFO] Document {source} already indexed as {digest[:12]}")
+            return False
+
+        splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        chunks = splitter.split_text(text)
+        if not chunks:
+            return False
+        docs = [
+            Document(page_content=chunk, metadata={"source": source, "digest": digest, "chunk": i})
+            for i, chunk in enumerate(chunks)
+        ]
+
+        with track("doc_index_build"):
+            if _db is None:
+                _db = FAISS.from_documents(docs, get_embeddings())
+            else:
+                _db.add_documents(docs)
+            _db.save_local(DOC_INDEX_DIR)
+
+        _manifest[digest] = {"source": source, "chunks": len(chunks)}
+        tmp_path = f"{MANIFEST_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_manifest, f, indent=2)
+        os.replace(tmp_path, MANIFEST_FILE)
+        _loaded_version = _disk_version()
+        _positions = None
+
+    print(f"[INFO] Indexed {len(chunks)} chunks of {source}")
+    return True
+
+
+def _search_document(question: str, digest: str, k: int) -> list:
+    # Exact search over this document's chunks only; a filtered search of the whole
+    # index can miss a small document among large ones entirely
+    positions = _document_positions().get(digest)
+    if not positions:
+        return []
+    query = np.asarray(get_embeddings().embed_query(question), dtype=np.float32)
+    vectors = np.vstack([_db.index.reconstruct(position) for position in positions])
+    nearest = np.argsort(((vectors - query) ** 2).sum(axis=1))[:k]
+    return [_db.docstore.search(_db.index_to_docstore_id[positions[i]]) for i in nearest]
+
+
+@remote
+def retrieve(question: str, document_id: Optional[str] = None, k: int = RETRIEVAL_CANDIDATES) -> list:
+    """Return the passages most relevant to the question, optionally from one document only."""
+    with _lock:
+        _load()
+        if _db is None:
+            return []
+        with track("doc_index_search"):
+            if document_id:
+                return _search_document(question, document_id, k)
+            return _db.similarity_search(question, k=k)
+
+
+def ask_document(question: str, document_id: Optional[str] = None) -> str:
+    """Answer a question from the relevant passages of the indexed documents."""
+    docs = retrieve(question, document_id)
+    if not docs:
+        return "No indexed documents match this question. Upload the document first."
+
+    passages = [f"[{d.metadata.get('source')}, part {d.metadata.get('chunk')}]\n{d.page_content}" for d in docs]
+    prompt = build_prompt(DOC_QA_PROMPT, [
+        Section("query", question, required=True),
+        Section("context", chunks=passages),
+    ])
+    return call_claude(prompt)
@@ -0,0 +1,146 @@
+"""
+Document Summarizer Module
+Map-reduce summarization for long documents: the text is split into
+token-bounded sections, the sections are summarized concurrently, and the
+partial summaries are combined (hierarchically if needed) into the final
+summary. Every step goes through the summary cache, so section summaries are
+reused when the same document is summarized again at another detail level.
+"""
+
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from llm_backend import SUMMARY, LLMResult, generate
+from llm_scheduler import propagate_context
+from prompt_builder import CHARS_PER_TOKEN, count_tokens, fit_text
+from summary_cache import get_summary_cache
+
+# Configuration
+SECTION_TOKENS = 8_000  # size of each map step input
+REDUCE_INPUT_TOKENS = 24_000  # partial summaries combined per reduce call
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+
+DETAIL_LEVELS = {
+    "brief": "Write a short summary of one paragraph.",
+    "standard": "Write a clear summary of a few paragraphs covering the main points.",
+    "detailed": "Write a detailed, structured summary with headings that covers every important point, figure and conclusion.",
+}
+
+# Map step: independent of the requested detail level so it can be reused
+SECTION_PROMPT = (
+    "The following is one section of a longer document. Summarize it, keeping the key facts, "
+    "figures, names and conclusions so it can be merged with summaries of the other sections.\n\n{text}"
+)
+SECTION_VERSION = "section-v1"
+
+COMBINE_PROMPT = (
+    "The following are summaries of consecutive parts of one document. "
+    "Merge them into a single summary that keeps every key point.\n\n{text}"
+)
+COMBINE_VERSION = "combine-v1"
+
+FINAL_PROMPT = "Please summarize the following document. {instructions}\n\n{text}"
+FINAL_VERSION = "final-v1"
+
+
+def split_sections(text: str, max_tokens: int = SECTION_TOKENS) -> List[str]:
+    """Split text into sections of at most ``max_tokens``, preferring paragraph boundaries."""
+    sections, current, used = [], [], 0
+    for paragraph in text.split("\n\n"):
+        cost = count_tokens(paragraph) + 1
+        if cost > max_tokens:
+            # A single oversized paragraph is cut into fixed-size pieces
+            if current:
+                sections.append("\n\n".join(current))
+                current, used = [], 0
+            piece_chars = int(max_tokens * CHARS_PER_TOKEN)
+            sections.extend(paragraph[i:i + piece_chars] for i in range(0, len(paragraph), piece_chars))
+            continue
+        if used + cost > max_tokens and current:
+            sections.append("\n\n".join(current))
+            current, used = [], 0
+        current.append(paragraph)
+        used += cost
+    if current:
+        sections.append("\n\n".join(current))
+    return [s for s in sections if s.strip()]
+
+
+def _group(parts: List[str], max_tokens: int) -> List[List[str]]:
+    groups, current, used = [], [], 0
+    for part in parts:
+        cost = count_tokens(part) + 1
+        if used + cost > max_tokens and current:
+            groups.append(current)
+            current, used = [], 0
+        current.append(part)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _successful(results: List[LLMResult], what: str):
+    """(texts of the successful results, first error message); failed results are skipped."""
+    failed = [r for r in results if not r.ok]
+    if failed and len(failed) < len(results):
+        print(f"[WARNING] {len(failed)} of {len(results)} {what} failed and were skipped")
+    return [r.text for r in results if r.ok], failed[0].text if failed else None
+
+
+def summarize_document(
+    text: str,
+    detail: str = "standard",
+    llm: Callable[[str], LLMResult] = functools.partial(generate, task=SUMMARY),
+    concurrency: int = SUMMARY_CONCURRENCY,
+) -> str:
+    """
+    Summarize a document of any length.
+
+    Args:
+        text: Full document text
+        detail: One of DETAIL_LEVELS ("brief", "standard", "detailed")
+        llm: Function that sends a prompt and returns an LLMResult
+        concurrency: Maximum number of LLM calls in flight
+
+    Returns:
+        The final summary
+    """
+    if detail not in DETAIL_LEVELS:
+        raise ValueError(f"Unknown detail level '{detail}', expected one of {list(DETAIL_LEVELS)}")
+
+    cache = get_summary_cache()
+    final_prompt = FINAL_PROMPT.replace("{instructions}", DETAIL_LEVELS[detail])
+    final_version = f"{FINAL_VERSION}-{detail}"
+
+    sections = split_sections(text)
+    if len(sections) <= 1:
+        return cache.summarize(text, final_prompt, final_version, llm=llm).text
+
+    print(f"[INFO] Summarizing {len(sections)} sections ({count_tokens(text)} tokens) with {concurrency} workers")
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        # Map: section summaries, cached independently of the detail level
+        partials, error = _successful(list(pool.map(
+            propagate_context(lambda s: cache.summarize(s, SECTION_PROMPT, SECTION_VERSION, llm=llm)), sections
+        )), "section summaries")
+        if not partials:
+            return error
+
+        # Reduce: merge groups of partial summaries until they fit in one call
+        while count_tokens("\n\n".join(partials)) > REDUCE_INPUT_TOKENS:
+            groups = _group(partials, REDUCE_INPUT_TOKENS)
+            if len(groups) == len(partials):
+                # Every partial is already too large to pair up; cut them down instead
+                partials = [fit_text(p, REDUCE_INPUT_TOKENS // len(partials)) for p in partials]
+                break
+            # A failed merge is an error message, not a summary: never feed it to the next level
+            partials, error = _successful(list(pool.map(propagate_context(
+                lambda g: cache.summarize("\n\n".join(g), COMBINE_PROMPT, COMBINE_VERSION, llm=llm)
+            ), groups)), "combined summaries")
+            if not partials:
+                return error
+
+    combined = "\n\n".join(f"Part {i + 1}:\n{p}" for i, p in enumerate(partials))
+    return cache.summarize(combined, final_prompt, final_version, llm=llm).text
@@ -0,0 +1,109 @@
+"""
+Encoder Backend Module
+Loads the all-MiniLM-L6-v2 sentence encoder with a selectable CPU inference
+backend and exposes it to LangChain, so the training store, the query router
+and the log/document indexes share one model instance.
+
+Backends (``EMBEDDING_BACKEND``):
+    torch       PyTorch, the reference implementation (default)
+    onnx        ONNX Runtime export of the same model
+    onnx-int8   ONNX Runtime with dynamically int8-quantized weights
+
+All backends run the model's own pooling and normalization modules, so only
+the transformer forward pass differs. ``compare_backends`` checks the
+embeddings numerically against the torch path.
+
+The ONNX backends need ``optimum[onnxruntime]``.
+"""
+
+import glob
+import os
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from metrics import track
+
+# Configuration
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+BACKENDS = ("torch", "onnx", "onnx-int8")
+ONNX_EXPORT_DIR = "onnx_models"  # quantized exports, created on first use
+ONNX_QUANTIZATION = os.getenv("ONNX_QUANTIZATION", "avx2")  # arm64, avx2, avx512 or avx512_vnni
+ENCODE_BATCH_SIZE = 64
+
+
+def load_encoder(backend: str = None):
+    """
+    Load the MiniLM SentenceTransformer with the given inference backend.
+
+    Args:
+        backend: One of BACKENDS, defaults to EMBEDDING_BACKEND
+
+    Returns:
+        A SentenceTransformer whose ``encode`` behaves the same for every backend
+    """
+    from sentence_transformers import SentenceTransformer
+
+    backend = backend or EMBEDDING_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {BACKENDS}")
+
+    with track("model_load"):
+        if backend == "torch":
+            model = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+        elif backend == "onnx":
+            model = SentenceTransformer(EMBEDDING_MODEL, device="cpu", backend="onnx")
+        else:
+            model = _load_quantized()
+    print(f"[INFO] Loaded {EMBEDDING_MODEL} with the {backend} backend")
+    return model
+
+
+def _load_quantized():
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    export_dir = os.path.join(ONNX_EXPORT_DIR, f"all-MiniLM-L6-v2-int8-{ONNX_QUANTIZATION}")
+    pattern = os.path.join(export_dir, "onnx", f"model_*{ONNX_QUANTIZATION}*.onnx")
+
+    if not glob.glob(pattern):
+        # Export once: save the ONNX model with its pooling/normalization config, then quantize it
+        print(f"[INFO] Exporting int8 ONNX encoder ({ONNX_QUANTIZATION}) to {export_dir}")
+        model = SentenceTransformer(EMBEDDING_MODEL, device="cpu", backend="onnx")
+        model.save(export_dir)
+        export_dynamic_quantized_onnx_model(model, ONNX_QUANTIZATION, export_dir)
+
+    file_name = os.path.relpath(sorted(glob.glob(pattern))[0], export_dir)
+    return SentenceTransformer(export_dir, device="cpu", backend="onnx", model_kwargs={"file_name": file_name})
+
+
+class EncoderEmbeddings(Embeddings):
+    """LangChain embeddings backed by a shared SentenceTransformer, normalized like the original HuggingFaceEmbeddings."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(list(texts), normalize_embeddings=True, batch_size=ENCODE_BATCH_SIZE)
+        return np.asarray(vectors, dtype=np.float32).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def compare_backends(reference, candidate, sentences: List[str]) -> dict:
+    """
+    Compare the embeddings of two encoders on the same sentences.
+
+    Returns:
+        Minimum and mean cosine similarity and the largest absolute difference
+    """
+    a = np.asarray(reference.encode(sentences, normalize_embeddings=True), dtype=np.float32)
+    b = np.asarray(candidate.encode(sentences, normalize_embeddings=True), dtype=np.float32)
+    cosine = np.sum(a * b, axis=1)
+    return {
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "max_abs_diff": float(np.abs(a - b).max()),
+    }
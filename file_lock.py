@@ -0,0 +1,28 @@
+"""
+File Lock Module
+Advisory locks for files on disk that several API worker processes update.
+Without the index server each worker keeps its own copy of an index, so a
+worker reloads the saved copy under the lock before changing and saving it.
+"""
+
+import fcntl
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False):
+    """
+    Hold an ``flock`` on ``path`` (created if missing) for the duration of the block.
+
+    Args:
+        path: Lock file, usually next to the data it protects
+        shared: Take a shared (reader) lock instead of an exclusive one
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
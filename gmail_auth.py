@@ -1,9 +1,6 @@
 # gmail_auth.py
 import os.path
 import pickle
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 
 # Scopes: Full Gmail access
 #SCOPES = ['https://www.googleapis.com/auth/gmail.send']
@@ -15,6 +12,11 @@ MAIL_CREDENTIALS = 'credentials_rh_mail.json'
 
 
 def get_gmail_service():
+    # The Google client libraries are slow to import; load them on first use
+    from google.auth.transport.requests import Request
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+
     creds = None
 
     # Load token if available
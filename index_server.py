@@ -0,0 +1,221 @@
+"""
+Index Server Module
+Optional sidecar process that owns the embedding model, the log and document
+vector indexes and the training store, so that several API workers
+(``uvicorn --workers N``) share one copy of each instead of loading their own.
+
+Workers reach it over a Unix socket. Functions decorated with ``@remote`` run
+in the sidecar when ``INDEX_SERVER_SOCKET`` is set and locally otherwise, so
+single-process deployments need no extra setup.
+
+Requests are pickled, so only this user may talk to the server: the socket
+lives in a directory only its owner can enter, and connections must prove
+the authkey (``INDEX_SERVER_AUTHKEY``, or a random key the server writes to
+``<socket>.key`` for the workers to read).
+
+Usage:
+    python index_server.py  # prints the socket path, by default $XDG_RUNTIME_DIR/ai-agent-<uid>/index.sock
+    INDEX_SERVER_SOCKET=<socket path> uvicorn main_fastapi:app --workers 4
+"""
+
+import argparse
+import os
+import secrets
+import stat
+import tempfile
+import threading
+import time
+from functools import wraps
+from multiprocessing.connection import Client, Listener
+
+from metrics import track
+
+# Configuration
+INDEX_SERVER_SOCKET = os.getenv("INDEX_SERVER_SOCKET")  # unset: everything runs in-process
+INDEX_SERVER_AUTHKEY = os.getenv("INDEX_SERVER_AUTHKEY")  # unset: the server generates one
+DEFAULT_SOCKET = os.path.join(os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir(), f"ai-agent-{os.getuid()}", "index.sock")
+CONNECT_TIMEOUT = 60  # seconds to wait for the sidecar socket to appear
+
+_operations = {}  # operation name -> (function, send_result)
+_serving = False  # True inside the sidecar, where remote functions run locally
+_local = threading.local()
+
+
+def enabled() -> bool:
+    """True when calls should be forwarded to the sidecar."""
+    return bool(INDEX_SERVER_SOCKET) and not _serving
+
+
+def _key_file(socket_path: str) -> str:
+    return f"{socket_path}.key"
+
+
+def _check_private_dir(directory: str):
+    """Refuse a socket directory that another user could enter or write to."""
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(
+            f"Index server directory {directory} must be a directory owned by this user with mode 0700"
+        )
+
+
+def _authkey(socket_path: str) -> bytes:
+    if INDEX_SERVER_AUTHKEY:
+        return INDEX_SERVER_AUTHKEY.encode()
+    with open(_key_file(socket_path), "rb") as f:
+        return f.read()
+
+
+def remote(func=None, *, send_result: bool = True):
+    """
+    Run the decorated function in the index server when one is configured.
+
+    Args:
+        send_result: Set to False for functions whose return value (e.g. a
+            FAISS store) only matters in-process; remote callers get None.
+    """
+    def decorate(f):
+        name = f"{f.__module__}.{f.__qualname__}"
+        _operations[name] = (f, send_result)
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if enabled():
+                return call(name, *args, **kwargs)
+            return f(*args, **kwargs)
+
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+# --------------------------------- client ---------------------------------
+
+def _connect():
+    deadline = time.monotonic() + CONNECT_TIMEOUT
+    while True:
+        try:
+            # Never talk to a socket (or trust a key file) in a directory someone else controls
+            _check_private_dir(os.path.dirname(os.path.abspath(INDEX_SERVER_SOCKET)))
+            return Client(INDEX_SERVER_SOCKET, family="AF_UNIX", authkey=_authkey(INDEX_SERVER_SOCKET))
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() > deadline:
+                raise ConnectionError(f"Index server is not listening on {INDEX_SERVER_SOCKET}")
+            time.sleep(0.2)
+
+
+def call(name: str, *args, **kwargs):
+    """Run an operation in the sidecar and return its result (one connection per thread)."""
+    with track("index_server"):
+        conn = getattr(_local, "conn", None)
+        try:
+            if conn is None:
+                conn = _local.conn = _connect()
+            conn.send((name, args, kwargs))
+        except (OSError, EOFError):
+            # Stale connection (e.g. the sidecar restarted): nothing was sent, so retry once
+            conn = _local.conn = _connect()
+            conn.send((name, args, kwargs))
+
+        try:
+            ok, result = conn.recv()
+        except (OSError, EOFError) as e:
+            _local.conn = None
+            raise ConnectionError(f"Index server connection lost during {name}: {str(e)}")
+
+    if not ok:
+        raise result
+    return result
+
+
+# --------------------------------- server ---------------------------------
+
+def _handle(conn):
+    with conn:
+        while True:
+            try:
+                name, args, kwargs = conn.recv()
+            except (EOFError, OSError):
+                return
+
+            try:
+                if name not in _operations:
+                    raise ValueError(f"Unknown index server operation: {name}")
+                func, send_result = _operations[name]
+                result = func(*args, **kwargs)
+                reply = (True, result if send_result else None)
+            except Exception as e:
+                reply = (False, e)
+
+            try:
+                conn.send(reply)
+            except Exception as e:
+                # Unpicklable result or exception
+                conn.send((False, RuntimeError(f"{name} failed: {str(e)}")))
+
+
+def _listen(socket_path: str) -> Listener:
+    # Everything created from here on (directory, key file, socket) is private
+    # from the start, rather than tightened after another user could open it
+    previous_umask = os.umask(0o077)
+    try:
+        directory = os.path.dirname(os.path.abspath(socket_path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        _check_private_dir(directory)
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        if INDEX_SERVER_AUTHKEY:
+            authkey = INDEX_SERVER_AUTHKEY.encode()
+        else:
+            authkey = secrets.token_hex(32).encode()
+            fd = os.open(_key_file(socket_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(authkey)
+        return Listener(socket_path, family="AF_UNIX", authkey=authkey)
+    finally:
+        os.umask(previous_umask)
+
+
+def serve(socket_path: str):
+    """Load the models and indexes, then answer worker requests until interrupted."""
+    global _serving
+    _serving = True
+
+    # Importing the modules registers their remote operations
+    import training_store
+    import rag_log_analyzer
+    import doc_index
+
+    started = time.perf_counter()
+    training_store.get_model()
+    doc_index.warm()
+    if rag_log_analyzer.has_log_index():
+        rag_log_analyzer.get_qa_chain()
+    print(f"[INFO] Index server loaded models and indexes in {time.perf_counter() - started:.1f}s")
+
+    listener = _listen(socket_path)
+    print(f"[INFO] Index server listening on {socket_path} ({len(_operations)} operations)")
+
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # e.g. a client with the wrong authkey
+                print(f"[WARNING] Rejected index server connection: {str(e)}")
+                continue
+            threading.Thread(target=_handle, args=(conn,), name="index-server-conn", daemon=True).start()
+    finally:
+        listener.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared embedding and index server for API workers")
+    parser.add_argument("--socket", default=INDEX_SERVER_SOCKET or DEFAULT_SOCKET)
+    args = parser.parse_args()
+
+    # Serve from the importable module, not __main__, so the operations the
+    # other modules register and the _serving flag live in the same namespace
+    import index_server
+    index_server.serve(args.socket)
@@ -0,0 +1,141 @@
+"""
+Intent Parser Module
+Deterministic fast path for queries whose tool and arguments can be read
+straight off the text ("add 3 and 5", "weather in Paris", "mark the email with
+subject 'x' as read", ...). Only fully matched queries are handled here;
+anything else returns None and goes to the LLM as before.
+"""
+
+import re
+from typing import Optional
+
+
+_NUM = r"-?\d+(?:\.\d+)?"
+_NUM_LIST = rf"{_NUM}(?:\s*(?:,\s*and|,|and|\+|&)\s*{_NUM})+"
+_MUL_LIST = rf"{_NUM}(?:\s*(?:,\s*and|,|and|by|with|times|\*|x)\s*{_NUM})+"
+_QUOTED = r"['\"“‘](?P<subject>.+?)['\"”’]"
+_EMAIL = r"(?:the\s+)?(?:e-?mail|mail|message)\s+(?:with\s+)?(?:the\s+)?subject(?:\s+line)?\s*:?\s*"
+
+_ADD = re.compile(rf"(?:please\s+)?(?:add(?:\s+up)?|sum(?:\s+up)?|what(?:'s|\s+is)\s+the\s+sum\s+of)\s+(?P<nums>{_NUM_LIST})", re.I)
+_MULTIPLY = re.compile(rf"(?:please\s+)?(?:multiply|what(?:'s|\s+is)\s+the\s+product\s+of)\s+(?P<nums>{_MUL_LIST})", re.I)
+_SUBTRACT = re.compile(rf"(?:please\s+)?subtract\s+(?P<b>{_NUM})\s+from\s+(?P<a>{_NUM})", re.I)
+_DIVIDE = re.compile(rf"(?:please\s+)?divide\s+(?P<a>{_NUM})\s+by\s+(?P<b>{_NUM})", re.I)
+_EXPRESSION = re.compile(
+    rf"(?:what(?:'s|\s+is)\s+|calculate\s+|compute\s+)?(?P<a>{_NUM})\s*"
+    rf"(?P<op>\+|-|\*|/|x|×|÷|plus|minus|times|multiplied\s+by|divided\s+by)\s*(?P<b>{_NUM})",
+    re.I,
+)
+_WEATHER = re.compile(
+    r"(?:(?:what(?:'s|\s+is)|how(?:'s|\s+is)|get|show(?:\s+me)?|tell\s+me)\s+)?(?:the\s+)?(?:current\s+)?"
+    r"weather(?:\s+like)?\s+(?:in|for|at)\s+(?P<city>[^\W\d_][\w .'-]*?)"
+    r"(?:\s+(?:today|now|right\s+now|currently|at\s+the\s+moment))?",
+    re.I,
+)
+# Words that never belong to a city name: anything the lazy city group swallowed beyond
+# the trailing words _WEATHER allows (dates, periods, units) needs the LLM
+_NOT_A_CITY = re.compile(
+    r"\b(?:today|tonight|tomorrow|yesterday|now|next|this|last|coming|later|week|weekend|month|year|"
+    r"morning|afternoon|evening|hourly|daily|forecast|monday|tuesday|wednesday|thursday|friday|saturday|sunday|"
+    r"in|on|at|for|during|by|with|fahrenheit|celsius|kelvin|degrees?|metric|imperial|units?)\b",
+    re.I,
+)
+_MARK_EMAIL = re.compile(rf"(?:please\s+)?mark\s+{_EMAIL}{_QUOTED}\s+as\s+(?P<state>read|unread)", re.I)
+_SUMMARIZE_EMAIL = re.compile(
+    rf"(?:please\s+)?(?:summari[sz]e|give\s+me\s+a\s+summary\s+of)\s+{_EMAIL}{_QUOTED}", re.I
+)
+_EVENTS = re.compile(
+    r"(?:(?:show|list|fetch|display|get|what\s+are)\s+)(?:me\s+)?(?:the\s+|my\s+|all\s+)?(?:calendar\s+)?"
+    r"(?:events|meetings|appointments)\s+(?:for|on|scheduled\s+for)\s+(?P<when>.+)",
+    re.I,
+)
+
+_OPERATORS = {
+    "+": "add", "plus": "add",
+    "-": "subtract", "minus": "subtract",
+    "*": "multiply", "x": "multiply", "×": "multiply", "times": "multiply", "multiplied by": "multiply",
+    "/": "divide", "÷": "divide", "divided by": "divide",
+}
+
+
+def _to_number(text: str):
+    return float(text) if "." in text else int(text)
+
+
+def _numbers(text: str) -> list:
+    return [_to_number(n) for n in re.findall(_NUM, text)]
+
+
+def _resolve_date(phrase: str) -> Optional[str]:
+    import dateparser  # slow to import, only needed for date phrases
+
+    parsed = dateparser.parse(phrase, settings={"PREFER_DATES_FROM": "future"})
+    return parsed.strftime("%Y-%m-%d") if parsed else None
+
+
+def parse_intent(user_query: str) -> Optional[dict]:
+    """
+    Map an unambiguous query to a tool call without asking the LLM.
+
+    Args:
+        user_query: Raw user input
+
+    Returns:
+        ``{"tool": name, "args": {...}}`` in the same shape the LLM returns,
+        or None when the query needs the LLM
+    """
+    text = re.sub(r"\s+", " ", user_query).strip().rstrip(".!?").strip()
+    if not text:
+        return None
+
+    m = _ADD.fullmatch(text)
+    if m:
+        return {"tool": "add_numbers", "args": {"numbers": _numbers(m.group("nums"))}}
+
+    m = _MULTIPLY.fullmatch(text)
+    if m:
+        return {"tool": "multiply", "args": {"numbers": _numbers(m.group("nums"))}}
+
+    m = _SUBTRACT.fullmatch(text)
+    if m:
+        return {"tool": "subtract", "args": {"a": _to_number(m.group("a")), "b": _to_number(m.group("b"))}}
+
+    m = _DIVIDE.fullmatch(text)
+    if m:
+        return {"tool": "divide", "args": {"a": _to_number(m.group("a")), "b": _to_number(m.group("b"))}}
+
+    m = _EXPRESSION.fullmatch(text)
+    if m:
+        op = _OPERATORS[re.sub(r"\s+", " ", m.group("op").lower())]
+        a, b = _to_number(m.group("a")), _to_number(m.group("b"))
+        if op == "add":
+            return {"tool": "add_numbers", "args": {"numbers": [a, b]}}
+        if op == "multiply":
+            return {"tool": "multiply", "args": {"numbers": [a, b]}}
+        return {"tool": op, "args": {"a": a, "b": b}}
+
+    m = _MARK_EMAIL.fullmatch(text)
+    if m:
+        return {
+            "tool": "mark_email",
+            "args": {"mail_sub": m.group("subject"), "mark_as_read": m.group("state").lower() == "read"},
+        }
+
+    m = _SUMMARIZE_EMAIL.fullmatch(text)
+    if m:
+        return {"tool": "summarize_email", "args": {"subject": m.group("subject")}}
+
+    m = _WEATHER.fullmatch(text)
+    if m:
+        city = m.group("city").strip()
+        # "Paris and London" or "Paris, London" is a compound request, "Paris tomorrow" or
+        # "London in fahrenheit" asks for more than current conditions: leave those to the LLM
+        if not re.search(r",|\band\b|&", city) and not _NOT_A_CITY.search(city):
+            return {"tool": "get_weather", "args": {"city": city}}
+
+    m = _EVENTS.fullmatch(text)
+    if m:
+        date = _resolve_date(m.group("when"))
+        if date:
+            return {"tool": "get_events_by_date", "args": {"date": date}}
+
+    return None
@@ -0,0 +1,374 @@
+"""
+LLM Backend Module
+One entry point for every LLM call. Calls name a task instead of a client
+module; the task picks a model tier (a small, fast model for tool selection
+and query routing, a larger one for PR reviews) and the call goes to the
+first healthy backend:
+
+    cli   Claude CLI subprocesses (claude_cli_client)
+    api   Claude API over a pooled HTTP connection (claude_client), used when
+          ANTHROPIC_API_KEY is set
+
+A backend that fails hands the call to the next one, a circuit breaker takes
+a backend out of rotation after repeated failures, and with
+``LLM_HEDGE_AFTER`` set a call that is still running after that many seconds
+is sent to the next backend too; the first good answer wins.
+"""
+
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+from typing import Callable, Iterator, NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+import metrics
+from llm_scheduler import LLMOverloaded, propagate_context
+from tool_schemas import parse_tool_reply, render_tools_prompt, tool_reply_schema
+
+load_dotenv()
+
+# Configuration
+LLM_BACKENDS = [name.strip() for name in os.getenv("LLM_BACKENDS", "cli,api").split(",") if name.strip()]
+HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))  # seconds; 0 disables hedging
+BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))  # consecutive failures that open the circuit
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))  # seconds before a trial call is let through
+HEDGE_WORKERS = 16
+# Pass the tool reply schema to the CLI as --json-schema (needs a CLI version that supports it)
+CLI_JSON_SCHEMA = os.getenv("CLAUDE_CLI_JSON_SCHEMA", "false").lower() in ("1", "true", "yes")
+
+# Tasks
+CHAT = "chat"
+TOOL_SELECTION = "tool_selection"
+ROUTING = "routing"
+SUMMARY = "summary"
+REVIEW = "review"
+
+TASK_TIERS = {
+    TOOL_SELECTION: "small",
+    ROUTING: "small",
+    CHAT: "default",
+    SUMMARY: "default",
+    REVIEW: "large",
+}
+
+# Model per backend and tier; the CLI takes aliases, the API full model ids
+MODELS = {
+    "cli": {
+        "small": os.getenv("LLM_CLI_MODEL_SMALL", "haiku"),
+        "default": os.getenv("LLM_CLI_MODEL", "sonnet"),
+        "large": os.getenv("LLM_CLI_MODEL_LARGE", "opus"),
+    },
+    "api": {
+        "small": os.getenv("LLM_API_MODEL_SMALL", "claude-3-5-haiku-20241022"),
+        "default": os.getenv("LLM_API_MODEL", "claude-3-5-sonnet-20241022"),
+        "large": os.getenv("LLM_API_MODEL_LARGE", "claude-opus-4-20250514"),
+    },
+}
+
+
+# Backends signal a failed call by raising; the router turns it into failover
+# and, once every backend failed, into an "Error..." response
+
+
+class CLIBackend:
+    name = "cli"
+
+    def complete(self, prompt: str, system_prompt: Optional[str], model: str, temperature: float, max_tokens: int) -> str:
+        from claude_cli_client import complete_claude_cli
+
+        # The CLI has no temperature or max_tokens options
+        if system_prompt:
+            prompt = f"{system_prompt}\n\n{prompt}"
+        return complete_claude_cli(prompt, model=model)
+
+    def complete_tools(self, prompt: str, system_prompt: Optional[str], tools: list, model: str) -> dict:
+        from claude_cli_client import complete_claude_cli
+
+        # No native tool use: the catalogue goes into the prompt and the reply is one JSON object
+        parts = [system_prompt, render_tools_prompt(tools), prompt] if system_prompt else [render_tools_prompt(tools), prompt]
+        schema = tool_reply_schema(tools) if CLI_JSON_SCHEMA else None
+        response = complete_claude_cli("\n\n".join(parts), model=model, json_schema=schema)
+        return parse_tool_reply(response)
+
+
+class APIBackend:
+    name = "api"
+
+    @staticmethod
+    def configured() -> bool:
+        return bool(os.getenv("ANTHROPIC_API_KEY"))
+
+    def complete(self, prompt: str, system_prompt: Optional[str], model: str, temperature: float, max_tokens: int) -> str:
+        from claude_client import complete_claude
+
+        return complete_claude(prompt, system_prompt, temperature, max_tokens, model=model)
+
+    def complete_tools(self, prompt: str, system_prompt: Optional[str], tools: list, model: str) -> dict:
+        from claude_client import complete_claude_with_tools
+
+        return complete_claude_with_tools(prompt, tools, system_prompt, model=model)
+
+
+BACKEND_TYPES = {"cli": CLIBackend, "api": APIBackend}
+
+
+class CircuitBreaker:
+    """
+    Opens after ``threshold`` consecutive failures. While open, one trial call
+    is let through per ``cooldown``; its success closes the circuit again.
+    """
+
+    def __init__(self, name: str, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.opened_at = time.monotonic()  # next trial only after another cooldown
+            return True
+
+    def record(self, ok: bool):
+        with self._lock:
+            if ok:
+                if self.opened_at is not None:
+                    print(f"[INFO] LLM backend {self.name} recovered, circuit closed")
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if self.failures >= self.threshold and self.opened_at is None:
+                    print(f"[WARNING] LLM backend {self.name} failed {self.failures} times in a row, circuit open")
+                    self.opened_at = time.monotonic()
+            metrics.LLM_BREAKER_OPEN.labels(self.name).set(0 if self.opened_at is None else 1)
+
+
+class _Outcome(NamedTuple):
+    ok: bool
+    response: object  # text, or a tool decision dict
+    error: Optional[Exception] = None
+    model: Optional[str] = None  # model that answered
+
+
+class LLMResult(NamedTuple):
+    """A completion together with how it was produced."""
+
+    text: str  # the answer, or an "Error..." message
+    ok: bool
+    model: Optional[str]  # model that answered; None when every backend failed
+
+
+def _describe(response) -> str:
+    return response["content"] if isinstance(response, dict) else response
+
+
+class LLMRouter:
+    """Sends each call to the first healthy backend, with failover and optional hedging."""
+
+    def __init__(self, backends: list, hedge_after: float = HEDGE_AFTER):
+        self.backends = backends
+        self.breakers = {backend.name: CircuitBreaker(backend.name) for backend in backends}
+        self.hedge_after = hedge_after
+        # Threads start on the first submit, so routers that never hedge cost nothing
+        self._pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="llm-hedge")
+
+    def _available(self) -> Iterator:
+        # Lazy, so a half-open breaker only spends its trial on a call that is actually made
+        for backend in self.backends:
+            if self.breakers[backend.name].allow():
+                yield backend
+
+    def _attempt(self, backend, tier: str, invoke: Callable, error: Callable) -> _Outcome:
+        model = MODELS[backend.name][tier]
+        try:
+            response = invoke(backend, model)
+        except LLMOverloaded as e:
+            # A full queue says nothing about the backend's health
+            return _Outcome(False, error(str(e)), e)
+        except Exception as e:
+            print(f"[ERROR] LLM backend {backend.name} raised: {e}")
+            self.breakers[backend.name].record(False)
+            return _Outcome(False, error(f"Error calling LLM backend {backend.name}: {e}"), e)
+
+        self.breakers[backend.name].record(True)
+        return _Outcome(True, response, model=model)
+
+    def _hedged(self, attempt: Callable, primary, candidates: Iterator) -> _Outcome:
+        first = self._pool.submit(propagate_context(attempt), primary)
+        try:
+            # Answered (or failed, then the caller fails over) within the hedge delay
+            return first.result(timeout=self.hedge_after)
+        except FutureTimeout:
+            pass
+
+        backup = next(candidates, None)
+        if backup is None:
+            return first.result()
+        print(f"[INFO] LLM call on {primary.name} still running after {self.hedge_after}s, hedging on {backup.name}")
+        second = self._pool.submit(propagate_context(attempt), backup)
+
+        outcome = None
+        for future in as_completed([first, second]):
+            outcome = future.result()
+            if outcome.ok:
+                # The slower call finishes in the background; its result is dropped
+                metrics.LLM_HEDGED.labels("primary" if future is first else "hedge").inc()
+                return outcome
+        return outcome
+
+    def _route(self, task: str, invoke: Callable, error: Callable) -> _Outcome:
+        """
+        Run ``invoke(backend, model)`` on the first healthy backend, failing
+        over (and hedging) as configured. ``error(message)`` builds the
+        response of the outcome when every backend failed.
+
+        Raises:
+            LLMOverloaded: Every backend tried was saturated
+        """
+        tier = TASK_TIERS.get(task, "default")
+        candidates = self._available()
+        primary = next(candidates, None)
+        if primary is None:
+            return _Outcome(False, error("Error: all LLM backends are unavailable (circuit open)"))
+
+        attempt = functools.partial(self._attempt, tier=tier, invoke=invoke, error=error)
+        outcome = self._hedged(attempt, primary, candidates) if self.hedge_after > 0 else attempt(primary)
+
+        for backend in candidates:
+            if outcome.ok:
+                break
+            print(f"[WARNING] LLM call failed ({_describe(outcome.response)[:200]}), failing over to {backend.name}")
+            metrics.LLM_FAILOVERS.labels(backend.name).inc()
+            outcome = attempt(backend)
+
+        if not outcome.ok and isinstance(outcome.error, LLMOverloaded):
+            raise outcome.error
+        return outcome
+
+    def generate(
+        self,
+        prompt: str,
+        task: str = CHAT,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+    ) -> LLMResult:
+        """Run one LLM call for ``task`` and report whether it succeeded and which model answered."""
+        outcome = self._route(
+            task,
+            lambda backend, model: backend.complete(prompt, system_prompt, model, temperature, max_tokens),
+            lambda message: message,
+        )
+        return LLMResult(outcome.response, outcome.ok, outcome.model)
+
+    def complete(
+        self,
+        prompt: str,
+        task: str = CHAT,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+    ) -> str:
+        """
+        Run one LLM call for ``task``.
+
+        Returns:
+            The response text, or an "Error..." message if every backend failed
+        """
+        return self.generate(prompt, task, system_prompt, temperature, max_tokens).text
+
+    def complete_tools(self, prompt: str, tools: list, system_prompt: Optional[str] = None, task: str = TOOL_SELECTION) -> dict:
+        """
+        Let the model pick a tool for ``prompt`` or answer it directly, in one call.
+
+        Returns:
+            {"type": "tool_use", "tool_calls": [{"name", "input"}, ...]},
+            {"type": "text", "content": answer} or {"type": "error", "content": message}
+        """
+        return self._route(
+            task,
+            lambda backend, model: backend.complete_tools(prompt, system_prompt, tools, model),
+            lambda message: {"type": "error", "content": message},
+        ).response
+
+    def model_for(self, task: str) -> str:
+        """Model the first configured backend uses for ``task``."""
+        return self.models_for(task)[0]
+
+    def models_for(self, task: str) -> list:
+        """Models that may answer ``task``, in failover order."""
+        tier = TASK_TIERS.get(task, "default")
+        return list(dict.fromkeys(MODELS[backend.name][tier] for backend in self.backends))
+
+
+_default_router = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> LLMRouter:
+    """Return the process-wide router over LLM_BACKENDS, creating it on first use."""
+    global _default_router
+    if _default_router is None:
+        # One router per process: its circuit breakers and latency stats must be shared
+        with _router_lock:
+            if _default_router is None:
+                backends = []
+                for name in LLM_BACKENDS:
+                    if name not in BACKEND_TYPES:
+                        raise ValueError(f"Unknown LLM backend {name!r}, expected one of {list(BACKEND_TYPES)}")
+                    if name == "api" and not APIBackend.configured():
+                        print("[INFO] ANTHROPIC_API_KEY not set, LLM API backend disabled")
+                        continue
+                    backends.append(BACKEND_TYPES[name]())
+                _default_router = LLMRouter(backends or [CLIBackend()])
+                print(f"[INFO] LLM backends: {[backend.name for backend in _default_router.backends]}")
+    return _default_router
+
+
+def call_llm(prompt: str, task: str = CHAT) -> str:
+    """Main LLM calling function."""
+    return get_router().complete(prompt, task)
+
+
+def call_claude(
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 4096,
+    task: str = CHAT,
+) -> str:
+    """call_llm with a system prompt and sampling options."""
+    return get_router().complete(prompt, task, system_prompt, temperature, max_tokens)
+
+
+def generate(prompt: str, task: str = CHAT) -> LLMResult:
+    """call_llm that also reports success and the model that answered."""
+    return get_router().generate(prompt, task)
+
+
+def call_tools(prompt: str, tools: list, system_prompt: Optional[str] = None, task: str = TOOL_SELECTION) -> dict:
+    """Structured tool selection: one LLM round trip that calls a tool or answers directly."""
+    return get_router().complete_tools(prompt, tools, system_prompt, task)
+
+
+def for_task(task: str) -> Callable[[str], str]:
+    """A ``prompt -> response`` function for ``task``, for code that takes an ``llm`` callable."""
+    return functools.partial(call_llm, task=task)
+
+
+def model_for(task: str) -> str:
+    return get_router().model_for(task)
+
+
+def models_for(task: str) -> list:
+    return get_router().models_for(task)
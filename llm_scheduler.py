@@ -0,0 +1,227 @@
+"""
+LLM Scheduler Module
+Admission control for LLM calls. Every backend (Claude CLI subprocesses,
+Claude API) gets a concurrency limit and a bounded priority queue:
+
+- interactive work (``/ask`` and friends) is served before batch work (PR
+  reviews, batch endpoints),
+- every call carries a deadline and work whose deadline passed while queued
+  is dropped instead of being run,
+- when a queue is full the call is rejected at once with ``LLMOverloaded``,
+  which the API turns into 429 with ``Retry-After``; an expired deadline
+  becomes a 503.
+
+Priority and deadline come from the caller's context (``request_context``),
+so call sites don't need extra parameters.
+"""
+
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+import metrics
+
+# Priority classes, lower runs first
+INTERACTIVE = 0
+DEFAULT = 1
+BATCH = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", DEFAULT: "default", BATCH: "batch"}
+
+# Configuration
+BACKEND_LIMITS = {
+    "cli": int(os.getenv("LLM_CONCURRENCY_CLI", "4")),  # concurrent claude subprocesses
+    "api": int(os.getenv("LLM_CONCURRENCY_API", "8")),
+}
+MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))  # waiting calls per backend
+BATCH_QUEUE_SHARE = 0.5  # batch work may only fill this share of the queue
+DEFAULT_DEADLINE = 300  # seconds, for calls outside any request context
+INITIAL_CALL_SECONDS = 10.0  # call duration estimate before any call finished
+
+_priority = ContextVar("llm_priority", default=DEFAULT)
+_deadline = ContextVar("llm_deadline", default=None)  # absolute time.monotonic() value
+
+
+class LLMOverloaded(Exception):
+    """The LLM queue is full; retry after ``retry_after`` seconds."""
+
+    status_code = 429
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMDeadlineExceeded(LLMOverloaded):
+    """The call's deadline passed before a slot was free."""
+
+    status_code = 503
+
+
+@contextmanager
+def request_context(priority: int = DEFAULT, deadline_seconds: Optional[float] = None):
+    """Run LLM calls made inside the block with this priority and deadline."""
+    priority_token = _priority.set(priority)
+    deadline_token = _deadline.set(time.monotonic() + deadline_seconds if deadline_seconds else None)
+    try:
+        yield
+    finally:
+        _priority.reset(priority_token)
+        _deadline.reset(deadline_token)
+
+
+def remaining_time() -> float:
+    """Seconds left before the current context's deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return DEFAULT_DEADLINE
+    return deadline - time.monotonic()
+
+
+def propagate_context(func: Callable) -> Callable:
+    """
+    Wrap ``func`` for a ThreadPoolExecutor so it runs with the caller's
+    priority and deadline (``asyncio.to_thread`` already does this).
+    """
+    context = contextvars.copy_context()
+
+    def wrapper(*args, **kwargs):
+        # One copy per call: a context can't be entered by two threads at once
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+
+class _Ticket:
+    __slots__ = ("deadline", "granted", "dropped")
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.granted = False
+        self.dropped = False
+
+
+class _BackendQueue:
+    def __init__(self, name: str, limit: int, max_queue: int):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.running = 0
+        self.waiting = []  # heap of (priority, sequence, ticket)
+        self.call_seconds = INITIAL_CALL_SECONDS  # moving average of call duration
+        self.cond = threading.Condition()
+        self._sequence = itertools.count()
+
+    def retry_after(self) -> int:
+        """Rough time until a newly queued call would start."""
+        backlog = len(self.waiting) + self.running
+        return max(1, int(backlog / max(self.limit, 1) * self.call_seconds))
+
+    def queue_limit(self, priority: int) -> int:
+        return int(self.max_queue * BATCH_QUEUE_SHARE) if priority >= BATCH else self.max_queue
+
+    def _update_gauges(self):
+        metrics.LLM_QUEUE_DEPTH.labels(self.name).set(len(self.waiting))
+
+    def _expired(self) -> LLMDeadlineExceeded:
+        metrics.LLM_REJECTED.labels(self.name, "deadline").inc()
+        return LLMDeadlineExceeded(f"Deadline passed while waiting for LLM backend {self.name}", self.retry_after())
+
+    def acquire(self, priority: int, deadline: float):
+        with self.cond:
+            # Work whose caller already gave up must not take a slot, even a free one
+            if deadline <= time.monotonic():
+                raise self._expired()
+
+            if self.running < self.limit and not self.waiting:
+                self.running += 1
+                return
+
+            if len(self.waiting) >= self.queue_limit(priority):
+                metrics.LLM_REJECTED.labels(self.name, "queue_full").inc()
+                raise LLMOverloaded(f"LLM backend {self.name} is saturated", self.retry_after())
+
+            ticket = _Ticket(deadline)
+            entry = (priority, next(self._sequence), ticket)
+            heapq.heappush(self.waiting, entry)
+            self._update_gauges()
+            while not ticket.granted:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0 or ticket.dropped:
+                    ticket.dropped = True
+                    # Free its queue place now rather than when _grant() reaches it
+                    if entry in self.waiting:
+                        self.waiting.remove(entry)
+                        heapq.heapify(self.waiting)
+                        self._update_gauges()
+                    raise self._expired()
+                self.cond.wait(timeout)
+
+    def release(self, seconds: float):
+        with self.cond:
+            self.running -= 1
+            self.call_seconds = 0.8 * self.call_seconds + 0.2 * seconds
+            self._grant()
+
+    def _grant(self):
+        now = time.monotonic()
+        while self.waiting and self.running < self.limit:
+            _, _, ticket = heapq.heappop(self.waiting)
+            if ticket.dropped or ticket.deadline <= now:
+                ticket.dropped = True  # expired while queued: never run it
+                continue
+            ticket.granted = True
+            self.running += 1
+        self._update_gauges()
+        self.cond.notify_all()
+
+
+class LLMScheduler:
+    """Per-backend concurrency limits with priority queues and deadlines."""
+
+    def __init__(self, limits: dict = BACKEND_LIMITS, max_queue: int = MAX_QUEUE):
+        self._queues = {name: _BackendQueue(name, limit, max_queue) for name, limit in limits.items()}
+
+    def _queue(self, backend: str) -> _BackendQueue:
+        return self._queues[backend]
+
+    def admit(self, priority: int) -> Optional[int]:
+        """
+        Cheap check before a request starts any work: None if every backend can
+        queue another call of this priority, else a Retry-After value in seconds.
+        """
+        for queue in self._queues.values():
+            with queue.cond:
+                if len(queue.waiting) >= queue.queue_limit(priority):
+                    metrics.LLM_REJECTED.labels(queue.name, "admission").inc()
+                    return queue.retry_after()
+        return None
+
+    def run(self, backend: str, call: Callable[[float], str]) -> str:
+        """
+        Run ``call(timeout)`` once a slot on ``backend`` is free.
+
+        The priority and deadline come from ``request_context``; ``timeout`` is
+        the time left until the deadline, so the call itself can't overrun it.
+
+        Raises:
+            LLMOverloaded: The backend's queue is full
+            LLMDeadlineExceeded: The deadline passed before or while waiting
+        """
+        queue = self._queue(backend)
+        deadline = time.monotonic() + remaining_time()
+        queue.acquire(_priority.get(), deadline)
+        started = time.monotonic()
+        try:
+            if deadline <= started:
+                raise queue._expired()
+            return call(deadline - started)
+        finally:
+            queue.release(time.monotonic() - started)
+
+
+scheduler = LLMScheduler()
@@ -0,0 +1,283 @@
+"""
+Mailbox Index Module
+Local SQLite index of Gmail message metadata and decoded bodies.
+
+The index is filled once from the most recent messages and then kept current
+with Gmail's ``history`` API, so subject lookups and repeated summaries are
+answered locally and only the changes since the last ``historyId`` travel over
+the network.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+from gmail_batch import batch_get_messages, iter_message_pages
+from metrics import record_cache, track
+
+# Configuration
+MAILBOX_DB = "mailbox_index.db"
+INITIAL_SYNC_MESSAGES = 1000  # newest messages pulled on the first (full) sync
+MIN_SYNC_INTERVAL = 30  # seconds; lookups closer together than this skip the history call
+METADATA_HEADERS = ["Subject", "From"]
+HISTORY_TYPES = ["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"]
+
+
+class MailboxIndex:
+    """SQLite-backed index of one Gmail mailbox."""
+
+    def __init__(self, service_factory: Callable, db_path: str = MAILBOX_DB):
+        self.service_factory = service_factory
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._last_sync = 0.0
+        self._has_fts = True
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS messages (
+                    id TEXT PRIMARY KEY,
+                    thread_id TEXT,
+                    subject TEXT,
+                    sender TEXT,
+                    snippet TEXT,
+                    label_ids TEXT,
+                    internal_date INTEGER,
+                    body TEXT
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_date ON messages(internal_date)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            try:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(id UNINDEXED, subject, sender)"
+                )
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: fall back to LIKE lookups
+                print("[WARNING] SQLite FTS5 not available, mailbox lookups will use LIKE")
+                self._has_fts = False
+
+    # ------------------------------- metadata --------------------------------
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    # ------------------------------ row updates ------------------------------
+
+    def _upsert(self, mdata: dict):
+        headers = {h["name"]: h["value"] for h in mdata.get("payload", {}).get("headers", [])}
+        subject = headers.get("Subject", "")
+        sender = headers.get("From", "")
+        self._conn.execute(
+            """INSERT INTO messages (id, thread_id, subject, sender, snippet, label_ids, internal_date)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(id) DO UPDATE SET
+                   subject = excluded.subject, sender = excluded.sender, snippet = excluded.snippet,
+                   label_ids = excluded.label_ids, internal_date = excluded.internal_date""",
+            (
+                mdata["id"],
+                mdata.get("threadId"),
+                subject,
+                sender,
+                mdata.get("snippet", ""),
+                json.dumps(mdata.get("labelIds", [])),
+                int(mdata.get("internalDate", 0)),
+            ),
+        )
+        if self._has_fts:
+            self._conn.execute("DELETE FROM messages_fts WHERE id = ?", (mdata["id"],))
+            self._conn.execute(
+                "INSERT INTO messages_fts (id, subject, sender) VALUES (?, ?, ?)", (mdata["id"], subject, sender)
+            )
+
+    def _delete(self, message_id: str):
+        self._conn.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+        if self._has_fts:
+            self._conn.execute("DELETE FROM messages_fts WHERE id = ?", (message_id,))
+
+    def _set_labels(self, message_id: str, label_ids: list):
+        self._conn.execute(
+            "UPDATE messages SET label_ids = ? WHERE id = ?", (json.dumps(label_ids), message_id)
+        )
+
+    # --------------------------------- sync ----------------------------------
+
+    def sync(self, force: bool = False):
+        """
+        Bring the index up to date.
+
+        Runs a full sync the first time (or when Gmail no longer has history
+        for our ``historyId``) and an incremental history sync otherwise.
+        """
+        from googleapiclient.errors import HttpError
+
+        with self._lock:
+            # Checked under the lock: callers that waited for a sync don't run another one
+            if not force and time.monotonic() - self._last_sync < MIN_SYNC_INTERVAL:
+                return
+            service = self.service_factory()
+            history_id = self._get_meta("history_id")
+            if history_id is None:
+                self._full_sync(service)
+            else:
+                try:
+                    self._incremental_sync(service, history_id)
+                except HttpError as e:
+                    if e.resp.status != 404:
+                        raise
+                    print("[INFO] Gmail history expired, running full mailbox sync")
+                    self._full_sync(service)
+            self._last_sync = time.monotonic()
+
+    def _full_sync(self, service):
+        # Take the history id first so nothing that arrives during the listing is lost
+        with track("gmail_api"):
+            history_id = service.users().getProfile(userId="me").execute()["historyId"]
+        listed = {}  # message id -> internal date
+        with self._conn:
+            # Upsert instead of starting over, so bodies fetched earlier are kept
+            for page in iter_message_pages(
+                service, metadata_headers=METADATA_HEADERS, max_messages=INITIAL_SYNC_MESSAGES
+            ):
+                for mdata in page:
+                    self._upsert(mdata)
+                    listed[mdata["id"]] = int(mdata.get("internalDate", 0))
+
+            # Drop what is gone from the mailbox. A listing cut off at INITIAL_SYNC_MESSAGES only
+            # covers messages from its oldest date on; older rows can't be checked and are kept.
+            oldest = min(listed.values()) if len(listed) >= INITIAL_SYNC_MESSAGES else 0
+            stale = [
+                row["id"]
+                for row in self._conn.execute("SELECT id FROM messages WHERE internal_date >= ?", (oldest,))
+                if row["id"] not in listed
+            ]
+            for message_id in stale:
+                self._delete(message_id)
+            self._set_meta("history_id", str(history_id))
+        print(f"[INFO] Mailbox full sync indexed {len(listed)} messages, removed {len(stale)}")
+
+    def _incremental_sync(self, service, history_id: str):
+        added, deleted, labels = set(), set(), {}
+        latest = history_id
+        page_token = None
+        while True:
+            kwargs = {"userId": "me", "startHistoryId": history_id, "historyTypes": HISTORY_TYPES}
+            if page_token:
+                kwargs["pageToken"] = page_token
+            with track("gmail_api"):
+                resp = service.users().history().list(**kwargs).execute()
+
+            for record in resp.get("history", []):
+                for item in record.get("messagesAdded", []):
+                    added.add(item["message"]["id"])
+                    deleted.discard(item["message"]["id"])
+                for item in record.get("messagesDeleted", []):
+                    deleted.add(item["message"]["id"])
+                    added.discard(item["message"]["id"])
+                for key in ("labelsAdded", "labelsRemoved"):
+                    for item in record.get(key, []):
+                        labels[item["message"]["id"]] = item["message"].get("labelIds", [])
+
+            latest = resp.get("historyId", latest)
+            page_token = resp.get("nextPageToken")
+            if not page_token:
+                break
+
+        new_messages = batch_get_messages(service, added, format="metadata", metadata_headers=METADATA_HEADERS)
+        with self._conn:
+            for mdata in new_messages:
+                self._upsert(mdata)
+            for message_id in deleted:
+                self._delete(message_id)
+            for message_id, label_ids in labels.items():
+                if message_id not in deleted:
+                    self._set_labels(message_id, label_ids)
+            self._set_meta("history_id", str(latest))
+
+        if added or deleted or labels:
+            print(f"[INFO] Mailbox sync: +{len(new_messages)} -{len(deleted)} ~{len(labels)}")
+
+    # -------------------------------- lookups --------------------------------
+
+    def find_by_subject(self, subject: str) -> Optional[str]:
+        """Return the id of the newest indexed message whose subject matches."""
+        with self._lock:
+            if self._has_fts:
+                phrase = '"{}"'.format(subject.replace('"', '""'))
+                row = self._conn.execute(
+                    """SELECT m.id FROM messages_fts f JOIN messages m ON m.id = f.id
+                       WHERE messages_fts MATCH ? ORDER BY m.internal_date DESC LIMIT 1""",
+                    (f"subject : {phrase}",),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT id FROM messages WHERE subject LIKE ? ORDER BY internal_date DESC LIMIT 1",
+                    (f"%{subject}%",),
+                ).fetchone()
+        record_cache("mailbox_subject", row is not None)
+        return row["id"] if row else None
+
+    def search(self, text: str, limit: int = 25) -> list:
+        """Full-text search over subject and sender, newest first."""
+        with self._lock:
+            if self._has_fts:
+                rows = self._conn.execute(
+                    """SELECT m.id, m.subject, m.sender, m.snippet, m.label_ids FROM messages_fts f
+                       JOIN messages m ON m.id = f.id WHERE messages_fts MATCH ?
+                       ORDER BY m.internal_date DESC LIMIT ?""",
+                    ('"{}"'.format(text.replace('"', '""')), limit),
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    """SELECT id, subject, sender, snippet, label_ids FROM messages
+                       WHERE subject LIKE ? OR sender LIKE ? ORDER BY internal_date DESC LIMIT ?""",
+                    (f"%{text}%", f"%{text}%", limit),
+                ).fetchall()
+        return [
+            {
+                "id": r["id"],
+                "subject": r["subject"],
+                "from": r["sender"],
+                "snippet": r["snippet"],
+                "labelIds": json.loads(r["label_ids"] or "[]"),
+            }
+            for r in rows
+        ]
+
+    # --------------------------------- bodies --------------------------------
+
+    def get_body(self, message_id: str) -> Optional[str]:
+        """Return the cached decoded body of a message, if we have one."""
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM messages WHERE id = ?", (message_id,)).fetchone()
+        body = row["body"] if row else None
+        record_cache("mailbox_body", body is not None)
+        return body
+
+    def store_body(self, message_id: str, body: str):
+        """Cache a decoded body. Message bodies never change, so they are kept until the message is deleted."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO messages (id, body) VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET body = excluded.body",
+                (message_id, body),
+            )
+
+    def update_labels(self, message_id: str, add: list = (), remove: list = ()):
+        """Apply a label change we made ourselves without waiting for the next sync."""
+        with self._lock:
+            row = self._conn.execute("SELECT label_ids FROM messages WHERE id = ?", (message_id,)).fetchone()
+            if row is None:
+                return
+            label_ids = [l for l in json.loads(row["label_ids"] or "[]") if l not in remove]
+            label_ids.extend(l for l in add if l not in label_ids)
+            with self._conn:
+                self._set_labels(message_id, label_ids)
@@ -1,27 +1,38 @@
 # main_api.py (FastAPI backend)
 from fastapi import FastAPI, Request, HTTPException, Query
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from math_ai_agent_doc import process_input  # import your function (now uses Claude CLI)
-from claude_cli_client import call_llm
-from fastapi import UploadFile, File
-from rag_log_analyzer import build_vectorstore, get_qa_chain, build_vectorstore_from_all_logs
-import os, shutil, json, pytz, requests, httpx
-from PyPDF2 import PdfReader
+from llm_backend import REVIEW, call_llm
+from fastapi import UploadFile, File, BackgroundTasks
+from rag_log_analyzer import build_vectorstore, get_qa_chain, build_vectorstore_from_all_logs, has_log_index
+from prompt_builder import Section, build_prompt
+from doc_summarizer import summarize_document, DETAIL_LEVELS
+import os, json, pytz, requests, httpx, asyncio, time, threading, uuid
+import metrics
+import llm_scheduler
+from llm_scheduler import BATCH, DEFAULT, INTERACTIVE, LLMOverloaded
+import doc_extract
+import doc_index
 
 #------------For Calendar --------------
-from google_auth_oauthlib.flow import Flow
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from typing import Optional
+# The Google client libraries are imported inside the handlers that need them
+from typing import Optional, List
 from datetime import datetime, timedelta
+from calendar_store import CalendarEventStore
 
 #------------For Model Training--------------
-from training_store import save_issue_resolution, find_similar_issues, load_training_data, TRAINING_FILE
+from training_store import save_issue_resolution, find_similar_issues, find_similar_issues_batch, load_training_data, TRAINING_FILE, get_encoder, training_data_version
+from answer_cache import TRAINING, get_answer_cache
+
+#------------For /ask routing--------------
+from query_router import QueryRouter, LOG_ANALYSIS, INCIDENT_SUGGESTION, GENERAL_CHAT
 
 #------------For PR Review--------------
 from pr_review import handle_pull_request
+from weather_client import get_weather_service
+from conversation_store import get_conversation_store
 
 
 app = FastAPI()
@@ -44,6 +55,9 @@ TOKEN_FILE = "token.json"
 
 
 def build_service():
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import build
+
     creds = None
     if os.path.exists(TOKEN_FILE):
         creds = Credentials.from_authorized_user_file(TOKEN_FILE, [SCOPES])
@@ -51,12 +65,39 @@ def build_service():
         raise Exception("Invalid or missing credentials. Please authorize first.")
     return build("calendar", "v3", credentials=creds)
 
+
+# Local copy of the primary calendar, kept fresh by incremental syncs
+calendar_store = CalendarEventStore(build_service)
+
+
+@app.on_event("startup")
+def start_calendar_refresh():
+    calendar_store.start_background_refresh()
+
+
+@app.on_event("shutdown")
+def stop_calendar_refresh():
+    calendar_store.stop_background_refresh()
+
+
+@app.on_event("shutdown")
+def stop_extraction_pool():
+    doc_extract.shutdown_pool()
+
+
+@app.on_event("shutdown")
+async def close_weather_client():
+    await get_weather_service().close()
+
+
 # -------------------------------
 # ✅ STEP 1: AUTHORIZATION URL
 # -------------------------------
 
 @app.get("/authorize-calendar")
 def authorize_calendar():
+    from google_auth_oauthlib.flow import Flow
+
     flow = Flow.from_client_secrets_file(
         CLIENT_SECRETS_FILE,
         scopes=SCOPES,
@@ -79,6 +120,7 @@ def oauth2callback(request: Request):
         if not code:
             raise HTTPException(status_code=400, detail="Missing authorization code")
 
+        from google_auth_oauthlib.flow import Flow
         flow = Flow.from_client_secrets_file(
             CLIENT_SECRETS_FILE,
             scopes=SCOPES,
@@ -109,26 +151,17 @@ def get_events():
     if not os.path.exists(TOKEN_FILE):
         raise HTTPException(status_code=400, detail="Authorize first at /authorize-calendar")
 
-    creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-
     try:
-        service = build("calendar", "v3", credentials=creds)
-
-        events_result = service.events().list(
-            calendarId="primary",
-            maxResults=10,
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
-
-        events = events_result.get("items", [])
+        # Served from the local store, like /get-events-by-date
+        calendar_store.ensure_synced()
+        events = calendar_store.upcoming(10)
         if not events:
             return {"message": "No upcoming events found."}
 
         formatted_events = []
         for event in events:
             start = event["start"].get("dateTime", event["start"].get("date"))
-            formatted_events.append({"summary": event["summary"], "start": start})
+            formatted_events.append({"summary": event.get("summary", "No Title"), "start": start})
 
         return {"events": formatted_events}
 
@@ -144,6 +177,9 @@ async def create_event(request: Request):
     if not os.path.exists(TOKEN_FILE):
         raise HTTPException(status_code=400, detail="Authorize first at /authorize-calendar")
 
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import build
+
     creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
 
     try:
@@ -163,6 +199,7 @@ async def create_event(request: Request):
         }
 
         created_event = service.events().insert(calendarId="primary", body=event).execute()
+        calendar_store.apply_insert(created_event)
         return {"message": "Event created", "eventLink": created_event.get("htmlLink")}
 
     except Exception as e:
@@ -176,23 +213,10 @@ async def create_event(request: Request):
 @app.get("/get-events-by-date")
 def get_events_by_date(date: str = Query(..., description="Date in YYYY-MM-DD format")):
     try:
-        service = build_service()
+        # Served from the local store; only the first call goes to Google
+        calendar_store.ensure_synced()
+        events = calendar_store.events_on(date)
 
-        # Parse input date
-        user_date = datetime.strptime(date, "%Y-%m-%d")
-        timezone = pytz.timezone("Asia/Kolkata")  # Change as needed
-        start_of_day = timezone.localize(datetime(user_date.year, user_date.month, user_date.day, 0, 0, 0))
-        end_of_day = start_of_day + timedelta(days=1)
-
-        events_result = service.events().list(
-            calendarId="primary",
-            timeMin=start_of_day.isoformat(),
-            timeMax=end_of_day.isoformat(),
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
-
-        events = events_result.get("items", [])
         if not events:
             return {"message": f"No events found for {date}"}
         print('events -> {}'.format(events[0]))
@@ -252,6 +276,7 @@ async def schedule_meeting(req: ScheduleRequest):
             body=event_body,
             conferenceDataVersion=1 if req.create_meet_link else 0,
         ).execute()
+        calendar_store.apply_insert(event)
 
         return {
             "message": "{} scheduled successfully".format(event.get("summary")),
@@ -273,6 +298,7 @@ async def delete_event(event_id: str = Query(..., description="ID of the event t
     try:
         service = build_service()
         service.events().delete(calendarId="primary", eventId=event_id).execute()
+        calendar_store.apply_delete(event_id)
         return {"message": f"Event {event_id} deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting event: {str(e)}")
@@ -284,7 +310,65 @@ async def delete_event(event_id: str = Query(..., description="ID of the event t
 
 
 
-# Allow local React frontend
+#-----------------LLM admission control-------------------------
+# Priority and deadline of the LLM calls each route makes. Interactive routes
+# are served first; batch work only gets what they leave over and may wait
+# longer. Routes not listed run with the scheduler defaults.
+INTERACTIVE_DEADLINE = int(os.getenv("INTERACTIVE_DEADLINE", "90"))  # seconds
+UPLOAD_DEADLINE = int(os.getenv("UPLOAD_DEADLINE", "300"))
+BATCH_DEADLINE = int(os.getenv("BATCH_DEADLINE", "1800"))
+
+LLM_ROUTE_POLICIES = {
+    "/ask": (INTERACTIVE, INTERACTIVE_DEADLINE),
+    "/analyze-log": (INTERACTIVE, INTERACTIVE_DEADLINE),
+    "/suggest-resolution": (INTERACTIVE, INTERACTIVE_DEADLINE),
+    "/ask-document": (INTERACTIVE, INTERACTIVE_DEADLINE),
+    "/generate-comment": (INTERACTIVE, INTERACTIVE_DEADLINE),
+    "/upload": (DEFAULT, UPLOAD_DEADLINE),
+    "/ask/batch": (BATCH, BATCH_DEADLINE),
+    "/suggest-resolution/batch": (BATCH, BATCH_DEADLINE),
+    "/webhook": (BATCH, BATCH_DEADLINE),
+}
+
+def _overloaded_response(message: str, status_code: int, retry_after: int):
+    return JSONResponse(status_code=status_code, content={"detail": message}, headers={"Retry-After": str(retry_after)})
+
+@app.exception_handler(LLMOverloaded)
+async def llm_overloaded_handler(request: Request, exc: LLMOverloaded):
+    # 429 when the queue was full, 503 when the deadline passed while queued
+    return _overloaded_response(str(exc), exc.status_code, exc.retry_after)
+
+@app.middleware("http")
+async def llm_admission_control(request: Request, call_next):
+    policy = LLM_ROUTE_POLICIES.get(request.url.path)
+    # CORS preflights never reach the LLM
+    if policy is None or request.method == "OPTIONS":
+        return await call_next(request)
+
+    priority, deadline = policy
+    # Reject before reading the body or doing any retrieval work
+    retry_after = llm_scheduler.scheduler.admit(priority)
+    if retry_after is not None:
+        return _overloaded_response("LLM backend is saturated, retry later", 429, retry_after)
+    with llm_scheduler.request_context(priority, deadline):
+        return await call_next(request)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # Label LLM calls made while serving this request with its route
+    token = metrics.current_route.set(request.url.path)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.HTTP_LATENCY.labels(request.url.path, request.method, str(status)).observe(time.perf_counter() - started)
+        metrics.current_route.reset(token)
+
+# Allow local React frontend. Added after the HTTP middlewares so it wraps
+# them: 429/503 responses from admission control carry CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
@@ -293,8 +377,85 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.get("/metrics")
+def get_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+#-----------------warmup and readiness-------------------------
+# Models and indexes load lazily on first use, so the server starts in well
+# under a second. Warmup preloads them in the background; /readyz reports 503
+# until it has finished, so a load balancer only sends traffic to warm workers.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+warmup_state = {"status": "idle", "steps": {}, "started_at": None, "finished_at": None}
+_warmup_lock = threading.Lock()
+
+def _warm_log_index():
+    if not has_log_index():
+        return "skipped"
+    get_qa_chain()
+
+def _warm_tools():
+    # Modules the tool agent imports on first use
+    import bs4, dateparser, python_weather, googleapiclient.discovery  # noqa: F401
+
+WARMUP_STEPS = [
+    ("sentence_model", get_encoder),
+    ("query_router", lambda: query_router.warm()),
+    ("log_index", _warm_log_index),
+    ("document_index", doc_index.warm),
+    ("tool_dependencies", _warm_tools),
+]
+
+def run_warmup():
+    for name, step in WARMUP_STEPS:
+        started = time.perf_counter()
+        try:
+            status = step() or "ok"
+        except Exception as e:
+            print(f"[WARNING] Warmup step {name} failed: {str(e)}")
+            status = f"failed: {str(e)}"
+        warmup_state["steps"][name] = {"status": status, "seconds": round(time.perf_counter() - started, 3)}
+    failed = any(s["status"].startswith("failed") for s in warmup_state["steps"].values())
+    warmup_state["status"] = "failed" if failed else "ready"
+    warmup_state["finished_at"] = datetime.now().isoformat()
+    print(f"[INFO] Warmup {warmup_state['status']}: {warmup_state['steps']}")
+
+def start_warmup() -> bool:
+    """Start warmup in a background thread unless it is already running."""
+    with _warmup_lock:
+        if warmup_state["status"] == "running":
+            return False
+        warmup_state.update(status="running", steps={}, started_at=datetime.now().isoformat(), finished_at=None)
+    threading.Thread(target=run_warmup, name="warmup", daemon=True).start()
+    return True
+
+@app.on_event("startup")
+def warmup_on_startup():
+    if WARMUP_ON_STARTUP:
+        start_warmup()
+
+@app.get("/healthz")
+def healthz():
+    # Liveness: the process is up and serving requests
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    # Readiness: not ready while warmup is running or after it failed; without
+    # warmup the server is ready immediately and loads models on first use
+    ready = warmup_state["status"] in ("idle", "ready")
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, **warmup_state})
+
+@app.post("/warmup")
+def warmup():
+    started = start_warmup()
+    return JSONResponse(status_code=202, content={"started": started, **warmup_state})
+
 class QueryRequest(BaseModel):
     query: str
+    session_id: Optional[str] = None  # continue a conversation (see /sessions)
 
 '''
 @app.post("/ask")
@@ -303,55 +464,115 @@ async def ask_agent(req: QueryRequest):
     return {"response": response}
 '''
 
+query_router = QueryRouter(get_encoder)
+
+CHAT_WITH_CONTEXT = """{context}
+
+Answer the user's latest message, using the conversation above where it helps.
+User: {query}"""
+
+def remember_turn(session_id: str, question: str, answer):
+    # Runs after the response is sent; folding old turns into the summary is batch work
+    store = get_conversation_store()
+    if store.record(session_id, question, answer):
+        with llm_scheduler.request_context(BATCH, BATCH_DEADLINE):
+            store.compact(session_id)
+
 @app.post("/ask")
 #async def ask(query: dict):
-async def ask(req: QueryRequest):
+async def ask(req: QueryRequest, background_tasks: BackgroundTasks):
     #question = query.get("query", "").lower()
     question = req.query.lower()
 
-    # Heuristics to detect if it's a log-related query
-    log_keywords = ["log", "error", "stacktrace", "traceback", "exception", "debug", "crash", "warning", "failure"]
+    # Follow-ups get a compact, bounded block of the earlier conversation
+    context = await asyncio.to_thread(get_conversation_store().context, req.session_id) if req.session_id else ""
+
+    # Embedding-based routing (LLM fallback only when the router is unsure), off the
+    # event loop: the encode, an index-server round trip or the LLM fallback can take a while
+    route = await asyncio.to_thread(query_router.route, req.query)
 
-    if any(kw in question for kw in log_keywords):
+    # LLM calls run in worker threads so a call waiting for a scheduler slot
+    # doesn't block the event loop
+    if route == LOG_ANALYSIS:
         # Use RAG for log-related query
-        qa = get_qa_chain()
-        result = qa.run(question)
+        qa = await asyncio.to_thread(get_qa_chain)
+        result = await asyncio.to_thread(qa.run, question)
+    elif route == INCIDENT_SUGGESTION:
+        result = await asyncio.to_thread(process_training_query, req.query)
+    elif route == GENERAL_CHAT:
+        prompt = req.query
+        if context:
+            prompt = build_prompt(CHAT_WITH_CONTEXT, [
+                Section("query", req.query, required=True),
+                Section("context", context, keep="tail"),
+            ])
+        result = await asyncio.to_thread(call_llm, prompt)
     else:
-        result = await process_input(req.query)
+        result = await process_input(req.query, context)
 
+    if req.session_id:
+        background_tasks.add_task(remember_turn, req.session_id, req.query, result)
+        return {"response": result, "session_id": req.session_id}
     return {"response": result}
 
+#-----------------conversation sessions-------------------------
+@app.post("/sessions")
+def create_session():
+    return {"session_id": uuid.uuid4().hex}
+
+@app.get("/sessions/{session_id}")
+def get_session(session_id: str):
+    return get_conversation_store().get(session_id)
+
+@app.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    get_conversation_store().delete(session_id)
+    return {"message": f"Session {session_id} deleted"}
 
-def extract_text(file_path: str) -> str:
-    if file_path.endswith(".pdf"):
-        reader = PdfReader(file_path)
-        return "\n".join(page.extract_text() or "" for page in reader.pages)
-    elif file_path.endswith(".txt"):
-        with open(file_path, "r", encoding="utf-8") as f:
-            return f.read()
-    else:
-        return "Unsupported file format"
 
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
+async def upload_file(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    detail: str = Query("standard", description="Summary detail level: brief, standard or detailed"),
+):
+    if detail not in DETAIL_LEVELS:
+        raise HTTPException(status_code=400, detail=f"detail must be one of {list(DETAIL_LEVELS)}")
+
+    # Stream to disk in chunks, then extract off the event loop (cached by file hash)
+    file_path, digest = await doc_extract.save_upload(file, UPLOAD_DIR)
+    try:
+        text = await asyncio.to_thread(doc_extract.extract_text, file_path, digest)
+    except doc_extract.UnsupportedFormatError as e:
+        # Nothing to summarize or index: don't hand out a document id for it
+        os.remove(file_path)
+        raise HTTPException(status_code=415, detail=str(e))
+
+    # Long documents are summarized section by section in parallel, then combined;
+    # every step is cached, so the same content (even under another filename) is instant
+    summary = await asyncio.to_thread(summarize_document, text, detail)
 
-    text = extract_text(file_path)
-    analysis_prompt = f"Please summarize the following document:\n\n{text[:4000]}"  # limit size
+    # Index the document for follow-up questions once the response is sent
+    background_tasks.add_task(doc_index.add_document, text, os.path.basename(file_path), digest)
 
-    # Uses Claude API via call_llm wrapper
-    summary = call_llm(analysis_prompt)
+    return {"summary": summary.strip(), "document_id": digest}
 
-    return {"summary": summary.strip()}
+class DocumentQuestion(BaseModel):
+    query: str
+    document_id: Optional[str] = None  # limit retrieval to one uploaded document
+
+@app.post("/ask-document")
+async def ask_document(req: DocumentQuestion):
+    result = await asyncio.to_thread(doc_index.ask_document, req.query, req.document_id)
+    return {"response": result}
+
+@app.get("/documents")
+async def list_documents():
+    return {"documents": await asyncio.to_thread(doc_index.list_documents)}
 
 @app.post("/upload-log")
 async def upload_log(file: UploadFile = File(...)):
-    os.makedirs("logs", exist_ok=True)
-    filepath = f"logs/{file.filename}"
-    with open(filepath, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    filepath, _ = await doc_extract.save_upload(file, "logs")
 
     #build_vectorstore(filepath)
     build_vectorstore_from_all_logs()  # Consolidated across all logs
@@ -361,28 +582,47 @@ async def upload_log(file: UploadFile = File(...)):
 @app.post("/analyze-log")
 async def analyze_log(query: dict):
     question = query.get("query", "")
-    qa = get_qa_chain()
-    result = qa.run(question)
+    qa = await asyncio.to_thread(get_qa_chain)
+    result = await asyncio.to_thread(qa.run, question)
     return {"response": result}
 
 def process_training_query(user_query):
-    matches = find_similar_issues(user_query)
-    if matches:
-        context = "\n".join([f"Issue: {m['issue']}\nResolution: {m['resolution']}" for m in matches])
-        prompt = f"""You are a helpful assistant. The user is troubleshooting an issue.
+    def produce():
+        matches = find_similar_issues(user_query)
+        prompt = build_training_prompt(user_query, matches)
+
+        print ('Claude resp is {}'.format(prompt))
+        response = call_llm(prompt)  # Uses Claude via wrapper
+        return response
+
+    # Rephrasings of a recent question get the same answer while the training data is unchanged
+    return get_answer_cache().answer(TRAINING, user_query, training_data_version(), produce)
+
+def process_training_matches(user_query, matches):
+    # Like process_training_query, for matches already found (batch requests); same answer cache
+    def produce():
+        return call_llm(build_training_prompt(user_query, matches))
+
+    return get_answer_cache().answer(TRAINING, user_query, training_data_version(), produce)
+
+TRAINING_PROMPT_WITH_CASES = """You are a helpful assistant. The user is troubleshooting an issue.
 Here are similar past cases:
 {context}
 
 Now suggest the best resolution for the following new issue:
 {user_query}
 """
-    else:
-        prompt = f"""You are a helpful assistant. Suggest a resolution for the following issue:
+TRAINING_PROMPT = """You are a helpful assistant. Suggest a resolution for the following issue:
 {user_query}"""
 
-    print ('Claude resp is {}'.format(prompt))
-    response = call_llm(prompt)  # Uses Claude via wrapper
-    return response
+def build_training_prompt(user_query, matches):
+    if matches:
+        cases = [f"Issue: {m['issue']}\nResolution: {m['resolution']}" for m in matches]
+        return build_prompt(TRAINING_PROMPT_WITH_CASES, [
+            Section("user_query", user_query, required=True),
+            Section("context", chunks=cases, separator="\n"),
+        ])
+    return build_prompt(TRAINING_PROMPT, [Section("user_query", user_query, required=True)])
 
 @app.post("/train-model")
 async def train_model(data: dict):
@@ -391,7 +631,7 @@ async def train_model(data: dict):
 
 @app.post("/suggest-resolution")
 async def suggest_resolution(data: dict):
-    result = process_training_query(data["query"])
+    result = await asyncio.to_thread(process_training_query, data["query"])
     print ('backend process_training_query returns {}'.format(result))
     return {"suggestion": result}
 
@@ -406,6 +646,86 @@ def clear_training_history():
         f.write("[]")
     return {"message": "Training history cleared."}
 
+#-----------------batch queries-------------------------
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))  # max parallel LLM calls per batch
+MAX_BATCH_SIZE = 500
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    concurrency: Optional[int] = None  # capped at BATCH_CONCURRENCY
+
+def _batch_semaphore(req: BatchQueryRequest):
+    if not req.queries:
+        raise HTTPException(status_code=400, detail="No queries given")
+    if len(req.queries) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} queries per batch")
+    limit = min(req.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY)
+    return asyncio.Semaphore(max(limit, 1))
+
+async def _stream_ndjson(jobs):
+    # Emit one JSON line per query as soon as it finishes, in completion order
+    for next_done in asyncio.as_completed(jobs):
+        index, query, field, value = await next_done
+        yield json.dumps({"index": index, "query": query, field: value}) + "\n"
+
+async def _run_job(sem, index, query, field, func, *args):
+    async with sem:
+        try:
+            if asyncio.iscoroutinefunction(func):
+                value = await func(*args)
+            else:
+                value = await asyncio.to_thread(func, *args)
+        except Exception as e:
+            return index, query, "error", str(e)
+    return index, query, field, value
+
+@app.post("/ask/batch")
+async def ask_batch(req: BatchQueryRequest):
+    sem = _batch_semaphore(req)
+    routes = await asyncio.to_thread(query_router.route_many, req.queries)
+
+    # Log questions share one embedding pass and one FAISS search
+    log_indices = [i for i, route in enumerate(routes) if route == LOG_ANALYSIS]
+    log_docs = {}
+    if log_indices:
+        qa = await asyncio.to_thread(get_qa_chain)
+        retrieved = await asyncio.to_thread(qa.retrieve_many, [req.queries[i].lower() for i in log_indices])
+        log_docs = dict(zip(log_indices, retrieved))
+
+    incident_indices = [i for i, route in enumerate(routes) if route == INCIDENT_SUGGESTION]
+    incident_matches = {}
+    if incident_indices:
+        matches = await asyncio.to_thread(find_similar_issues_batch, [req.queries[i] for i in incident_indices])
+        incident_matches = dict(zip(incident_indices, matches))
+
+    jobs = []
+    for i, (query, route) in enumerate(zip(req.queries, routes)):
+        if route == LOG_ANALYSIS:
+            # Same answer cache as /ask, so batch and single answers agree and batches fill it
+            job = _run_job(sem, i, query, "response", qa.run_retrieved, query.lower(), log_docs[i])
+        elif route == INCIDENT_SUGGESTION:
+            job = _run_job(sem, i, query, "response", process_training_matches, query, incident_matches[i])
+        elif route == GENERAL_CHAT:
+            job = _run_job(sem, i, query, "response", call_llm, query)
+        else:
+            job = _run_job(sem, i, query, "response", process_input, query)
+        jobs.append(job)
+
+    return StreamingResponse(_stream_ndjson(jobs), media_type="application/x-ndjson")
+
+@app.post("/suggest-resolution/batch")
+async def suggest_resolution_batch(req: BatchQueryRequest):
+    sem = _batch_semaphore(req)
+
+    # Training corpus and all queries are encoded once for the whole batch
+    all_matches = await asyncio.to_thread(find_similar_issues_batch, req.queries)
+
+    jobs = [
+        _run_job(sem, i, query, "suggestion", process_training_matches, query, matches)
+        for i, (query, matches) in enumerate(zip(req.queries, all_matches))
+    ]
+    return StreamingResponse(_stream_ndjson(jobs), media_type="application/x-ndjson")
+
 #-----------------handle PR review-------------------------
 @app.post("/webhook")
 async def github_webhook(request: Request):
@@ -470,8 +790,7 @@ def get_diff_from_github(owner, repo, pr_number, token):
     response = httpx.get(url, headers=headers)
     return response.text if response.status_code == 200 else ""
 
-def generate_comment_with_claude(diff_text: str):
-    prompt = f"""
+COMMENT_PROMPT = """
 You are a helpful code reviewer.
 
 Review the following pull request diff and generate a concise GitHub comment addressing:
@@ -483,10 +802,13 @@ Review the following pull request diff and generate a concise GitHub comment add
 Only include one paragraph with clear suggestions, not excessive praise.
 
 PR Diff:
-{diff_text}
+{diff}
 """
 
-    return call_llm(prompt)  # Uses Claude via wrapper
+def generate_comment_with_claude(diff_text: str):
+    prompt = build_prompt(COMMENT_PROMPT, [Section("diff", diff_text, keep="middle")])
+
+    return call_llm(prompt, REVIEW)  # larger model, like PR reviews
 
 @app.post("/generate-comment")
 async def generate_comment(req: PRUrlRequest):
@@ -502,6 +824,6 @@ async def generate_comment(req: PRUrlRequest):
     if not diff.strip():
         return {"error": "Failed to retrieve PR diff"}
 
-    comment = generate_comment_with_claude(diff)
+    comment = await asyncio.to_thread(generate_comment_with_claude, diff)
     print (comment)
     return {"comment": comment}
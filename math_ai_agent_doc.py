@@ -11,52 +11,64 @@ from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
-from PyPDF2 import PdfReader
+import doc_extract
 import smtplib
 from email.message import EmailMessage
 import re
 from email.mime.text import MIMEText
 import base64
 from gmail_auth import get_gmail_service
+from gmail_batch import batch_get_messages, iter_message_pages, list_message_page
+from summary_cache import get_summary_cache
+from doc_summarizer import summarize_document
+from prompt_builder import fit_text, available_tokens
 from fastapi import HTTPException
 from fastapi.responses import JSONResponse
 from datetime import datetime
-import dateparser
-from bs4 import BeautifulSoup
+from typing import List, Literal
 
 # Import Claude CLI client instead of Claude API
-from claude_cli_client import call_llm, call_claude
+from llm_backend import call_tools
+from tool_schemas import build_tool_schemas
+from llm_scheduler import LLMOverloaded
+from intent_parser import parse_intent
+from weather_client import get_weather_service
+from metrics import track
 
 import requests
 import asyncio
-import python_weather
 
 # === STEP 1: Define local tools ===
-def add_numbers(numbers):
+def add_numbers(numbers: List[float]):
+    """Returns the sum of the numbers."""
     print("[DEBUG] add_numbers() called")
     return sum(numbers)
 
-def subtract(a, b):
+def subtract(a: float, b: float):
+    """Returns a minus b."""
     print("[DEBUG] subtract() called")
     return a - b
 
-def multiply(numbers):
+def multiply(numbers: List[float]):
+    """Returns the product of the numbers."""
     print("[DEBUG] multiply() called")
     result = 1
     for n in numbers:
         result *= n
     return result
 
-def divide(a, b):
+def divide(a: float, b: float):
+    """Returns a divided by b."""
     print("[DEBUG] divide() called")
     if b == 0:
         return "Error: Division by zero"
     return a / b
 
-async def get_weather(city):
+async def get_weather(city: str):
     """
     Get real-time weather data for a city using python-weather library.
-    Free and open-source - No API key required!
+    Free and open-source - No API key required! Reports are cached per city
+    for a few minutes and concurrent lookups of one city share a fetch.
 
     Args:
         city: City name (e.g., "Paris", "New York", "London", "Bangalore")
@@ -67,10 +79,8 @@ async def get_weather(city):
     print(f"[DEBUG] get_weather() called with city={city}")
 
     try:
-        # Declare the client with metric unit system
-        async with python_weather.Client(unit=python_weather.METRIC) as client:
-            # Fetch weather for the city
-            weather = await client.get(city)
+        # Shared client session with a per-city TTL cache
+        weather = await get_weather_service().get(city)
 
         # Get current weather
         current = weather.temperature
@@ -93,26 +103,34 @@ async def get_weather(city):
         print(f"[ERROR] Weather API error: {str(e)}")
         return f"❌ Error fetching weather data for '{city}': {str(e)}"
 
-def analyze_document(path):
+# Bump the version whenever the prompt changes so old cache entries are not reused
+EMAIL_SUMMARY_PROMPT = "Summarize the following email in a few sentences:\n\n{text}"
+EMAIL_SUMMARY_VERSION = "email-v1"
+
+def analyze_document(path: str, detail: Literal["brief", "standard", "detailed"] = "standard"):
+    """
+    Analyzes or summarizes a text or PDF document from the specified file path.
+
+    Args:
+        path: Path of the document
+        detail: Summary length, standard unless the user asks for a brief or detailed summary
+    """
     print(f"[DEBUG] analyze_document() called with path={path}")
     file_path = Path(path)
 
     if not file_path.exists():
         return f"File not found: {path}"
         
-    # Read text based on file type
-    if file_path.suffix.lower() == ".txt":
-        text = file_path.read_text(encoding="utf-8")
-    elif file_path.suffix.lower() == ".pdf":
-        reader = PdfReader(str(file_path))
-        text = "\n".join(page.extract_text() or "" for page in reader.pages)
-    else:
+    # Read text based on file type (shared extractor, cached by file hash)
+    try:
+        text = doc_extract.extract_text(str(file_path))
+    except doc_extract.UnsupportedFormatError:
         return "Unsupported file type. Only .txt and .pdf are supported."
 
-    # Send summary request to Claude
+    # Send summary request to Claude; long documents are summarized section by section
+    # in parallel and then combined, and every step is cached
     print("[INFO] Sending document content for summarization...")
-    prompt = f"Please summarize or analyze the following document content:\n{text[:4000]}"  # Truncate for safety
-    response = call_claude(prompt)
+    response = summarize_document(text, detail)
     return response.strip()
 
 def send_email(to_address: str, subject: str, body: str):
@@ -131,6 +149,12 @@ def send_email(to_address: str, subject: str, body: str):
     return f"✅ Email sent! ID: {send_result['id']}"
 
 def email_agent(query: str) -> str:
+    """
+    Sends an email to the mentioned recipient with a subject and body.
+
+    Args:
+        query: The request in the form "send email to <recipient> subject <subject> body <message>"
+    """
     # Updated regex with non-greedy and greedy match groups
     pattern = r"send email to (?P<to>.+?) subject (?P<subject>.+) body (?P<body>.+)"
     match = re.match(pattern, query, re.IGNORECASE)
@@ -146,14 +170,15 @@ def email_agent(query: str) -> str:
         return f"❌ Failed to send email: {str(e)}"
 
 def mark_email(mail_sub: str, mark_as_read: bool):
-    service = get_gmail_service()
-    results = service.users().messages().list(userId="me", q=f"subject:{mail_sub}", maxResults=1).execute()
-    messages = results.get("messages", [])
-
-    if not messages:
-        raise HTTPException(status_code=404, detail="Email not found.")
+    """
+    Marks the email with the given subject as read or unread.
 
-    msg_id = messages[0]["id"]
+    Args:
+        mail_sub: Subject of the email
+        mark_as_read: True to mark it read, false to mark it unread
+    """
+    service = get_gmail_service()
+    msg_id = search_email_by_subject(service, mail_sub)
 
     if mark_as_read:
         service.users().messages().modify(
@@ -161,6 +186,7 @@ def mark_email(mail_sub: str, mark_as_read: bool):
             id=msg_id,
             body={"removeLabelIds": ["UNREAD"]}
         ).execute()
+        get_mailbox_index().update_labels(msg_id, remove=["UNREAD"])
         return {"status": f"Email with subject '{mail_sub}' marked as read."}
     else:
         service.users().messages().modify(
@@ -168,31 +194,53 @@ def mark_email(mail_sub: str, mark_as_read: bool):
             id=msg_id,
             body={"addLabelIds": ["UNREAD"]}
         ).execute()
+        get_mailbox_index().update_labels(msg_id, add=["UNREAD"])
         return f"✅ Email with subject '{mail_sub}' marked as unread."
 
-def list_messages():
+def _message_summary(mdata):
+    headers = {h["name"]: h["value"] for h in mdata.get("payload", {}).get("headers", [])}
+    return {
+        "id": mdata["id"],
+        "snippet": mdata.get("snippet", ""),
+        "labelIds": mdata.get("labelIds", []),
+        "subject": headers.get("Subject"),
+        "from": headers.get("From"),
+    }
+
+def list_messages(max_results=25, page_token=None, query=None):
+    # One list call for the ids, then one batch call for all their metadata
     service = get_gmail_service()
-    resp = service.users().messages().list(userId="me", maxResults=25).execute()
-    msgs = resp.get("messages", [])
-    out = []
-    for m in msgs:
-        mdata = service.users().messages().get(
-            userId="me",
-            id=m["id"],
-            format="metadata",
-            metadataHeaders=["Subject", "From"]
-            ).execute()
-        headers = {h["name"]: h["value"] for h in mdata.get("payload", {}).get("headers", [])}
-        out.append({
-            "id": m["id"],
-            "snippet": mdata.get("snippet", ""),
-            "labelIds": mdata.get("labelIds", []),
-            "subject": headers.get("Subject"),
-            "from": headers.get("From"),
-        })
-    return {"messages": out}
+    ids, next_page_token = list_message_page(service, query=query, page_size=max_results, page_token=page_token)
+    mdatas = batch_get_messages(service, [m["id"] for m in ids], format="metadata", metadata_headers=["Subject", "From"])
+    return {"messages": [_message_summary(m) for m in mdatas], "nextPageToken": next_page_token}
+
+def iter_messages(query=None, page_size=100, max_messages=None):
+    """Stream message summaries page by page, for walking large mailboxes."""
+    service = get_gmail_service()
+    for page in iter_message_pages(service, query=query, page_size=page_size, metadata_headers=["Subject", "From"], max_messages=max_messages):
+        for mdata in page:
+            yield _message_summary(mdata)
+
+_mailbox_index = None
+
+def get_mailbox_index():
+    global _mailbox_index
+    if _mailbox_index is None:
+        from mailbox_index import MailboxIndex
+        _mailbox_index = MailboxIndex(get_gmail_service)
+    return _mailbox_index
 
 def search_email_by_subject(service, subject):
+    # Look in the local index first; it is brought up to date with a cheap history sync
+    try:
+        index = get_mailbox_index()
+        index.sync()
+        msg_id = index.find_by_subject(subject)
+        if msg_id:
+            return msg_id
+    except Exception as e:
+        print(f"[WARNING] Mailbox index lookup failed, searching Gmail: {str(e)}")
+
     query = f'subject:"{subject}"'
     results = service.users().messages().list(userId="me", q=query, maxResults=1).execute()
     messages = results.get("messages", [])
@@ -201,8 +249,7 @@ def search_email_by_subject(service, subject):
 
     return messages[0]["id"]
 
-def get_email_body(service, message_id):
-    msg = service.users().messages().get(userId="me", id=message_id, format="full").execute()
+def decode_email_body(msg):
     payload = msg["payload"]
     parts = payload.get("parts", [])
    
@@ -216,6 +263,7 @@ def get_email_body(service, message_id):
                 html_data = part["body"].get("data")
                 if html_data:
                     decoded_html = base64.urlsafe_b64decode(html_data).decode("utf-8")
+                    from bs4 import BeautifulSoup
                     body_data = BeautifulSoup(decoded_html, "html.parser").get_text()
                     break
     else:
@@ -228,7 +276,25 @@ def get_email_body(service, message_id):
         body_data = base64.urlsafe_b64decode(body_data).decode("utf-8")
     return body_data.strip()
 
-def summarize_email(subject):
+def get_email_body(service, message_id):
+    index = get_mailbox_index()
+    body = index.get_body(message_id)
+    if body:
+        return body
+
+    msg = service.users().messages().get(userId="me", id=message_id, format="full").execute()
+    body = decode_email_body(msg)
+    if body:
+        index.store_body(message_id, body)
+    return body
+
+def summarize_email(subject: str):
+    """
+    Summarizes the email with a particular subject. Only use it when the user asks for an email summary.
+
+    Args:
+        subject: Subject of the email, e.g. the text in quotes in "summarize the email with subject '...'"
+    """
     try:
         service = get_gmail_service()
         msg_id = search_email_by_subject(service, subject)
@@ -238,7 +304,8 @@ def summarize_email(subject):
         body = get_email_body(service, msg_id)
         if not body:
             raise HTTPException(status_code=404, detail="Email has no readable body")
-        summary = call_claude(f"Summarize the following email in a few sentences:\n\n{body}")
+        body = fit_text(body, available_tokens(EMAIL_SUMMARY_PROMPT))
+        summary = get_summary_cache().summarize(body, EMAIL_SUMMARY_PROMPT, EMAIL_SUMMARY_VERSION).text
         print (summary)
         return f"✅ {summary}"
     
@@ -257,6 +324,7 @@ def resolve_relative_dates(text):
         if match:
             print('MATCHED {}'.format(pattern))
             relative_phrase = match.group(0)
+            import dateparser
             parsed_date = dateparser.parse(relative_phrase, settings={"PREFER_DATES_FROM": "future"})
             if parsed_date:
                 resolved = parsed_date.strftime("%Y-%m-%d")
@@ -266,11 +334,27 @@ def resolve_relative_dates(text):
     print("[resolve_relative_dates] No match or parseable phrase found.")
     return None
 
-def get_events_by_date(date="2025-08-04"):
+def get_events_by_date(date: str = "2025-08-04"):
+    """
+    Lists the calendar events and meetings on a date, e.g. "show the events for August 10", "meetings for next Friday".
+
+    Args:
+        date: The date in YYYY-MM-DD format
+    """
     resp_dict = { "tool_name": "get_calendar_events","parameters": {"date": date} }
     return resp_dict
 
-def schedule_meeting_llm(title, start_time, end_time, attendees=[], gmeet=False):
+def schedule_meeting_llm(title: str, start_time: str, end_time: str, attendees: List[str] = [], gmeet: bool = False):
+    """
+    Schedules a meeting, e.g. "set up a meeting called Project Update on 10 July from 10 AM to 11 AM with bob@example.com including a Meet link".
+
+    Args:
+        title: Meeting title
+        start_time: Start in ISO format, e.g. 2025-07-10T10:00:00
+        end_time: End in ISO format, e.g. 2025-07-10T11:00:00
+        attendees: Email addresses of the attendees
+        gmeet: Whether to add a Google Meet link
+    """
     # Dummy data for example – normally this would be parsed from LLM tool call
     response = {
         "tool_name": "schedule_meeting",
@@ -300,86 +384,109 @@ tool_registry = {
     "analyze_document": analyze_document
 }
 
-# === STEP 3: Use LLM to parse the user's intent ===
-# Note: Direct calls now use call_llm from claude_cli_client
+# === STEP 3: Tool schemas for structured tool calls ===
+# Built from the registry's signatures and docstrings, so they never drift from the functions
+TOOL_SCHEMAS = build_tool_schemas(tool_registry)
+
+# Stable prefix: identical on every call, so together with TOOL_SCHEMAS it can be served from
+# the prompt cache once it reaches the routing model's minimum length (see README, Prompt Caching).
+# Everything per request (date, conversation, query) goes in TOOL_QUERY_PROMPT.
+TOOL_SYSTEM_PROMPT = (
+    "You are an AI tool-calling assistant. Use the tools that fit the user's query;"
+    " a query that asks for several independent things gets one tool call for each."
+    " If no tool fits, answer the query directly."
+    " Interpret 'today', 'tomorrow' and all other relative dates based on the date given with the query."
+    " If the query mentions a resolved date in parentheses like (The resolved date: 2025-08-09), use it as the date."
+)
+TOOL_QUERY_PROMPT = "Today is {today}.\n{context}\nUser: {query}"
+
+MAX_TOOL_CALLS = 8  # per query
+
+async def run_tool(tool_name, args):
+    func = tool_registry.get(tool_name)
+    if func is None:
+        raise ValueError(f"Unknown tool: {tool_name}")
+    with track(f"tool_{tool_name}"):
+        # Async tools run on the event loop, blocking ones (Gmail, documents) on the thread pool
+        if inspect.iscoroutinefunction(func):
+            result = await func(**args)
+        else:
+            result = await asyncio.to_thread(func, **args)
+    print("✅ Tool {} returned: {}".format(tool_name, result))
+    return result
 
-# === STEP 4: Parse intent and execute tools manually ===
-async def process_input(user_query):
-    print("\n[INFO] [process_input] Sending prompt to Claude...")
+async def run_tools(tool_calls):
+    """
+    Run independent tool calls concurrently and combine their results.
 
-    resolved_date = resolve_relative_dates(user_query)
-    today = datetime.now().strftime("%Y-%m-%d")
+    A single call returns the tool's own result unchanged (the UI acts on the
+    calendar tools' dicts); several calls return one text response with the
+    results in the order the calls were made. A failing call, or one naming a
+    tool that doesn't exist, only replaces its own result with an error message.
+    """
+    tool_calls = tool_calls[:MAX_TOOL_CALLS]
+    results = await asyncio.gather(
+        *(run_tool(call["name"], call["input"]) for call in tool_calls), return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, LLMOverloaded):
+            raise result  # shed by the scheduler, answered with 429/503
+
+    if len(tool_calls) == 1:
+        if isinstance(results[0], Exception):
+            return f"❌ Error while executing tool: {results[0]}"
+        return results[0]
+
+    parts = []
+    for call, result in zip(tool_calls, results):
+        if isinstance(result, Exception):
+            parts.append(f"❌ {call['name']} failed: {result}")
+        elif isinstance(result, str):
+            parts.append(result)
+        else:
+            parts.append(f"{call['name']}: {json.dumps(result, default=str)}")
+    return "\n\n".join(parts)
+
+# === STEP 4: Select tools with one LLM round trip and execute them ===
+async def process_input(user_query, context=""):
+    # Unambiguous queries (arithmetic, weather, email by quoted subject, events by date)
+    # are resolved locally and skip the LLM round trip
+    tool_call = parse_intent(user_query)
+    if tool_call:
+        print(f"[INFO] [process_input] Local fast path: {tool_call}")
+        try:
+            return await run_tool(tool_call["tool"], tool_call["args"])
+        except LLMOverloaded:
+            raise
+        except Exception as e:
+            return f"❌ Error while executing tool: {e}"
+
+    print("\n[INFO] [process_input] Sending query to Claude with tools...")
 
+    resolved_date = resolve_relative_dates(user_query)
     if resolved_date:
         user_query += f" (The resolved date: {resolved_date})"  # <=== Inject into prompt
         print('user_query is {}'.format(user_query))
 
-    system_prompt = (
-        "You are an AI tool-calling assistant."
-        " Read the user's query and return an output in JSON object in the format: {\"tool\": tool_name, \"args\": arguments}."
-        "\nAvailable tools are:"
-        " add_numbers(numbers: list of numbers) : returns the result of addition"
-        " subtract(a: number, b: number) : returns the result of substraction"
-        " multiply(numbers: list of numbers) : returns the result of multiplication"
-        " divide(a: number, b: number) : returns the result of division"
-        " get_weather(city: string) : returns the weather of the city passed as a parameter."
-        " summarize_email(subject: string) : summarizes the email with a particular subject. Example of user input - Summarize the email with subject 'any particular subject'.Exclusively call this fucntion when user input mentions 'email summary' or 'summarize an emali' etc in user input"
-        " analyze_document(path: string) : analyzes or summarizes a text or PDF document from the specified file path."
-        f" get_events_by_date(date: string) : returns a json dict. Today is {today}. Interpret 'today', 'tomorrow' and all other dates based on {today}. The date parameter should be passed to the tool in YYYY-MM-DD format. If any resolved date is mentioned in parentheses like (Resolved date: 2025-08-09), consider using it as the 'date' parameter. User query can be like - Show the events for August 10, list the events for today, fetch the events for 31st May, Display meetings for next Friday."
-        " email_agent(query: string) : sends email to the mentioned recipients with subject and body."
-        " mark_email(mail_sub: string, mark_as_read: boolean) : marks an email with subject as read/unread. example user input - Mark the email with subject 'current quarter company highlights' as read."
-        " schedule_meeting_llm(title : string, start_time : string, end_time : string, attendees : list of string, gmeet: bool). It returns meeting details dictionary with fields like title, start_time, end_time, attendees(optional), gmeet(optional).User input example 1 -  Set up a meeting called Project Update on 10 July from 10 AM to 11 AM. Here the parameters are title = Project Update, start_time = 2025-07-10T10:00:00 , end_time = 2025-07-10T10:00:00. Parameters attendees and gmeet are optional. User Input example 2 - Schedule a meeting called team sync on August 31st from 3 PM to 4 PM with attendees alice@example.com and bob@example.com including Meeting link. Here the parameters are title = team sync , start_time = 2025-08-31T15:00:00 , end_time = 2025-08-31T16:00:00, attendees = [\"alice@example.com\", \"bob@example.com\"] , gmeet = true ."
-        "\nIf there is no available tool for the respective user input, then just return { \"tool\": null, \"args\": { \"query\": \"...\" } }"
-        "\nONLY return a valid JSON. No explanation, no markdown."
+    prompt = TOOL_QUERY_PROMPT.format(
+        today=datetime.now().strftime("%Y-%m-%d"),
+        # Earlier turns of the session, so "summarize that email again" finds its subject
+        context=f"Conversation so far:\n{context}\n" if context else "",
+        query=user_query,
     )
-
-    full_prompt = system_prompt + f"\nUser: {user_query}\n"
-    output = call_llm(full_prompt)
-
-    try:
-        print(f"[DEBUG] Claude output: {output}")
-
-        # Strip markdown code fences if present
-        output = output.strip()
-        if output.startswith("```"):
-            # Remove opening fence (```json or ```)
-            lines = output.split("\n")
-            if lines[0].startswith("```"):
-                lines = lines[1:]
-            # Remove closing fence
-            if lines and lines[-1].strip() == "```":
-                lines = lines[:-1]
-            output = "\n".join(lines).strip()
-
-        tool_call = json.loads(output)
-        tool_name = tool_call["tool"]
-        args = tool_call["args"]
-
-        if tool_name in tool_registry:
-            func = tool_registry[tool_name]
-            # Check if the function is async and handle accordingly
-            if inspect.iscoroutinefunction(func):
-                result = await func(**args)
-            else:
-                result = func(**args)
-            print("✅ Tool {} returned: {}".format(tool_name, result))
-            #return f"{result}"
-            return result
-
-        elif tool_name is None:
-            # Fallback to direct LLM response
-            print("[INFO] No tool used. Asking Claude directly for response...")
-            response = call_llm(args.get("query", user_query))
-            return f"{response}"
-
-        else:
-            return f"❌ Unknown tool: {tool_name}"
-
-    except json.JSONDecodeError:
-        return "❌ Invalid JSON from Claude. Falling back to chat mode:\n" + call_llm(user_query)
-
-    except Exception as e:
-        return f"❌ Error while executing tool: {e}"
+    # Off the event loop: the call may wait in the LLM scheduler's queue.
+    # The model either calls a tool or answers general queries in the same call.
+    decision = await asyncio.to_thread(call_tools, prompt, TOOL_SCHEMAS, TOOL_SYSTEM_PROMPT)
+    print(f"[DEBUG] Claude decision: {decision}")
+
+    if decision["type"] == "text":
+        return decision["content"]
+    if decision["type"] == "error":
+        return f"❌ {decision['content']}"
+
+    # Independent calls ("weather in Paris and London and my meetings tomorrow") run
+    # concurrently, so a compound query takes about as long as its slowest tool
+    return await run_tools(decision["tool_calls"])
 
 
 # === CLI Entry Point ===
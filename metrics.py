@@ -0,0 +1,120 @@
+"""
+Metrics Module
+Prometheus metrics for the hot paths (LLM calls, embeddings, vector index,
+PDF extraction, PR tooling, Google APIs, tool execution, caches), exposed by
+the ``/metrics`` endpoint in main_fastapi.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Buckets from 5 ms (cache hits, index search) up to 2 min (CLI timeout)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# API route of the request being served, used to label LLM calls
+current_route = ContextVar("current_route", default="none")
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["route", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_LATENCY = Histogram(
+    "llm_call_duration_seconds", "LLM call latency", ["backend", "route"], buckets=LATENCY_BUCKETS
+)
+LLM_CALLS = Counter("llm_calls_total", "LLM calls", ["backend", "route", "status"])
+LLM_IN_FLIGHT = Gauge("llm_calls_in_flight", "LLM calls currently running", ["backend"])
+LLM_QUEUE_DEPTH = Gauge("llm_queue_depth", "LLM calls waiting for a scheduler slot", ["backend"])
+LLM_REJECTED = Counter("llm_rejected_total", "LLM calls shed by the scheduler", ["backend", "reason"])
+LLM_FAILOVERS = Counter("llm_failovers_total", "LLM calls retried on another backend", ["backend"])
+LLM_HEDGED = Counter("llm_hedged_total", "Hedged LLM calls by which request answered first", ["winner"])
+LLM_BREAKER_OPEN = Gauge("llm_circuit_open", "1 while a backend's circuit breaker is open", ["backend"])
+
+STAGE_LATENCY = Histogram(
+    "stage_duration_seconds", "Latency of internal pipeline stages", ["stage"], buckets=LATENCY_BUCKETS
+)
+STAGE_ERRORS = Counter("stage_errors_total", "Pipeline stages that raised", ["stage"])
+STAGE_IN_FLIGHT = Gauge("stage_in_flight", "Pipeline stages currently running", ["stage"])
+
+# Prompt-cache share of input: rate(llm_tokens_total{kind="cache_read"}) / rate(llm_tokens_total{kind=~"input|cache_read|cache_write"})
+LLM_TOKENS = Counter("llm_tokens_total", "LLM tokens by kind (input, cache_read, cache_write, output)", ["backend", "kind"])
+
+# Hit ratio: rate(cache_requests_total{result="hit"}) / rate(cache_requests_total)
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups", ["cache", "result"])
+
+
+@contextmanager
+def track(stage: str):
+    """Time a block of code as a pipeline stage."""
+    in_flight = STAGE_IN_FLIGHT.labels(stage)
+    in_flight.inc()
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        STAGE_LATENCY.labels(stage).observe(time.perf_counter() - started)
+        in_flight.dec()
+
+
+def tracked(stage: str):
+    """Decorator form of track() for plain functions."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def track_llm(backend: str):
+    """
+    Time an LLM call. The block should set ``status["ok"] = False`` on a failed
+    call that did not raise (the CLI client reports errors as text).
+    """
+    route = current_route.get()
+    in_flight = LLM_IN_FLIGHT.labels(backend)
+    status = {"ok": True}
+    in_flight.inc()
+    started = time.perf_counter()
+    try:
+        yield status
+    except BaseException:
+        status["ok"] = False
+        raise
+    finally:
+        LLM_LATENCY.labels(backend, route).observe(time.perf_counter() - started)
+        LLM_CALLS.labels(backend, route, "ok" if status["ok"] else "error").inc()
+        in_flight.dec()
+
+
+_USAGE_FIELDS = {
+    "input": "input_tokens",  # uncached input after the last cache breakpoint
+    "cache_read": "cache_read_input_tokens",
+    "cache_write": "cache_creation_input_tokens",
+    "output": "output_tokens",
+}
+
+
+def record_llm_usage(backend: str, usage):
+    """Count the tokens of an API response's ``usage`` by kind."""
+    for kind, field in _USAGE_FIELDS.items():
+        count = getattr(usage, field, None) or 0
+        if count:
+            LLM_TOKENS.labels(backend, kind).inc(count)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def render():
+    """Return (body, content type) for the /metrics endpoint."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,33 +1,21 @@
+import asyncio
 import os
 import tempfile
 import subprocess
-import git
 import subprocess
-from claude_cli_client import call_llm
+from llm_backend import REVIEW, call_llm
+from llm_scheduler import BATCH, request_context
+from prompt_builder import Section, build_prompt, count_tokens
+from metrics import track, tracked
 
 import httpx
 from urllib.parse import urlparse
 import requests
 
-def truncate_text(text, max_lines=500):
-    """Truncate text to max_lines, keeping both start and end."""
-    if not text:
-        return text
-
-    lines = text.split('\n')
-    if len(lines) <= max_lines:
-        return text
-
-    # Keep first 60% and last 40% of allowed lines
-    keep_start = int(max_lines * 0.6)
-    keep_end = max_lines - keep_start
-
-    truncated = (
-        '\n'.join(lines[:keep_start]) +
-        f'\n\n... [Truncated {len(lines) - max_lines} lines] ...\n\n' +
-        '\n'.join(lines[-keep_end:])
-    )
-    return truncated
+REPORT_MIN_TOKENS = 4000
+REVIEW_DEADLINE = int(os.getenv("PR_REVIEW_DEADLINE", "1800"))  # seconds a review may wait for the LLM
+UPSTREAM_REPO_URL = os.getenv("PR_REVIEW_UPSTREAM_URL", "git@github.com:sandeepknd/openshift-tests-private.git")
+REVIEW_TARGET_REPO = os.getenv("PR_REVIEW_TARGET_REPO", "openshift/openshift-tests-private")
 
 def post_comment_to_github(pr_number, comment_body, repo_full_name, github_token):
     url = f"https://api.github.com/repos/{repo_full_name}/issues/{pr_number}/comments"
@@ -47,20 +35,24 @@ def post_comment_to_github(pr_number, comment_body, repo_full_name, github_token
         print(f"❌ Failed to post comment: {response.status_code} {response.text}")
 
 async def handle_pull_request(repo_url, branch, pr_url):
+    import git  # GitPython, only needed for reviews
+
     print ('Temp directory is {}'.format(tempfile.gettempdir()))
     with tempfile.TemporaryDirectory() as tmpdir:
-        repo = git.Repo.clone_from(repo_url, tmpdir)
+        with track("git_clone"):
+            repo = git.Repo.clone_from(repo_url, tmpdir)
         print ("✅ git replo cloned.")
         repo.git.checkout(branch)
         print ("✅ Checked out the branch.")
 
         # 1. Add upstream remote (original repo)
         token = os.getenv("GITHUB_TOKEN")
-        repo.create_remote("upstream", url="git@github.com:sandeepknd/openshift-tests-private.git")
+        repo.create_remote("upstream", url=UPSTREAM_REPO_URL)
         print ("✅ Created remote branch")
 
         # 2. Fetch upstream/main
-        repo.git.fetch("upstream", "master")
+        with track("git_fetch"):
+            repo.git.fetch("upstream", "master")
         print ("✅ Fetched upstream master")
 
         # 3. Generate diff against upstream/main
@@ -71,27 +63,17 @@ async def handle_pull_request(repo_url, branch, pr_url):
         vet_report = run_govet(tmpdir)
         print ("✅ Created govet report")
 
-        # Truncate reports to avoid exceeding context limits
-        # Prioritize: lint (100 lines) + vet (100 lines) + diff (300 lines)
-        lint_report_truncated = truncate_text(lint_report, max_lines=100)
-        vet_report_truncated = truncate_text(vet_report, max_lines=100)
-        diff_output_truncated = truncate_text(diff_output, max_lines=300)
-
-        print(f"[INFO] Lint report: {len(lint_report.split(chr(10)))} lines -> {len(lint_report_truncated.split(chr(10)))} lines")
-        print(f"[INFO] Vet report: {len(vet_report.split(chr(10)))} lines -> {len(vet_report_truncated.split(chr(10)))} lines")
-        print(f"[INFO] Diff: {len(diff_output.split(chr(10)))} lines -> {len(diff_output_truncated.split(chr(10)))} lines")
-
-        prompt = f"""
+        prompt_template = """
 You are a senior Golang code reviewer. Analyze this PR and provide a DETAILED, SPECIFIC review with exact file paths and line numbers for each issue.
 
 GOLINT REPORT:
-{lint_report_truncated}
+{lint}
 
 GOVET REPORT:
-{vet_report_truncated}
+{vet}
 
 GIT DIFF:
-{diff_output_truncated}
+{diff}
 
 INSTRUCTIONS:
 1. Review each file changed in the diff
@@ -138,7 +120,20 @@ INSTRUCTIONS:
 
 IMPORTANT: Be SPECIFIC. Always include file paths, line numbers, and code snippets. Do NOT provide generic summaries.
 """
-        comment = call_llm(prompt)
+
+        # Fit the reports into the prompt token budget; the diff has priority,
+        # but lint and vet keep a minimum share so they are never dropped
+        prompt = build_prompt(prompt_template, [
+            Section("diff", diff_output, priority=1, keep="middle"),
+            Section("lint", lint_report, priority=2, keep="middle", min_tokens=REPORT_MIN_TOKENS),
+            Section("vet", vet_report, priority=2, keep="middle", min_tokens=REPORT_MIN_TOKENS),
+        ])
+        print(f"[INFO] Review prompt: ~{count_tokens(prompt)} tokens "
+              f"(lint {count_tokens(lint_report)}, vet {count_tokens(vet_report)}, diff {count_tokens(diff_output)} before fitting)")
+
+        # Reviews are batch work: interactive requests get the LLM first
+        with request_context(BATCH, REVIEW_DEADLINE):
+            comment = await asyncio.to_thread(call_llm, prompt, REVIEW)
         print("\n--- LLM Generated PR Comment ---\n", comment)
 
         # Check if the LLM call failed
@@ -164,10 +159,11 @@ Please review the golint and govet reports in the CI logs for specific issues.
 
         # Call GitHub API to post comment
         pr_num = pr_url.split('/')[-1]
-        post_comment_to_github(pr_num, comment, "openshift/openshift-tests-private",token)
+        post_comment_to_github(pr_num, comment, REVIEW_TARGET_REPO, token)
 
 #----------golang tools------------
 
+@tracked("golint")
 def run_golint(repo_path):
     try:
         result = subprocess.run(
@@ -181,6 +177,7 @@ def run_golint(repo_path):
     except Exception as e:
         return f"golint error: {str(e)}"
 
+@tracked("govet")
 def run_govet(repo_path):
     try:
         result = subprocess.run(
@@ -0,0 +1,174 @@
+"""
+Prompt Builder Module
+Assembles prompts against a token budget instead of ad-hoc character or line
+limits. Token counts are estimated locally, and the budget is shared between
+the fixed instructions and the variable sections by priority.
+"""
+
+import math
+import os
+import string
+from typing import List, Optional
+
+# Configuration
+CONTEXT_WINDOW_TOKENS = 200_000
+RESERVED_OUTPUT_TOKENS = 8_192
+# Our estimate is deliberately pessimistic, but keep some headroom anyway
+PROMPT_TOKEN_BUDGET = int(
+    os.getenv("PROMPT_TOKEN_BUDGET", int((CONTEXT_WINDOW_TOKENS - RESERVED_OUTPUT_TOKENS) * 0.9))
+)
+# Claude averages ~4 characters per token on English prose; logs, diffs and
+# code tokenize denser, so 3.5 keeps the estimate on the safe side.
+CHARS_PER_TOKEN = 3.5
+
+TRUNCATION_MARKER = "\n\n... [Truncated {} tokens] ...\n\n"
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Estimate the number of tokens in ``text`` without a network call."""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def fit_text(text: Optional[str], max_tokens: int, keep: str = "head") -> str:
+    """
+    Shorten ``text`` to roughly ``max_tokens`` tokens.
+
+    Args:
+        text: Text to shorten
+        max_tokens: Token allowance for the text
+        keep: Which part to keep: "head", "tail", or "middle" (60% start + 40% end)
+
+    Returns:
+        The text unchanged if it fits, otherwise a truncated copy with a marker
+    """
+    if not text:
+        return text or ""
+    total = count_tokens(text)
+    if total <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    marker = TRUNCATION_MARKER.format(total - max_tokens)
+    max_chars = max(int((max_tokens - count_tokens(marker)) * CHARS_PER_TOKEN), 0)
+
+    if keep == "tail":
+        return marker.lstrip() + text[-max_chars:] if max_chars else marker.strip()
+    if keep == "middle":
+        head = int(max_chars * 0.6)
+        tail = max_chars - head
+        return text[:head] + marker + (text[-tail:] if tail else "")
+    return text[:max_chars] + marker.rstrip()
+
+
+def pack_chunks(chunks: List[str], max_tokens: int, separator: str = "\n\n") -> List[str]:
+    """Keep whole chunks, in the given (relevance) order, while they fit in ``max_tokens``."""
+    packed = []
+    used = 0
+    sep_tokens = count_tokens(separator)
+    for chunk in chunks:
+        cost = count_tokens(chunk) + (sep_tokens if packed else 0)
+        if used + cost > max_tokens:
+            break
+        packed.append(chunk)
+        used += cost
+    return packed
+
+
+class Section:
+    """
+    One variable part of a prompt.
+
+    Args:
+        name: Placeholder name in the template
+        text: Section content, or None when ``chunks`` is used
+        chunks: Ranked list of passages; whole passages are kept in order
+        priority: Lower numbers get their share of the budget first
+        keep: Truncation mode passed to fit_text ("head", "tail", "middle")
+        min_tokens: Share reserved for this section before higher priorities
+            take the rest, so it is never squeezed out entirely
+        required: Never truncate this section
+    """
+
+    def __init__(
+        self,
+        name: str,
+        text: Optional[str] = None,
+        chunks: Optional[List[str]] = None,
+        priority: int = 1,
+        keep: str = "head",
+        min_tokens: int = 0,
+        required: bool = False,
+        separator: str = "\n\n",
+    ):
+        self.name = name
+        self.text = text or ""
+        self.chunks = chunks
+        self.priority = priority
+        self.keep = keep
+        self.min_tokens = min_tokens
+        self.required = required
+        self.separator = separator
+
+    def needed(self) -> int:
+        if self.chunks is not None:
+            # Counted the way pack_chunks counts, so a section granted what it needs keeps every chunk
+            separators = count_tokens(self.separator) * max(len(self.chunks) - 1, 0)
+            return sum(count_tokens(chunk) for chunk in self.chunks) + separators
+        return count_tokens(self.text)
+
+    def render(self, max_tokens: int) -> str:
+        if self.required:
+            return self.text
+        if self.chunks is not None:
+            return self.separator.join(pack_chunks(self.chunks, max_tokens, self.separator))
+        return fit_text(self.text, max_tokens, self.keep)
+
+
+def available_tokens(template: str, budget: int = PROMPT_TOKEN_BUDGET, **fixed) -> int:
+    """Tokens left for one ``{text}``-style section after the template itself."""
+    placeholders = {key: "" for key in _field_names(template)}
+    placeholders.update(fixed)
+    return max(budget - count_tokens(template.format(**placeholders)), 0)
+
+
+def build_prompt(template: str, sections: List[Section], budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """
+    Fill ``template`` with the sections, fitting everything into ``budget`` tokens.
+
+    Required sections are counted first. Each remaining section then gets its
+    ``min_tokens`` reservation, and the rest of the budget goes to sections in
+    priority order until each has what it needs.
+    """
+    empty = {key: "" for key in _field_names(template)}
+    remaining = budget - count_tokens(template.format(**empty))
+
+    allocation = {}
+    for section in sections:
+        if section.required:
+            allocation[section.name] = section.needed()
+            remaining -= allocation[section.name]
+
+    optional = sorted((s for s in sections if not s.required), key=lambda s: s.priority)
+    for section in optional:
+        grant = min(section.min_tokens, section.needed(), max(remaining, 0))
+        allocation[section.name] = grant
+        remaining -= grant
+    for section in optional:
+        extra = min(section.needed() - allocation[section.name], max(remaining, 0))
+        allocation[section.name] += extra
+        remaining -= extra
+
+    if remaining < 0:
+        print(f"[WARNING] Required prompt sections exceed the token budget by {-remaining} tokens")
+
+    values = dict(empty)
+    for section in sections:
+        values[section.name] = section.render(allocation[section.name])
+    return template.format(**values)
+
+
+def _field_names(template: str) -> List[str]:
+    return [field for _, field, _, _ in string.Formatter().parse(template) if field]
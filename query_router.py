@@ -0,0 +1,177 @@
+"""
+Query Router Module
+Decides how ``/ask`` should answer a query by comparing its embedding with
+labelled prototype queries, using the MiniLM model already loaded for the
+training store. Low-confidence queries are classified by the LLM instead.
+"""
+
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+from llm_backend import ROUTING, for_task
+from intent_parser import parse_intent
+from metrics import track
+
+# Configuration
+CONFIDENCE_THRESHOLD = 0.45  # cosine similarity of the nearest prototype
+MARGIN = 0.05  # required lead over the runner-up route
+
+# Route labels returned by QueryRouter.route()
+LOG_ANALYSIS = "log_analysis"
+INCIDENT_SUGGESTION = "incident_suggestion"
+TOOLS = "tools"
+GENERAL_CHAT = "general_chat"
+
+ROUTE_PROTOTYPES = {
+    LOG_ANALYSIS: [
+        "what errors are in the logs",
+        "show me the exceptions from the application log",
+        "why did the service crash according to the logs",
+        "find the stack trace for the failure",
+        "are there any warnings in the uploaded log file",
+        "summarize the log errors from last night",
+        "what caused the timeout in the logs",
+    ],
+    INCIDENT_SUGGESTION: [
+        "how do I fix this issue we had before",
+        "suggest a resolution for the database connection failure",
+        "have we seen this incident in the past",
+        "what was the fix last time the pods were crashlooping",
+        "recommend a solution based on previous incidents",
+    ],
+    # Tool prototypes, labelled per tool so every tool gets its own neighbourhood
+    "add_numbers": ["add 3 and 5", "what is the sum of 10, 20 and 30", "plus these numbers"],
+    "subtract": ["subtract 4 from 10", "what is 10 minus 3"],
+    "multiply": ["multiply 6 by 7", "what is the product of 3 and 9"],
+    "divide": ["divide 10 by 2", "what is 100 divided by 4"],
+    "get_weather": ["what's the weather in Paris", "is it raining in London", "temperature in Bangalore today"],
+    "summarize_email": ["summarize the email with subject quarterly results", "give me a summary of that mail"],
+    "mark_email": ["mark the email with subject offsite as read", "mark that message unread"],
+    "email_agent": ["send email to bob@example.com subject hello body see you tomorrow", "email alice about the meeting"],
+    "get_events_by_date": ["show my meetings for tomorrow", "list the events for August 10", "what is on my calendar next friday"],
+    "schedule_meeting_llm": ["schedule a meeting called team sync tomorrow at 3 pm", "set up a call with alice on monday at 10"],
+    "analyze_document": ["analyze the document at uploaded_docs/report.pdf", "summarize the pdf file at this path"],
+    GENERAL_CHAT: [
+        "tell me a joke",
+        "explain how kubernetes works",
+        "what is the capital of france",
+        "write a haiku about autumn",
+        "what is the difference between a process and a thread",
+    ],
+}
+
+_ROUTES = [LOG_ANALYSIS, INCIDENT_SUGGESTION, TOOLS, GENERAL_CHAT]
+
+
+def _route_of(label: str) -> str:
+    return label if label in (LOG_ANALYSIS, INCIDENT_SUGGESTION, GENERAL_CHAT) else TOOLS
+
+
+class QueryRouter:
+    """Nearest-prototype classifier over sentence embeddings."""
+
+    def __init__(
+        self,
+        model_getter: Callable,
+        prototypes: dict = ROUTE_PROTOTYPES,
+        threshold: float = CONFIDENCE_THRESHOLD,
+        margin: float = MARGIN,
+        llm: Callable[[str], str] = for_task(ROUTING),
+    ):
+        self.model_getter = model_getter
+        self.prototypes = prototypes
+        self.threshold = threshold
+        self.margin = margin
+        self.llm = llm
+        self._matrix = None
+        self._labels = None
+
+    def _ensure_index(self):
+        if self._matrix is not None:
+            return
+        labels, texts = [], []
+        for label, examples in self.prototypes.items():
+            labels.extend([label] * len(examples))
+            texts.extend(examples)
+        self._matrix = np.asarray(self.model_getter().encode(texts, normalize_embeddings=True), dtype=np.float32)
+        self._labels = labels
+
+    def warm(self):
+        """Encode the prototypes ahead of the first query."""
+        self._ensure_index()
+
+    def scores(self, query: str) -> dict:
+        """Return the best cosine similarity per route."""
+        return self.scores_many([query])[0]
+
+    def scores_many(self, queries: list) -> list:
+        """Like scores(), but encodes all queries in one pass."""
+        self._ensure_index()
+        with track("embedding_encode"):
+            vectors = np.asarray(self.model_getter().encode(list(queries), normalize_embeddings=True), dtype=np.float32)
+        results = []
+        for similarities in vectors @ self._matrix.T:
+            best = {route: -1.0 for route in _ROUTES}
+            for label, score in zip(self._labels, similarities):
+                route = _route_of(label)
+                if score > best[route]:
+                    best[route] = float(score)
+            results.append(best)
+        return results
+
+    def route(self, query: str) -> str:
+        """
+        Pick the handler for a query.
+
+        Returns:
+            One of LOG_ANALYSIS, INCIDENT_SUGGESTION, TOOLS or GENERAL_CHAT
+        """
+        return self.route_many([query])[0]
+
+    def route_many(self, queries: list) -> list:
+        """Route several queries with a single encoder call."""
+        started = time.perf_counter()
+        routes = [None] * len(queries)
+
+        # Queries the local intent parser understands always go to the tools
+        pending = []
+        for i, query in enumerate(queries):
+            if parse_intent(query):
+                routes[i] = TOOLS
+            else:
+                pending.append(i)
+
+        if pending:
+            all_scores = self.scores_many([queries[i] for i in pending])
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            for i, best in zip(pending, all_scores):
+                routes[i] = self._decide(queries[i], best, elapsed_ms)
+        return routes
+
+    def _decide(self, query: str, best: dict, elapsed_ms: float) -> str:
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        (route, score), (_, runner_up) = ranked[0], ranked[1]
+
+        if score >= self.threshold and score - runner_up >= self.margin:
+            print(f"[INFO] Routed to {route} (score={score:.2f}, {elapsed_ms:.1f} ms)")
+            return route
+
+        print(f"[INFO] Low routing confidence ({route}={score:.2f}, runner-up={runner_up:.2f}), asking LLM")
+        return self._llm_route(query) or route
+
+    def _llm_route(self, query: str) -> Optional[str]:
+        prompt = (
+            "Classify the user query into exactly one category and reply with only the category name.\n"
+            f"- {LOG_ANALYSIS}: questions about errors, exceptions or events in uploaded log files\n"
+            f"- {INCIDENT_SUGGESTION}: asking how to resolve an issue based on past incidents\n"
+            f"- {TOOLS}: arithmetic, weather, email, calendar, meeting scheduling or document analysis\n"
+            f"- {GENERAL_CHAT}: anything else\n"
+            f"\nQuery: {query}"
+        )
+        answer = self.llm(prompt).strip().lower()
+        for route in _ROUTES:
+            if route in answer:
+                return route
+        return None
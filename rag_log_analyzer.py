@@ -1,32 +1,30 @@
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import TextLoader
 from typing import Any, List, Optional
 from pydantic import Field
+import numpy as np
 import os
+import threading
 
 # Import Claude CLI client
-from claude_cli_client import call_claude
+from llm_backend import call_claude
+from prompt_builder import Section, build_prompt
+from metrics import track
+from file_lock import file_lock
+from answer_cache import LOG_ANALYSIS, get_answer_cache
+from index_server import enabled as index_server_enabled, remote
+from vector_compression import (
+    build_index, index_type, is_exact, load_exact_vectors, save_exact_vectors, search as search_index, set_search_params
+)
 
 
-# Simple RAG Chain class that doesn't use deprecated RetrievalQA
-class SimpleRAGChain:
-    """Simple RAG chain using Claude CLI"""
+# Candidates fetched per query; the prompt builder keeps as many as fit
+RETRIEVAL_CANDIDATES = 20
 
-    def __init__(self, retriever):
-        self.retriever = retriever
+LOG_INDEX_DIR = "embeddings"
+LOG_LOCK_FILE = os.path.join(LOG_INDEX_DIR, ".lock")
+# flat (exact float32), fp16, int8 or ivfpq; see vector_compression
+LOG_INDEX_TYPE = index_type(os.getenv("LOG_INDEX_TYPE", "flat"))
 
-    def run(self, query: str) -> str:
-        """Run the RAG chain"""
-        # Retrieve relevant documents
-        docs = self.retriever.get_relevant_documents(query)
-
-        # Format context from retrieved documents
-        context = "\n\n".join([doc.page_content for doc in docs])
-
-        # Create prompt for Claude
-        prompt = f"""Based on the following log excerpts, answer the question.
+RAG_PROMPT = """Based on the following log excerpts, answer the question.
 
 Log Context:
 {context}
@@ -35,29 +33,117 @@ Question: {query}
 
 Please provide a detailed answer based on the log information above."""
 
+
+# langchain, FAISS and the embedding model are imported on first use, so that
+# importing this module (and main_fastapi) stays fast
+_embeddings = None
+_qa_chain = None
+_lock = threading.Lock()
+
+
+def get_embeddings():
+    """Shared MiniLM embeddings for the log and document indexes (the training store's model)."""
+    global _embeddings
+    with _lock:
+        if _embeddings is None:
+            from encoder_backend import EncoderEmbeddings
+            from training_store import get_model
+            _embeddings = EncoderEmbeddings(get_model())
+        return _embeddings
+
+
+# Simple RAG Chain class that doesn't use deprecated RetrievalQA
+class SimpleRAGChain:
+    """Simple RAG chain using Claude CLI"""
+
+    def __init__(self, retriever, exact_vectors=None, version=None):
+        self.retriever = retriever
+        # float32 vectors for re-ranking results from a compressed index
+        self.exact_vectors = exact_vectors
+        # log_index_version() of the index this chain searches
+        self.version = version
+
+    def _version(self) -> str:
+        # Cached answers are keyed on the index the chain actually searched
+        return self.version or log_index_version()
+
+    def run(self, query: str) -> str:
+        """Run the RAG chain; near-duplicates of recent questions are answered from the answer cache"""
+        def produce():
+            # Retrieve relevant documents
+            docs = self.retrieve_many([query])[0]
+            return self.answer(query, docs)
+
+        return get_answer_cache().answer(LOG_ANALYSIS, query, self._version(), produce)
+
+    def run_retrieved(self, query: str, docs: list) -> str:
+        """Like run(), for documents already retrieved (batch requests); goes through the same answer cache"""
+        return get_answer_cache().answer(LOG_ANALYSIS, query, self._version(), lambda: self.answer(query, docs))
+
+    def retrieve_many(self, queries: List[str]) -> List[list]:
+        """Retrieve documents for several queries with one embedding pass and one FAISS search"""
+        if isinstance(self.retriever, RemoteLogRetriever):
+            return search_logs(queries)
+
+        store = self.retriever.vectorstore
+        k = self.retriever.search_kwargs.get("k", 4)
+
+        with track("embedding_encode"):
+            vectors = np.asarray(store.embeddings.embed_documents(queries), dtype=np.float32)
+        with track("index_search"):
+            rows = search_index(store.index, vectors, k, self.exact_vectors)
+
+        results = []
+        for row in rows:
+            docs = [store.docstore.search(store.index_to_docstore_id[int(i)]) for i in row]
+            results.append(docs)
+        return results
+
+    def answer(self, query: str, docs: list) -> str:
+        """Answer a query from already retrieved documents"""
+        # Pack as many of the ranked excerpts as the token budget allows
+        prompt = build_prompt(RAG_PROMPT, [
+            Section("query", query, required=True),
+            Section("context", chunks=[doc.page_content for doc in docs]),
+        ])
+
         # Call Claude
         response = call_claude(prompt)
         return response
 
 
+class RemoteLogRetriever:
+    """Retriever backed by the log index held in the index server."""
+
+    def get_relevant_documents(self, query: str) -> list:
+        return search_logs([query])[0]
+
+
+@remote
+def search_logs(queries: List[str]) -> List[list]:
+    """Top RETRIEVAL_CANDIDATES log chunks for each query."""
+    return get_qa_chain().retrieve_many(queries)
+
+
 # Load logs and embed
+@remote(send_result=False)
 def build_vectorstore(log_path="logs/sample.log"):
+    from langchain_community.document_loaders import TextLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     loader = TextLoader(log_path)
     docs = loader.load()
     splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
     split_docs = splitter.split_documents(docs)
 
-    # Use HuggingFace embeddings instead of Ollama
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True}
-    )
-    db = FAISS.from_documents(split_docs, embeddings)
-    db.save_local("embeddings")
+    db = _build_store(split_docs)
     return db
 
+@remote(send_result=False)
 def build_vectorstore_from_all_logs(log_dir="logs"):
+    from langchain_community.document_loaders import TextLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     all_docs = []
     splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
 
@@ -72,29 +158,74 @@ def build_vectorstore_from_all_logs(log_dir="logs"):
     if not all_docs:
         raise ValueError("No .log files found to index.")
 
-    # Use HuggingFace embeddings instead of Ollama
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True}
-    )
-    db = FAISS.from_documents(all_docs, embeddings)
-    db.save_local("embeddings")
+    with track("index_build"):
+        db = _build_store(all_docs)
     return db
 
-def get_qa_chain():
-    # Use HuggingFace embeddings instead of Ollama
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True}
-    )
-    db = FAISS.load_local("embeddings", embeddings, allow_dangerous_deserialization=True)
-
-    retriever = db.as_retriever(search_kwargs={"k": 3})
+def _build_store(docs):
+    """Embed the chunks into a LOG_INDEX_TYPE index, save it with its re-ranking vectors and serve it."""
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    embeddings = get_embeddings()
+    with track("embedding_encode"):
+        vectors = np.asarray(embeddings.embed_documents([doc.page_content for doc in docs]), dtype=np.float32)
+    index = build_index(vectors, LOG_INDEX_TYPE)
+
+    ids = [str(i) for i in range(len(docs))]
+    db = FAISS(embeddings, index, InMemoryDocstore(dict(zip(ids, docs))), dict(enumerate(ids)))
+    # Other workers load the index under the shared lock, so they never read a half-written one
+    with file_lock(LOG_LOCK_FILE):
+        db.save_local(LOG_INDEX_DIR)
+        save_exact_vectors(LOG_INDEX_DIR, None if is_exact(index) else vectors)
+        version = log_index_version()
+    print(f"[INFO] Log index: {len(docs)} chunks, type {LOG_INDEX_TYPE}")
+
+    _set_qa_chain(db, load_exact_vectors(LOG_INDEX_DIR), version)
+    return db
 
+def _set_qa_chain(db, exact_vectors=None, version=None):
+    global _qa_chain
     # Use simple RAG chain instead of deprecated RetrievalQA
-    chain = SimpleRAGChain(retriever)
+    chain = SimpleRAGChain(db.as_retriever(search_kwargs={"k": RETRIEVAL_CANDIDATES}), exact_vectors, version)
+    with _lock:
+        _qa_chain = chain
     return chain
 
-
+def get_qa_chain():
+    """
+    RAG chain over the log index. The index is read from disk once, and read
+    again when it changed on disk: without the index server, another worker
+    may have rebuilt it.
+    """
+    if index_server_enabled():
+        return SimpleRAGChain(RemoteLogRetriever())
+    chain = _qa_chain
+    if chain is not None and chain.version == log_index_version():
+        return chain
+
+    from langchain_community.vectorstores import FAISS
+
+    embeddings = get_embeddings()
+    with file_lock(LOG_LOCK_FILE, shared=True), track("index_load"):
+        version = log_index_version()
+        db = FAISS.load_local(LOG_INDEX_DIR, embeddings, allow_dangerous_deserialization=True)
+        set_search_params(db.index)
+        exact_vectors = load_exact_vectors(LOG_INDEX_DIR)
+    if chain is not None:
+        print(f"[INFO] Log index changed on disk, reloaded version {version}")
+    return _set_qa_chain(db, exact_vectors, version)
+
+
+def log_index_version() -> str:
+    """Changes whenever the log index is rebuilt."""
+    try:
+        stat = os.stat(os.path.join(LOG_INDEX_DIR, "index.faiss"))
+    except FileNotFoundError:
+        return "none"
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+@remote
+def has_log_index() -> bool:
+    return _qa_chain is not None or os.path.exists(os.path.join(LOG_INDEX_DIR, "index.faiss"))
@@ -0,0 +1,122 @@
+"""
+Summary Cache Module
+Stores LLM summaries keyed by (content hash, prompt template version, model),
+so summarizing the same email or document twice - even under a different
+filename - is answered from disk without calling Claude again. The model is
+the one that actually answered, which after a failover is not the primary
+backend's.
+"""
+
+import functools
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+from llm_backend import SUMMARY, LLMResult, generate, models_for
+from metrics import record_cache
+
+# Configuration
+SUMMARY_CACHE_DB = "summary_cache.db"
+MAX_ENTRIES = 5000  # least recently used entries are evicted beyond this
+
+
+def content_hash(text: str) -> str:
+    """Hash text after normalizing line endings and surrounding whitespace."""
+    normalized = text.replace("\r\n", "\n").strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """SQLite-backed LRU cache of summaries."""
+
+    def __init__(self, db_path: str = SUMMARY_CACHE_DB, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS summaries (
+                    content_hash TEXT,
+                    template_version TEXT,
+                    model TEXT,
+                    summary TEXT,
+                    last_used REAL,
+                    PRIMARY KEY (content_hash, template_version, model)
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_used ON summaries(last_used)")
+
+    def get(self, digest: str, template_version: str, model: str) -> Optional[str]:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT summary FROM summaries WHERE content_hash = ? AND template_version = ? AND model = ?",
+                (digest, template_version, model),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE summaries SET last_used = ? WHERE content_hash = ? AND template_version = ? AND model = ?",
+                (time.time(), digest, template_version, model),
+            )
+            return row[0]
+
+    def put(self, digest: str, template_version: str, model: str, summary: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?)",
+                (digest, template_version, model, summary, time.time()),
+            )
+            self._conn.execute(
+                """DELETE FROM summaries WHERE rowid IN (
+                       SELECT rowid FROM summaries ORDER BY last_used DESC LIMIT -1 OFFSET ?)""",
+                (self.max_entries,),
+            )
+
+    def summarize(
+        self,
+        text: str,
+        template: str,
+        template_version: str,
+        llm: Callable[[str], LLMResult] = functools.partial(generate, task=SUMMARY),
+    ) -> LLMResult:
+        """
+        Return a cached summary of ``text`` or produce one with ``llm``.
+
+        Args:
+            text: Content to summarize
+            template: Prompt template with a ``{text}`` placeholder
+            template_version: Bump this whenever ``template`` changes
+            llm: Function that sends a prompt and returns an LLMResult
+
+        Returns:
+            The summary; ``ok`` is False if the LLM call failed
+        """
+        digest = content_hash(text)
+        # A summary from any model that may answer the task will do, preferring the primary's
+        for model in models_for(SUMMARY):
+            summary = self.get(digest, template_version, model)
+            if summary is not None:
+                record_cache("summary", True)
+                print(f"[INFO] Summary cache hit ({template_version}, {digest[:12]})")
+                return LLMResult(summary, True, model)
+        record_cache("summary", False)
+
+        result = llm(template.format(text=text))
+        result = result._replace(text=result.text.strip())
+        # Don't remember failures, so the next request retries the LLM
+        if result.ok and result.model:
+            self.put(digest, template_version, result.model, result.text)
+        return result
+
+
+_default_cache = None
+
+
+def get_summary_cache() -> SummaryCache:
+    """Return the process-wide summary cache, creating it on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SummaryCache()
+    return _default_cache
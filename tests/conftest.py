@@ -0,0 +1,36 @@
+import hashlib
+import os
+import re
+import sys
+
+import numpy as np
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def api(tmp_path_factory):
+    """main_fastapi, imported in a scratch directory so its runtime files stay out of the tree."""
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("api"))
+    try:
+        import main_fastapi
+    finally:
+        os.chdir(cwd)
+    return main_fastapi
+
+
+class HashingEncoder:
+    """Bag-of-words stand-in for MiniLM: deterministic, no model download."""
+
+    dimension = 512
+
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dimension] += 1
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
@@ -0,0 +1,176 @@
+import json
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import answer_cache
+from answer_cache import LOG_ANALYSIS, TRAINING, AnswerCache
+from conftest import HashingEncoder
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(answer_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    encoder = HashingEncoder()
+    return AnswerCache(lambda: encoder, db_path=str(tmp_path / "answers.db"), threshold=0.9, ttl=60)
+
+
+class Producer:
+    def __init__(self, answer="restart the service"):
+        self.answer = answer
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.answer
+
+
+def test_near_duplicate_questions_share_an_answer(cache):
+    produce = Producer()
+
+    first = cache.answer(LOG_ANALYSIS, "why did the payment service crash", "v1", produce)
+    second = cache.answer(LOG_ANALYSIS, "Why did the payment service crash?", "v1", produce)
+
+    assert first == second == "restart the service"
+    assert produce.calls == 1
+
+
+def test_dissimilar_questions_and_other_namespaces_miss(cache):
+    produce = Producer()
+    cache.answer(LOG_ANALYSIS, "why did the payment service crash", "v1", produce)
+
+    cache.answer(LOG_ANALYSIS, "how many logins failed yesterday", "v1", produce)
+    cache.answer(TRAINING, "why did the payment service crash", "v1", produce)
+
+    assert produce.calls == 3
+
+
+def test_new_index_version_invalidates_answers(cache):
+    produce = Producer()
+    cache.answer(LOG_ANALYSIS, "disk full on db1", "v1", produce)
+
+    cache.answer(LOG_ANALYSIS, "disk full on db1", "v2", produce)
+    assert produce.calls == 2
+
+    # Writing under v2 dropped the v1 entry for good
+    cache.answer(LOG_ANALYSIS, "disk full on db1", "v1", produce)
+    assert produce.calls == 3
+
+
+def test_entries_expire_after_the_ttl(cache, clock):
+    produce = Producer()
+    cache.answer(LOG_ANALYSIS, "disk full on db1", "v1", produce)
+
+    clock.now += 30
+    cache.answer(LOG_ANALYSIS, "disk full on db1", "v1", produce)
+    assert produce.calls == 1
+
+    clock.now += 31  # the in-memory matrix still holds the row, but it is past its TTL
+    cache.answer(LOG_ANALYSIS, "disk full on db1", "v1", produce)
+    assert produce.calls == 2
+
+
+def test_expired_entry_does_not_shadow_a_fresh_match(cache, clock):
+    vector = cache._embed("disk full on db1")
+    cache.put(LOG_ANALYSIS, "disk full on db1", vector, "v1", "old answer")
+    clock.now += 50
+    cache.put(LOG_ANALYSIS, "disk full on db1", vector, "v1", "new answer")
+    cache.lookup(LOG_ANALYSIS, vector, "v1")  # loads both rows into the matrix
+
+    clock.now += 20  # only the first entry expired
+
+    assert cache.lookup(LOG_ANALYSIS, vector, "v1") == "new answer"
+
+
+def test_failures_are_not_cached(cache):
+    failing = Producer("Error: Claude CLI timed out")
+    assert cache.answer(LOG_ANALYSIS, "disk full on db1", "v1", failing).startswith("Error")
+
+    produce = Producer()
+    assert cache.answer(LOG_ANALYSIS, "disk full on db1", "v1", produce) == "restart the service"
+    assert produce.calls == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    encoder = HashingEncoder()
+    cache = AnswerCache(lambda: encoder, db_path=str(tmp_path / "answers.db"), threshold=0.9, max_entries=2)
+    questions = ["disk full on db1", "certificate expired on web", "login failures for admin"]
+    for question in questions[:2]:
+        clock.now += 1
+        cache.answer(TRAINING, question, "v1", Producer(question.upper()))
+    clock.now += 1
+    cache.answer(TRAINING, questions[0], "v1", Producer())  # a hit refreshes it
+
+    clock.now += 1
+    cache.answer(TRAINING, questions[2], "v1", Producer(questions[2].upper()))
+
+    produce = Producer()
+    assert cache.answer(TRAINING, questions[0], "v1", produce) == questions[0].upper()
+    assert cache.answer(TRAINING, questions[2], "v1", produce) == questions[2].upper()
+    cache.answer(TRAINING, questions[1], "v1", produce)
+    assert produce.calls == 1
+
+
+def test_answers_written_by_another_worker_are_seen(tmp_path, clock):
+    encoder = HashingEncoder()
+    path = str(tmp_path / "answers.db")
+    worker_a = AnswerCache(lambda: encoder, db_path=path, threshold=0.9)
+    worker_b = AnswerCache(lambda: encoder, db_path=path, threshold=0.9)
+    worker_b.answer(LOG_ANALYSIS, "why is the queue backed up", "v1", Producer("scale consumers"))  # caches "no rows"
+
+    worker_a.answer(LOG_ANALYSIS, "disk full on db1", "v1", Producer("free space"))
+
+    produce = Producer()
+    assert worker_b.answer(LOG_ANALYSIS, "disk full on db1", "v1", produce) == "free space"
+    assert produce.calls == 0
+
+
+def test_batch_suggestions_go_through_the_answer_cache(api, cache, monkeypatch):
+    prompts = []
+    monkeypatch.setattr(api, "get_answer_cache", lambda: cache)
+    monkeypatch.setattr(api, "find_similar_issues_batch", lambda queries: [[] for _ in queries])
+    monkeypatch.setattr(api, "training_data_version", lambda: "t1")
+    monkeypatch.setattr(api, "call_llm", lambda prompt: prompts.append(prompt) or "check the certificate")
+    client = TestClient(api.app)
+    queries = ["certificate expired on web", "Certificate expired on web!"]
+
+    response = client.post("/suggest-resolution/batch", json={"queries": queries, "concurrency": 1})
+
+    lines = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda line: line["index"])
+    assert [line["suggestion"] for line in lines] == ["check the certificate"] * 2
+    assert len(prompts) == 1
+
+
+def test_process_wide_cache_is_created_once(monkeypatch):
+    created = []
+    monkeypatch.setattr(answer_cache, "_default_cache", None)
+    monkeypatch.setattr(answer_cache, "AnswerCache", lambda encoder_getter: created.append(object()) or created[-1])
+    barrier = threading.Barrier(8)
+    caches = []
+
+    def worker():
+        barrier.wait()
+        caches.append(answer_cache.get_answer_cache())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1 and all(cache is created[0] for cache in caches)
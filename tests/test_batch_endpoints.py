@@ -0,0 +1,75 @@
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from query_router import GENERAL_CHAT
+
+
+@pytest.fixture
+def client(api):
+    return TestClient(api.app)
+
+
+@pytest.fixture
+def chat_llm(api, monkeypatch):
+    """Route every query to general chat and record how many LLM calls overlap."""
+    state = {"running": 0, "peak": 0, "prompts": []}
+    lock = threading.Lock()
+
+    def call_llm(prompt):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            state["prompts"].append(prompt)
+        time.sleep(0.02)
+        with lock:
+            state["running"] -= 1
+        if prompt == "boom":
+            raise RuntimeError("backend down")
+        return prompt.upper()
+
+    monkeypatch.setattr(api.query_router, "route_many", lambda queries: [GENERAL_CHAT] * len(queries))
+    monkeypatch.setattr(api, "call_llm", call_llm)
+    return state
+
+
+def lines(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_every_query_gets_one_line_with_its_index(client, chat_llm):
+    response = client.post("/ask/batch", json={"queries": ["a", "b", "c"]})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = sorted(lines(response), key=lambda line: line["index"])
+    assert results == [
+        {"index": 0, "query": "a", "response": "A"},
+        {"index": 1, "query": "b", "response": "B"},
+        {"index": 2, "query": "c", "response": "C"},
+    ]
+
+
+def test_concurrency_is_capped(client, chat_llm, api):
+    client.post("/ask/batch", json={"queries": [f"q{i}" for i in range(12)], "concurrency": 2})
+    assert chat_llm["peak"] <= 2
+
+    chat_llm["peak"] = 0
+    client.post("/ask/batch", json={"queries": [f"q{i}" for i in range(12)], "concurrency": 100})
+    assert chat_llm["peak"] <= api.BATCH_CONCURRENCY
+
+
+def test_failing_query_reports_an_error_and_the_rest_still_answer(client, chat_llm):
+    results = {line["index"]: line for line in lines(client.post("/ask/batch", json={"queries": ["ok", "boom"]}))}
+
+    assert results[0]["response"] == "OK"
+    assert results[1] == {"index": 1, "query": "boom", "error": "backend down"}
+
+
+def test_empty_and_oversized_batches_are_rejected(client, api):
+    assert client.post("/ask/batch", json={"queries": []}).status_code == 400
+    too_many = ["q"] * (api.MAX_BATCH_SIZE + 1)
+    assert client.post("/suggest-resolution/batch", json={"queries": too_many}).status_code == 400
@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta
+
+import httplib2
+import pytz
+from googleapiclient.errors import HttpError
+
+from calendar_store import CalendarEventStore
+
+TZ = pytz.timezone("Asia/Kolkata")
+
+
+def event(event_id, start, hours=1, **extra):
+    return {
+        "id": event_id,
+        "start": {"dateTime": start.isoformat()},
+        "end": {"dateTime": (start + timedelta(hours=hours)).isoformat()},
+        **extra,
+    }
+
+
+class FakeCalendar:
+    """events().list(...).execute() over scripted responses, keyed by sync token."""
+
+    def __init__(self, pages, changes=None, expired=()):
+        self.full_pages = pages  # list of item lists, one per page
+        self.changes = changes or {}  # sync token -> changed items
+        self.expired = set(expired)
+        self.requests = []
+
+    def events(self):
+        return self
+
+    def list(self, **params):
+        self.requests.append(params)
+        self._params = params
+        return self
+
+    def execute(self):
+        token = self._params.get("syncToken")
+        if token in self.expired:
+            raise HttpError(httplib2.Response({"status": 410}), b"Sync token is no longer valid")
+        if token:
+            return {"items": self.changes.get(token, []), "nextSyncToken": token + "+"}
+        page = int(self._params.get("pageToken", 0))
+        result = {"items": self.full_pages[page]}
+        if page + 1 < len(self.full_pages):
+            result["nextPageToken"] = str(page + 1)
+        else:
+            result["nextSyncToken"] = "t1"
+        return result
+
+
+def make_store(calendar):
+    return CalendarEventStore(lambda: calendar, cache_file=None)
+
+
+def day(hour, date=(2025, 3, 10)):
+    return TZ.localize(datetime(*date, hour))
+
+
+def test_full_sync_pages_and_day_queries():
+    calendar = FakeCalendar([
+        [event("a", day(9)), event("b", day(14))],
+        [event("c", day(10, (2025, 3, 11)))],
+    ])
+    store = make_store(calendar)
+
+    assert store.sync() == 3
+    assert [e["id"] for e in store.events_on("2025-03-10")] == ["a", "b"]
+    assert [e["id"] for e in store.events_on("2025-03-11")] == ["c"]
+    assert store.events_on("2025-03-12") == []
+
+
+def test_events_spanning_the_range_start_are_found():
+    # Starts the day before but is still running: the index looks back by the longest duration
+    calendar = FakeCalendar([[event("night", day(22, (2025, 3, 9)), hours=12), event("a", day(9))]])
+    store = make_store(calendar)
+    store.sync()
+
+    assert [e["id"] for e in store.events_on("2025-03-10")] == ["night", "a"]
+
+
+def test_incremental_sync_uses_the_token_and_applies_changes():
+    calendar = FakeCalendar(
+        [[event("a", day(9)), event("b", day(14))]],
+        changes={"t1": [{"id": "a", "status": "cancelled"}, event("b", day(16)), event("d", day(11))]},
+    )
+    store = make_store(calendar)
+    store.sync()
+
+    assert store.sync() == 3
+    assert calendar.requests[-1]["syncToken"] == "t1"
+    assert [(e["id"], e["start"]["dateTime"]) for e in store.events_on("2025-03-10")] == [
+        ("d", day(11).isoformat()), ("b", day(16).isoformat()),
+    ]
+
+
+def test_expired_sync_token_falls_back_to_a_full_sync():
+    calendar = FakeCalendar([[event("a", day(9))]], expired={"t1"})
+    store = make_store(calendar)
+    store.sync()
+    store.apply_insert(event("stale", day(12)))  # dropped by the full resync
+
+    store.sync()
+
+    assert "syncToken" not in calendar.requests[-1]
+    assert [e["id"] for e in store.events_on("2025-03-10")] == ["a"]
+
+
+def test_local_edits_show_up_before_the_next_sync():
+    store = make_store(FakeCalendar([[event("a", day(9))]]))
+    store.sync()
+
+    store.apply_insert(event("new", day(8)))
+    store.apply_delete("a")
+
+    assert [e["id"] for e in store.events_on("2025-03-10")] == ["new"]
+
+
+def test_upcoming_skips_past_events_and_ensure_synced_runs_once():
+    now = datetime.now(TZ)
+    calendar = FakeCalendar([[event("past", now - timedelta(days=1)),
+                              event("later", now + timedelta(days=2)),
+                              event("soon", now + timedelta(hours=1))]])
+    store = make_store(calendar)
+
+    store.ensure_synced()
+    store.ensure_synced()
+
+    assert len(calendar.requests) == 1
+    assert [e["id"] for e in store.upcoming(10)] == ["soon", "later"]
+    assert [e["id"] for e in store.upcoming(1)] == ["soon"]
+
+
+def test_cache_file_round_trip(tmp_path):
+    cache_file = str(tmp_path / "calendar_cache.json")
+    store = CalendarEventStore(lambda: FakeCalendar([[event("a", day(9))]]), cache_file=cache_file)
+    store.sync()
+
+    reloaded = CalendarEventStore(lambda: None, cache_file=cache_file)
+
+    assert reloaded._sync_token == "t1"
+    assert [e["id"] for e in reloaded.events_on("2025-03-10")] == ["a"]
+    assert list(tmp_path.iterdir()) == [tmp_path / "calendar_cache.json"]
@@ -0,0 +1,30 @@
+import subprocess
+
+import claude_cli_client
+from claude_cli_client import call_claude_cli
+
+
+def test_model_and_prompt_reach_the_cli(monkeypatch):
+    runs = []
+
+    def run(cmd, **kwargs):
+        runs.append((cmd, kwargs))
+        return subprocess.CompletedProcess(cmd, 0, stdout=" answer \n", stderr="")
+
+    monkeypatch.setattr(claude_cli_client.subprocess, "run", run)
+
+    assert call_claude_cli("question", system_prompt="Be brief.", model="haiku") == "answer"
+
+    cmd, kwargs = runs[0]
+    assert cmd == [claude_cli_client.CLAUDE_CLI_COMMAND, "--model", "haiku", "chat"]
+    assert kwargs["input"] == "Be brief.\n\nquestion"
+    assert "CLAUDECODE" not in kwargs["env"]
+
+
+def test_failures_are_returned_as_error_text(monkeypatch):
+    def run(cmd, **kwargs):
+        return subprocess.CompletedProcess(cmd, 1, stdout="", stderr="not logged in")
+
+    monkeypatch.setattr(claude_cli_client.subprocess, "run", run)
+
+    assert call_claude_cli("question") == "Error calling Claude CLI: not logged in"
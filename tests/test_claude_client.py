@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import pytest
+
+import claude_client
+from claude_client import _cached_prefix, complete_claude, complete_claude_with_tools
+
+EPHEMERAL = {"type": "ephemeral"}
+TOOLS = [
+    {"name": "get_weather", "description": "Weather for a city", "input_schema": {"type": "object"}},
+    {"name": "send_email", "description": "Send an email", "input_schema": {"type": "object"}},
+]
+
+
+class FakeMessages:
+    def __init__(self):
+        self.requests = []
+
+    def create(self, timeout, **kwargs):
+        self.requests.append(kwargs)
+        usage = SimpleNamespace(input_tokens=10, output_tokens=5, cache_read_input_tokens=0, cache_creation_input_tokens=0)
+        return SimpleNamespace(stop_reason="end_turn", content=[SimpleNamespace(type="text", text="ok")], usage=usage)
+
+
+@pytest.fixture
+def messages(monkeypatch):
+    messages = FakeMessages()
+    monkeypatch.setattr(claude_client, "client", SimpleNamespace(messages=messages))
+    return messages
+
+
+def test_breakpoint_goes_on_the_system_prompt_covering_the_tools():
+    kwargs = {"system": "You route requests.", "tools": TOOLS}
+
+    _cached_prefix(kwargs)
+
+    assert kwargs["system"] == [{"type": "text", "text": "You route requests.", "cache_control": EPHEMERAL}]
+    assert kwargs["tools"] is TOOLS  # no second breakpoint
+
+
+def test_without_a_system_prompt_the_last_tool_is_the_breakpoint():
+    kwargs = {"tools": TOOLS}
+
+    _cached_prefix(kwargs)
+
+    assert kwargs["tools"][:-1] == TOOLS[:-1]
+    assert kwargs["tools"][-1] == {**TOOLS[-1], "cache_control": EPHEMERAL}
+    assert "cache_control" not in TOOLS[-1]  # the shared catalogue is not modified
+
+
+def test_nothing_to_cache_leaves_the_request_alone():
+    kwargs = {"messages": [{"role": "user", "content": "hi"}]}
+
+    _cached_prefix(kwargs)
+
+    assert kwargs == {"messages": [{"role": "user", "content": "hi"}]}
+
+
+def test_tool_calls_cache_their_prefix_by_default(messages):
+    assert complete_claude_with_tools("weather in Paris?", TOOLS, "You route requests.") == {"type": "text", "content": "ok"}
+
+    request = messages.requests[0]
+    assert request["system"][0]["cache_control"] == EPHEMERAL
+    assert request["messages"] == [{"role": "user", "content": "weather in Paris?"}]
+
+
+def test_plain_calls_cache_only_when_asked(messages):
+    complete_claude("hi", "Be brief.")
+    complete_claude("hi", "Be brief.", cache_prefix=True)
+
+    assert messages.requests[0]["system"] == "Be brief."
+    assert messages.requests[1]["system"][0]["cache_control"] == EPHEMERAL
+
+
+def test_caching_can_be_switched_off(messages, monkeypatch):
+    monkeypatch.setattr(claude_client, "PROMPT_CACHING", False)
+
+    complete_claude_with_tools("weather in Paris?", TOOLS)
+
+    assert messages.requests[0]["tools"] == TOOLS
+    assert "cache_control" not in str(messages.requests[0])
@@ -0,0 +1,160 @@
+import threading
+
+import pytest
+
+import conversation_store
+from conversation_store import ConversationStore, extract_entities, get_conversation_store
+from llm_backend import LLMResult
+
+
+class FakeLLM:
+    def __init__(self, ok=True):
+        self.ok = ok
+        self.prompts = []
+        self.before_answer = None  # runs while the "LLM call" is in flight
+
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        if self.before_answer:
+            self.before_answer()
+        if not self.ok:
+            return LLMResult("Error: backend down", False, None)
+        return LLMResult(f"summary {len(self.prompts)}", True, "haiku")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(conversation_store.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def llm():
+    return FakeLLM()
+
+
+@pytest.fixture
+def store(tmp_path, llm, clock):
+    return ConversationStore(llm, db_path=str(tmp_path / "conversations.db"), recent_turns=2, ttl=600)
+
+
+def record_turns(store, session_id, count, start=0):
+    return [store.record(session_id, f"question {i}", f"answer {i}") for i in range(start, start + count)]
+
+
+def test_entities_come_from_the_question_before_the_answer():
+    assert extract_entities('Summarize the email with subject "Q3 budget" from 2024-05-01') == {
+        "last email subject": "Q3 budget",
+        "last date": "2024-05-01",
+    }
+
+    store = ConversationStore(FakeLLM(), db_path=":memory:")
+    store.record("s", "Review https://github.com/acme/api/pull/7", "Also see https://github.com/acme/api/pull/9")
+    assert store.get("s")["entities"] == {"last PR": "https://github.com/acme/api/pull/7"}
+
+
+def test_record_reports_when_turns_overflow_the_window(store):
+    assert record_turns(store, "s", 3) == [False, False, True]
+
+    session = store.get("s")
+    assert [turn["question"] for turn in session["turns"]] == ["question 0", "question 1", "question 2"]
+    assert store.get("other")["turns"] == []
+
+
+def test_structured_answers_are_stored_as_json(store):
+    store.record("s", "list my events", {"events": ["standup"]})
+
+    assert store.get("s")["turns"][0]["answer"] == '{"events": ["standup"]}'
+
+
+def test_compact_folds_old_turns_into_the_summary(store, llm):
+    record_turns(store, "s", 4)
+
+    store.compact("s")
+
+    session = store.get("s")
+    assert session["summary"] == "summary 1"
+    assert [turn["question"] for turn in session["turns"]] == ["question 2", "question 3"]
+    assert "question 1" in llm.prompts[0] and "question 2" not in llm.prompts[0]
+
+    context = store.context("s")
+    assert context.startswith("Summary of the earlier conversation:\nsummary 1")
+    assert "User: question 3\nAssistant: answer 3" in context
+
+
+def test_compact_without_old_turns_makes_no_llm_call(store, llm):
+    record_turns(store, "s", 2)
+
+    store.compact("s")
+    store.compact("missing")
+
+    assert llm.prompts == []
+
+
+def test_failed_summary_keeps_the_turns(store, llm):
+    llm.ok = False
+    record_turns(store, "s", 3)
+
+    store.compact("s")
+
+    assert store.get("s")["summary"] == ""
+    assert len(store.get("s")["turns"]) == 3
+
+
+def test_concurrent_compaction_keeps_the_first_summary(store, llm, tmp_path, capsys):
+    record_turns(store, "s", 3)
+    # Another worker folds the same turns while this one waits for its LLM call
+    other = ConversationStore(FakeLLM(), db_path=str(tmp_path / "conversations.db"), recent_turns=2)
+    llm.before_answer = lambda: other.compact("s")
+
+    store.compact("s")
+
+    assert store.get("s")["summary"] == "summary 1"  # written by the other store
+    assert len(store.get("s")["turns"]) == 2
+    assert capsys.readouterr().out.count("Folded") == 1
+
+
+def test_inactive_sessions_expire(store, clock):
+    record_turns(store, "old", 1)
+    clock.now += 601
+
+    assert store.context("old") == ""
+    store.record("new", "hello", "hi")  # writes purge expired sessions
+    assert store._conn.execute("SELECT COUNT(*) FROM turns WHERE session_id = 'old'").fetchone()[0] == 0
+
+
+def test_delete_removes_the_session(store):
+    record_turns(store, "s", 2)
+
+    store.delete("s")
+
+    assert store.get("s") == {"session_id": "s", "summary": "", "entities": {}, "turns": []}
+
+
+def test_process_wide_store_is_created_once(monkeypatch):
+    created = []
+    monkeypatch.setattr(conversation_store, "_default_store", None)
+    monkeypatch.setattr(conversation_store, "ConversationStore", lambda: created.append(object()) or created[-1])
+    barrier = threading.Barrier(8)
+    stores = []
+
+    def worker():
+        barrier.wait()
+        stores.append(get_conversation_store())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1 and all(s is created[0] for s in stores)
@@ -0,0 +1,104 @@
+import asyncio
+import io
+import os
+import threading
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+import doc_extract
+from doc_extract import UnsupportedFormatError, extract_text, save_upload, upload_filename
+
+
+def upload(name, content):
+    return UploadFile(io.BytesIO(content), filename=name)
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("report.pdf", "report.pdf"),
+    ("../../etc/passwd", "passwd"),
+    ("C:\\Users\\me\\notes.txt", "notes.txt"),
+    ("/abs/path/log.txt", "log.txt"),
+])
+def test_upload_names_lose_client_directories(name, expected):
+    assert upload_filename(name) == expected
+
+
+@pytest.mark.parametrize("name", [None, "", "  ", ".", "..", "dir/", "..\\"])
+def test_uploads_without_a_file_name_are_rejected(name):
+    with pytest.raises(HTTPException) as error:
+        upload_filename(name)
+    assert error.value.status_code == 400
+
+
+def test_upload_is_streamed_to_disk_with_its_hash(tmp_path, monkeypatch):
+    monkeypatch.setattr(doc_extract, "UPLOAD_CHUNK_SIZE", 4)
+    content = b"line one\nline two\n"
+
+    path, digest = asyncio.run(save_upload(upload("../notes.txt", content), str(tmp_path)))
+
+    assert path == str(tmp_path / "notes.txt")
+    assert open(path, "rb").read() == content
+    assert digest == doc_extract.hashlib.sha256(content).hexdigest()
+    assert os.listdir(tmp_path) == ["notes.txt"]
+
+
+def test_oversized_upload_is_rejected_and_leaves_the_existing_file(tmp_path):
+    (tmp_path / "notes.txt").write_bytes(b"old")
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(save_upload(upload("notes.txt", b"x" * 100), str(tmp_path), max_bytes=10))
+
+    assert error.value.status_code == 413
+    assert (tmp_path / "notes.txt").read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["notes.txt"]
+
+
+def test_extracted_text_is_cached_by_content_hash(tmp_path, monkeypatch):
+    monkeypatch.setattr(doc_extract, "EXTRACT_CACHE_DIR", str(tmp_path / "cache"))
+    first, second = tmp_path / "a.txt", tmp_path / "b.txt"
+    first.write_text("same text")
+    second.write_text("same text")
+
+    assert extract_text(str(first)) == "same text"
+    first.write_text("changed on disk")  # same digest given: served from the cache
+    assert extract_text(str(first), doc_extract.file_hash(str(second))) == "same text"
+    assert len(os.listdir(tmp_path / "cache")) == 1
+
+
+def test_unsupported_formats_are_reported(tmp_path):
+    path = tmp_path / "slides.pptx"
+    path.write_bytes(b"PK")
+
+    with pytest.raises(UnsupportedFormatError):
+        extract_text(str(path))
+
+
+def test_concurrent_callers_share_one_process_pool(monkeypatch):
+    created = []
+
+    class FakePool:
+        def __init__(self, max_workers):
+            created.append(self)
+
+        def shutdown(self, cancel_futures=False):
+            self.closed = True
+
+    monkeypatch.setattr(doc_extract, "ProcessPoolExecutor", FakePool)
+    monkeypatch.setattr(doc_extract, "_pool", None)
+    barrier = threading.Barrier(8)
+    pools = []
+
+    def worker():
+        barrier.wait()
+        pools.append(doc_extract._get_pool())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1 and all(pool is created[0] for pool in pools)
+    doc_extract.shutdown_pool()
+    assert created[0].closed and doc_extract._pool is None
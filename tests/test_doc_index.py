@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+import doc_index
+from conftest import HashingEncoder
+from encoder_backend import EncoderEmbeddings
+
+ALPHA = "\n\n".join([
+    "Alpha release notes. The payment service now retries card charges three times.",
+    "Alpha known issues. Exports to CSV drop the header row on Windows.",
+])
+BETA = "Beta onboarding guide. New hires get a laptop, a badge and a buddy on day one."
+
+
+def reset_process_state():
+    """What a freshly started worker has in memory."""
+    doc_index._db = None
+    doc_index._manifest = None
+    doc_index._loaded_version = None
+    doc_index._positions = None
+
+
+@pytest.fixture(autouse=True)
+def index_dir(tmp_path, monkeypatch):
+    directory = str(tmp_path / "doc_embeddings")
+    monkeypatch.setattr(doc_index, "DOC_INDEX_DIR", directory)
+    monkeypatch.setattr(doc_index, "MANIFEST_FILE", os.path.join(directory, "manifest.json"))
+    monkeypatch.setattr(doc_index, "LOCK_FILE", os.path.join(directory, ".lock"))
+    monkeypatch.setattr(doc_index, "CHUNK_SIZE", 100)
+    monkeypatch.setattr(doc_index, "CHUNK_OVERLAP", 0)
+    embeddings = EncoderEmbeddings(HashingEncoder())
+    monkeypatch.setattr(doc_index, "get_embeddings", lambda: embeddings)
+    reset_process_state()
+    yield directory
+    reset_process_state()
+
+
+def test_same_content_is_indexed_once(index_dir):
+    assert doc_index.add_document(ALPHA, "alpha.txt", "a" * 64)
+    assert not doc_index.add_document(ALPHA, "alpha-copy.txt", "a" * 64)
+
+    assert doc_index.list_documents() == {"a" * 64: {"source": "alpha.txt", "chunks": 2}}
+    with open(os.path.join(index_dir, "manifest.json")) as f:
+        assert json.load(f) == doc_index.list_documents()
+
+
+def test_retrieval_can_be_limited_to_one_document():
+    doc_index.add_document(ALPHA, "alpha.txt", "a" * 64)
+    doc_index.add_document(BETA, "beta.txt", "b" * 64)
+
+    best = doc_index.retrieve("payment card charges retries", k=1)
+    assert best[0].metadata["source"] == "alpha.txt"
+
+    # The small document is searched on its own, however well the others match
+    scoped = doc_index.retrieve("payment card charges retries", document_id="b" * 64, k=5)
+    assert [d.metadata["source"] for d in scoped] == ["beta.txt"]
+
+    assert [d.metadata["chunk"] for d in doc_index.retrieve("CSV header row", "a" * 64, k=2)] == [1, 0]
+    assert doc_index.retrieve("anything", document_id="c" * 64) == []
+
+
+def test_documents_added_by_another_worker_are_kept():
+    doc_index.add_document(ALPHA, "alpha.txt", "a" * 64)
+    worker_a = (doc_index._db, doc_index._manifest, doc_index._loaded_version)
+
+    # Worker B starts later, adds its document to the shared files
+    reset_process_state()
+    doc_index.add_document(BETA, "beta.txt", "b" * 64)
+
+    # Worker A still holds the old index in memory, reloads it, and its next add keeps B's document
+    doc_index._db, doc_index._manifest, doc_index._loaded_version = worker_a
+    os.utime(os.path.join(doc_index.DOC_INDEX_DIR, "index.faiss"), ns=(1, 1))  # mtime differs from A's
+    assert set(doc_index.list_documents()) == {"a" * 64, "b" * 64}
+    doc_index.add_document("Gamma. A third document.", "gamma.txt", "c" * 64)
+
+    reset_process_state()
+    assert set(doc_index.list_documents()) == {"a" * 64, "b" * 64, "c" * 64}
+
+
+def test_question_without_indexed_documents_skips_the_llm(monkeypatch):
+    monkeypatch.setattr(doc_index, "call_claude", lambda prompt: pytest.fail("LLM called"))
+
+    assert doc_index.ask_document("what changed?").startswith("No indexed documents")
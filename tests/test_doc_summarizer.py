@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+import doc_summarizer
+import summary_cache
+from doc_summarizer import COMBINE_PROMPT, SECTION_PROMPT, split_sections, summarize_document
+from llm_backend import LLMResult
+from prompt_builder import count_tokens
+from summary_cache import SummaryCache
+
+SECTION_HEAD = SECTION_PROMPT.split("{text}")[0]
+COMBINE_HEAD = COMBINE_PROMPT.split("{text}")[0]
+
+
+class FakeLLM:
+    """Answers by prompt kind; ``fail`` marks prompts (by substring) whose call fails."""
+
+    def __init__(self, partial_words=5, fail=()):
+        self.partial_words = partial_words
+        self.fail = fail
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def kind(self, prompt):
+        if prompt.startswith(SECTION_HEAD):
+            return "section"
+        if prompt.startswith(COMBINE_HEAD):
+            return "combine"
+        return "final"
+
+    def calls(self, kind):
+        return [p for p in self.prompts if self.kind(p) == kind]
+
+    def __call__(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+            number = len(self.prompts)
+        if any(marker in prompt for marker in self.fail):
+            return LLMResult("Error: backend down", False, None)
+        kind = self.kind(prompt)
+        if kind == "final":
+            return LLMResult(f"final summary of {count_tokens(prompt)} tokens", True, "sonnet")
+        return LLMResult(f"{kind}{number} " + "word " * self.partial_words, True, "sonnet")
+
+
+@pytest.fixture(autouse=True)
+def small_sections(tmp_path, monkeypatch):
+    monkeypatch.setattr(summary_cache, "models_for", lambda task: ["sonnet"])
+    cache = SummaryCache(str(tmp_path / "summaries.db"))
+    monkeypatch.setattr(doc_summarizer, "get_summary_cache", lambda: cache)
+    monkeypatch.setattr(split_sections, "__defaults__", (50,))
+
+
+def document(paragraphs, words=30):
+    return "\n\n".join(f"p{i} " + "text " * words for i in range(paragraphs))
+
+
+def test_sections_follow_paragraphs_and_stay_within_the_limit():
+    text = document(6) + "\n\n" + "x" * 1000
+
+    sections = split_sections(text, 100)
+
+    assert all(count_tokens(section) <= 100 for section in sections)
+    assert sections[0].startswith("p0") and "p1" in sections[0]  # two paragraphs fit together
+    assert "".join(sections[-3:]) == "x" * 1000  # an oversized paragraph is cut in pieces
+    assert split_sections("\n\n\n\n", 100) == []
+
+
+def test_short_document_is_summarized_in_one_call():
+    llm = FakeLLM()
+
+    assert summarize_document("one paragraph", "brief", llm=llm).startswith("final summary")
+    assert len(llm.prompts) == 1 and llm.calls("final")
+
+
+def test_long_document_is_mapped_then_merged_and_sections_are_reused():
+    llm = FakeLLM()
+    text = document(8)
+
+    summarize_document(text, "brief", llm=llm, concurrency=3)
+    sections = len(split_sections(text))
+    assert len(llm.calls("section")) == sections > 1
+    assert "Part 1:" in llm.calls("final")[0] and f"Part {sections}:" in llm.calls("final")[0]
+
+    # Another detail level reuses the cached section summaries
+    summarize_document(text, "detailed", llm=llm)
+    assert len(llm.calls("section")) == sections
+    assert len(llm.calls("final")) == 2
+
+
+def test_reduce_levels_skip_failed_merges_and_do_not_cache_them(monkeypatch):
+    monkeypatch.setattr(doc_summarizer, "REDUCE_INPUT_TOKENS", 60)
+    # Partials of ~18 tokens are merged three at a time; the merge holding the
+    # first section summary produced fails, the others go on
+    llm = FakeLLM(partial_words=10, fail=("section1 ",))
+    text = document(8)
+
+    summarize_document(text, "brief", llm=llm)
+
+    assert llm.calls("combine")
+    assert "Error" not in llm.calls("final")[0]
+    first_merges = len(llm.calls("combine"))
+
+    # The failed merge is retried next time, the successful ones come from the cache
+    summarize_document(text, "standard", llm=llm)
+    assert len(llm.calls("combine")) == first_merges + 1
+
+
+def test_error_is_returned_when_every_section_fails():
+    llm = FakeLLM(fail=(SECTION_HEAD,))
+
+    result = summarize_document(document(8), llm=llm)
+
+    assert result.startswith("Error")
+    assert not llm.calls("final")
+
+
+def test_unknown_detail_level_is_rejected():
+    with pytest.raises(ValueError):
+        summarize_document("text", "exhaustive", llm=FakeLLM())
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+import encoder_backend
+from conftest import HashingEncoder
+from encoder_backend import EncoderEmbeddings, compare_backends, load_encoder
+
+
+class RecordingEncoder(HashingEncoder):
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(kwargs)
+        return super().encode(texts, **kwargs)
+
+
+class NoisyEncoder(HashingEncoder):
+    """The same embeddings with a small perturbation, like a quantized export."""
+
+    def encode(self, texts, **kwargs):
+        vectors = super().encode(texts, **kwargs)
+        return vectors + np.random.default_rng(0).normal(0, 0.01, vectors.shape).astype(np.float32)
+
+
+def test_embeddings_are_normalized_float_lists_encoded_in_batches():
+    encoder = RecordingEncoder()
+    embeddings = EncoderEmbeddings(encoder)
+
+    vectors = embeddings.embed_documents(("disk full", "certificate expired"))
+    query = embeddings.embed_query("disk full")
+
+    assert len(vectors) == 2 and len(vectors[0]) == HashingEncoder.dimension
+    assert isinstance(vectors[0][0], float)
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert query == vectors[0]
+    assert encoder.calls[0] == {"normalize_embeddings": True, "batch_size": encoder_backend.ENCODE_BATCH_SIZE}
+
+
+def test_identical_backends_compare_equal():
+    report = compare_backends(HashingEncoder(), HashingEncoder(), ["disk full", "login failed"])
+
+    assert report["min_cosine"] == pytest.approx(1.0)
+    assert report["max_abs_diff"] == 0.0
+
+
+def test_perturbed_backend_shows_up_in_the_report():
+    report = compare_backends(HashingEncoder(), NoisyEncoder(), ["disk full on /var", "login failed for admin"])
+
+    assert 0.9 < report["min_cosine"] < 1.0
+    assert report["mean_cosine"] >= report["min_cosine"]
+    assert report["max_abs_diff"] > 0
+
+
+@pytest.mark.parametrize("backend, kwargs", [("torch", {}), ("onnx", {"backend": "onnx"})])
+def test_backend_selects_the_inference_runtime(backend, kwargs, monkeypatch):
+    sentence_transformers = pytest.importorskip("sentence_transformers")
+    created = []
+    monkeypatch.setattr(sentence_transformers, "SentenceTransformer", lambda *a, **kw: created.append((a, kw)))
+
+    load_encoder(backend)
+
+    assert created == [((encoder_backend.EMBEDDING_MODEL,), {"device": "cpu", **kwargs})]
+
+
+def test_unknown_backend_is_rejected():
+    pytest.importorskip("sentence_transformers")
+    with pytest.raises(ValueError):
+        load_encoder("tensorrt")
@@ -0,0 +1,52 @@
+import fcntl
+import threading
+import time
+
+from file_lock import file_lock
+
+
+def hold(path, shared, events, name, seconds=0.1):
+    with file_lock(path, shared=shared):
+        events.append(f"{name} in")
+        time.sleep(seconds)
+        events.append(f"{name} out")
+
+
+def run_together(*targets):
+    threads = [threading.Thread(target=hold, args=args) for args in targets]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)  # start in order
+    for thread in threads:
+        thread.join()
+
+
+def test_exclusive_locks_wait_for_each_other(tmp_path):
+    path = str(tmp_path / "locks" / ".lock")  # the directory is created
+    events = []
+
+    run_together((path, False, events, "a"), (path, False, events, "b"))
+
+    assert events == ["a in", "a out", "b in", "b out"]
+
+
+def test_shared_locks_overlap_but_exclude_a_writer(tmp_path):
+    path = str(tmp_path / ".lock")
+    events = []
+
+    run_together((path, True, events, "r1"), (path, True, events, "r2"), (path, False, events, "w"))
+
+    assert events.index("r2 in") < events.index("r1 out")
+    assert events.index("w in") > max(events.index("r1 out"), events.index("r2 out"))
+
+
+def test_lock_is_released_when_the_block_raises(tmp_path):
+    path = str(tmp_path / ".lock")
+    try:
+        with file_lock(path):
+            raise RuntimeError("write failed")
+    except RuntimeError:
+        pass
+
+    with open(path) as f:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)  # raises BlockingIOError if still held
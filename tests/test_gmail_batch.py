@@ -0,0 +1,109 @@
+import gmail_batch
+from gmail_batch import batch_get_messages, iter_message_pages
+
+
+class FakeRequest:
+    def __init__(self, gmail, kwargs):
+        self.gmail = gmail
+        self.kwargs = kwargs
+
+    def execute(self):
+        self.gmail.single_gets.append(self.kwargs["id"])
+        if self.kwargs["id"] in self.gmail.missing:
+            raise RuntimeError("404")
+        return {"id": self.kwargs["id"], "format": self.kwargs["format"]}
+
+
+class FakeBatch:
+    def __init__(self, gmail, callback):
+        self.gmail = gmail
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.gmail.batches.append([request_id for request_id, _ in self.requests])
+        for request_id, request in self.requests:
+            if request_id in self.gmail.flaky or request_id in self.gmail.missing:
+                self.callback(request_id, None, RuntimeError("429"))
+            else:
+                self.callback(request_id, {"id": request_id, "format": request.kwargs["format"]}, None)
+
+
+class FakeGmail:
+    """The parts of the Gmail service the batch helpers use, counting calls."""
+
+    def __init__(self, ids=(), page_size=None, flaky=(), missing=()):
+        self.ids = list(ids)
+        self.flaky = set(flaky)  # fail inside a batch, succeed on retry
+        self.missing = set(missing)  # always fail
+        self.batches = []
+        self.single_gets = []
+        self.list_calls = []
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def get(self, **kwargs):
+        return FakeRequest(self, kwargs)
+
+    def list(self, **kwargs):
+        self.list_calls.append(kwargs)
+        start = int(kwargs.get("pageToken", 0))
+        end = start + kwargs["maxResults"]
+        page = {"messages": [{"id": i} for i in self.ids[start:end]]}
+        if end < len(self.ids):
+            page["nextPageToken"] = str(end)
+        self._page = page
+        return self
+
+    def execute(self):
+        return self._page
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+def test_messages_are_fetched_in_batches_and_keep_their_order(monkeypatch):
+    monkeypatch.setattr(gmail_batch, "BATCH_SIZE", 2)
+    gmail = FakeGmail()
+
+    messages = batch_get_messages(gmail, ["m1", "m2", "m3", "m4", "m5"])
+
+    assert [m["id"] for m in messages] == ["m1", "m2", "m3", "m4", "m5"]
+    assert gmail.batches == [["m1", "m2"], ["m3", "m4"], ["m5"]]
+    assert gmail.single_gets == []
+
+
+def test_failed_batch_entries_are_retried_once_and_dropped_if_still_failing():
+    gmail = FakeGmail(flaky={"m2"}, missing={"m3"})
+
+    messages = batch_get_messages(gmail, ["m1", "m2", "m3"], format="full")
+
+    assert [m["id"] for m in messages] == ["m1", "m2"]
+    assert messages[1]["format"] == "full"
+    assert gmail.single_gets == ["m2", "m3"]
+
+
+def test_pages_cost_one_list_and_one_batch_call_each():
+    gmail = FakeGmail(ids=[f"m{i}" for i in range(5)])
+
+    pages = list(iter_message_pages(gmail, query="is:unread", page_size=2))
+
+    assert [[m["id"] for m in page] for page in pages] == [["m0", "m1"], ["m2", "m3"], ["m4"]]
+    assert len(gmail.list_calls) == 3 and len(gmail.batches) == 3
+    assert all(call["q"] == "is:unread" for call in gmail.list_calls)
+
+
+def test_max_messages_stops_early():
+    gmail = FakeGmail(ids=[f"m{i}" for i in range(10)])
+
+    pages = list(iter_message_pages(gmail, page_size=4, max_messages=6))
+
+    assert [len(page) for page in pages] == [4, 2]
+    assert [call["maxResults"] for call in gmail.list_calls] == [4, 2]
@@ -0,0 +1,90 @@
+import os
+import shutil
+import stat
+import tempfile
+import threading
+
+import pytest
+
+import index_server
+from index_server import remote
+
+
+@remote
+def echo(value, suffix="!"):
+    return f"{value}{suffix}"
+
+
+@remote
+def fail():
+    raise KeyError("no such document")
+
+
+@remote(send_result=False)
+def build():
+    return "large in-process object"
+
+
+@pytest.fixture
+def socket_path(monkeypatch):
+    # Unix socket paths are short, so stay out of pytest's deep tmp_path
+    directory = tempfile.mkdtemp(prefix="idx-")
+    os.rmdir(directory)  # the server creates it
+    path = os.path.join(directory, "index.sock")
+    monkeypatch.setattr(index_server, "INDEX_SERVER_AUTHKEY", None)
+    yield path
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def server(socket_path, monkeypatch):
+    listener = index_server._listen(socket_path)
+
+    def accept():
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=index_server._handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    monkeypatch.setattr(index_server, "INDEX_SERVER_SOCKET", socket_path)
+    monkeypatch.setattr(index_server, "_local", threading.local())
+    yield socket_path
+    listener.close()
+
+
+def test_functions_run_locally_without_a_server(monkeypatch):
+    monkeypatch.setattr(index_server, "INDEX_SERVER_SOCKET", None)
+
+    assert not index_server.enabled()
+    assert echo("hi") == "hi!"
+    assert build() == "large in-process object"
+
+
+def test_calls_are_forwarded_to_the_server(server):
+    assert index_server.enabled()
+    assert echo("hi", suffix="?") == "hi?"
+    assert build() is None  # send_result=False
+
+
+def test_errors_raised_in_the_server_reach_the_caller(server):
+    with pytest.raises(KeyError):
+        fail()
+    with pytest.raises(ValueError):
+        index_server.call("unknown.operation")
+
+
+def test_socket_directory_and_key_are_private(server):
+    directory = os.path.dirname(server)
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(index_server._key_file(server)).st_mode) == 0o600
+
+
+def test_shared_socket_directory_is_refused(socket_path):
+    os.makedirs(os.path.dirname(socket_path), mode=0o755)
+    os.chmod(os.path.dirname(socket_path), 0o755)
+
+    with pytest.raises(PermissionError):
+        index_server._listen(socket_path)
@@ -0,0 +1,40 @@
+import pytest
+
+from intent_parser import parse_intent
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("add 3 and 5", {"tool": "add_numbers", "args": {"numbers": [3, 5]}}),
+    ("What is the sum of 1, 2 and 3.5?", {"tool": "add_numbers", "args": {"numbers": [1, 2, 3.5]}}),
+    ("multiply 4 by 6", {"tool": "multiply", "args": {"numbers": [4, 6]}}),
+    ("subtract 2 from 10", {"tool": "subtract", "args": {"a": 10, "b": 2}}),
+    ("divide 9 by 3", {"tool": "divide", "args": {"a": 9, "b": 3}}),
+    ("what's 7 times 8", {"tool": "multiply", "args": {"numbers": [7, 8]}}),
+    ("12 - 5", {"tool": "subtract", "args": {"a": 12, "b": 5}}),
+    ("What's the weather in Paris?", {"tool": "get_weather", "args": {"city": "Paris"}}),
+    ("weather in New York today", {"tool": "get_weather", "args": {"city": "New York"}}),
+    ("weather in Rio de Janeiro right now", {"tool": "get_weather", "args": {"city": "Rio de Janeiro"}}),
+    ("mark the email with subject 'Invoice 42' as read",
+     {"tool": "mark_email", "args": {"mail_sub": "Invoice 42", "mark_as_read": True}}),
+    ('summarize the email with subject "Q3 plan"', {"tool": "summarize_email", "args": {"subject": "Q3 plan"}}),
+])
+def test_unambiguous_queries_map_to_tool_calls(query, expected):
+    assert parse_intent(query) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "   ",
+    "weather in Paris and London",  # several calls: the LLM plans those
+    # Anything but current conditions in one city: the LLM reads the date or unit
+    "what is the weather in Paris tomorrow",
+    "weather for next week",
+    "weather in London in fahrenheit",
+    "weather in Berlin this weekend",
+    "what's the weather in Tokyo on Monday",
+    "should I bring an umbrella tomorrow?",
+    "add a meeting with Bob",
+    "why did the payment service crash?",
+])
+def test_everything_else_goes_to_the_llm(query):
+    assert parse_intent(query) is None
@@ -0,0 +1,134 @@
+import threading
+import time
+
+import llm_backend
+from llm_backend import CircuitBreaker, LLMRouter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeBackend:
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+        self.calls = 0
+
+    def complete(self, prompt, system_prompt, model, temperature, max_tokens):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return f"{self.name} answer"
+
+
+def test_breaker_opens_after_consecutive_failures(monkeypatch):
+    monkeypatch.setattr(llm_backend.time, "monotonic", Clock())
+    breaker = CircuitBreaker("cli", threshold=3, cooldown=30)
+
+    breaker.record(False)
+    breaker.record(False)
+    breaker.record(True)  # a success resets the count
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.allow()
+
+    breaker.record(False)
+    assert not breaker.allow()
+
+
+def test_half_open_breaker_lets_one_trial_through_per_cooldown(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_backend.time, "monotonic", clock)
+    breaker = CircuitBreaker("cli", threshold=1, cooldown=30)
+    breaker.record(False)
+
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()  # the trial call
+    assert not breaker.allow()  # nothing else until the next cooldown
+
+    breaker.record(False)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.allow() and breaker.allow()
+
+
+def test_router_fails_over_and_skips_an_open_backend(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_backend.time, "monotonic", clock)
+    cli, api = FakeBackend("cli", fail=True), FakeBackend("api")
+    router = LLMRouter([cli, api], hedge_after=0)
+    router.breakers["cli"].threshold = 2
+
+    for _ in range(2):
+        result = router.generate("hi")
+        assert result.ok and result.text == "api answer"
+        assert result.model == llm_backend.MODELS["api"]["default"]
+    assert cli.calls == 2
+
+    # Open: cli isn't tried until the cooldown has passed
+    router.generate("hi")
+    assert cli.calls == 2
+
+    clock.now += router.breakers["cli"].cooldown
+    cli.fail = False
+    result = router.generate("hi")
+    assert result.text == "cli answer" and cli.calls == 3
+    assert router.breakers["cli"].opened_at is None
+
+
+def test_every_backend_failing_is_reported_not_raised():
+    router = LLMRouter([FakeBackend("cli", fail=True)], hedge_after=0)
+
+    result = router.generate("hi")
+
+    assert not result.ok and result.model is None
+    assert result.text.startswith("Error")
+
+
+class SlowBackend(FakeBackend):
+    def __init__(self, name, delay):
+        super().__init__(name)
+        self.delay = delay
+
+    def complete(self, *args):
+        self.started = True
+        time.sleep(self.delay)
+        return super().complete(*args)
+
+
+def test_slow_primary_is_hedged_on_the_next_backend():
+    slow, fast = SlowBackend("cli", 0.5), FakeBackend("api")
+    router = LLMRouter([slow, fast], hedge_after=0.05)
+
+    result = router.generate("hi")
+
+    assert result.text == "api answer" and result.model == llm_backend.MODELS["api"]["default"]
+    assert slow.started and fast.calls == 1
+
+
+def test_concurrent_hedged_calls_share_the_router_pool():
+    router = LLMRouter([SlowBackend("cli", 0.01), FakeBackend("api")], hedge_after=1)
+    pool = router._pool
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(router.generate("hi").text)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["cli answer"] * 8
+    assert router._pool is pool
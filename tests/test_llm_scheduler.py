@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from llm_scheduler import (
+    BATCH, INTERACTIVE, LLMDeadlineExceeded, LLMOverloaded, LLMScheduler, request_context,
+)
+
+
+def occupy(scheduler, backend="cli"):
+    """Hold the backend's only slot until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+
+    def call(timeout):
+        started.set()
+        release.wait(5)
+        return "done"
+
+    thread = threading.Thread(target=scheduler.run, args=(backend, call))
+    thread.start()
+    started.wait(5)
+    return release, thread
+
+
+def queue_call(scheduler, order, name, priority, deadline=5, backend="cli"):
+    def worker():
+        with request_context(priority, deadline):
+            try:
+                scheduler.run(backend, lambda timeout: order.append(name))
+            except LLMOverloaded as e:
+                order.append(type(e).__name__)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    return thread
+
+
+def wait_for_queue(scheduler, depth, backend="cli"):
+    queue = scheduler._queue(backend)
+    for _ in range(500):
+        with queue.cond:
+            if len(queue.waiting) == depth:
+                return
+        time.sleep(0.001)
+    raise AssertionError(f"queue never reached depth {depth}")
+
+
+def test_interactive_calls_run_before_queued_batch_calls():
+    scheduler = LLMScheduler({"cli": 1}, max_queue=8)
+    release, holder = occupy(scheduler)
+    order = []
+    threads = [queue_call(scheduler, order, "batch", BATCH)]
+    wait_for_queue(scheduler, 1)
+    threads.append(queue_call(scheduler, order, "interactive", INTERACTIVE))
+    wait_for_queue(scheduler, 2)
+
+    release.set()
+    for thread in [holder] + threads:
+        thread.join(5)
+
+    assert order == ["interactive", "batch"]
+
+
+def test_full_queue_is_shed_with_429():
+    scheduler = LLMScheduler({"cli": 1}, max_queue=2)
+    release, holder = occupy(scheduler)
+    order = []
+    threads = [queue_call(scheduler, order, f"queued-{i}", INTERACTIVE) for i in range(2)]
+    wait_for_queue(scheduler, 2)
+
+    with pytest.raises(LLMOverloaded) as shed:
+        scheduler.run("cli", lambda timeout: "never")
+    assert shed.value.status_code == 429
+    assert shed.value.retry_after >= 1
+    # Batch work may only use part of the queue
+    assert scheduler.admit(BATCH) is not None
+
+    release.set()
+    for thread in [holder] + threads:
+        thread.join(5)
+    assert sorted(order) == ["queued-0", "queued-1"]
+
+
+def test_deadline_passing_in_the_queue_is_shed_with_503_and_frees_the_place():
+    scheduler = LLMScheduler({"cli": 1}, max_queue=4)
+    release, holder = occupy(scheduler)
+    order = []
+    thread = queue_call(scheduler, order, "late", INTERACTIVE, deadline=0.05)
+    thread.join(5)
+
+    assert order == ["LLMDeadlineExceeded"]
+    assert LLMDeadlineExceeded("", 1).status_code == 503
+    assert scheduler._queue("cli").waiting == []
+    release.set()
+    holder.join(5)
+
+
+def test_expired_deadline_is_rejected_even_with_a_free_slot():
+    scheduler = LLMScheduler({"cli": 1}, max_queue=4)
+    calls = []
+
+    with request_context(INTERACTIVE, 0.001):
+        time.sleep(0.01)
+        with pytest.raises(LLMDeadlineExceeded):
+            scheduler.run("cli", calls.append)
+
+    assert calls == []
+    assert scheduler._queue("cli").running == 0
+
+
+def test_call_gets_the_time_left_until_the_deadline():
+    scheduler = LLMScheduler({"cli": 1}, max_queue=4)
+
+    with request_context(INTERACTIVE, 2):
+        timeout = scheduler.run("cli", lambda timeout: timeout)
+
+    assert 1 < timeout <= 2
+
+
+ORIGIN = {"Origin": "http://localhost:3000"}
+
+
+def test_rejected_requests_carry_cors_headers(api, monkeypatch):
+    monkeypatch.setattr(api.llm_scheduler.scheduler, "admit", lambda priority: 7)
+
+    response = TestClient(api.app).post("/ask", json={"query": "hi"}, headers=ORIGIN)
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "7"
+    assert response.headers["access-control-allow-origin"] == "http://localhost:3000"
+
+
+def test_preflight_requests_are_not_admitted_as_llm_calls(api, monkeypatch):
+    admitted = []
+    monkeypatch.setattr(api.llm_scheduler.scheduler, "admit", lambda priority: admitted.append(priority) or 7)
+
+    response = TestClient(api.app).options("/ask", headers={**ORIGIN, "Access-Control-Request-Method": "POST"})
+
+    assert response.status_code == 200
+    assert admitted == []
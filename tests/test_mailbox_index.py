@@ -0,0 +1,160 @@
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from mailbox_index import MailboxIndex
+
+
+def message(message_id, subject, date, sender="alice@example.com", labels=("INBOX",)):
+    return {
+        "id": message_id,
+        "threadId": "t" + message_id,
+        "snippet": subject.lower(),
+        "labelIds": list(labels),
+        "internalDate": str(date),
+        "payload": {"headers": [{"name": "Subject", "value": subject}, {"name": "From", "value": sender}]},
+    }
+
+
+class FakeCall:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class FakeBatch:
+    def __init__(self, gmail, callback):
+        self.gmail = gmail
+        self.callback = callback
+        self.ids = []
+
+    def add(self, request, request_id):
+        self.ids.append(request_id)
+
+    def execute(self):
+        for message_id in self.ids:
+            self.callback(message_id, self.gmail.mailbox[message_id], None)
+
+
+class FakeGmail:
+    """A mailbox plus a scripted history, behind the Gmail service calls the index makes."""
+
+    def __init__(self, messages, history_id="100"):
+        self.mailbox = {m["id"]: m for m in messages}
+        self.history_id = history_id
+        self.records = []  # records returned to the next history().list
+        self.history_expired = False
+        self.history_calls = 0
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return _History(self)
+
+    def getProfile(self, userId):
+        return FakeCall({"historyId": self.history_id})
+
+    def list(self, **kwargs):
+        newest = sorted(self.mailbox.values(), key=lambda m: -int(m["internalDate"]))
+        return FakeCall({"messages": [{"id": m["id"]} for m in newest[:kwargs["maxResults"]]]})
+
+    def get(self, **kwargs):
+        return FakeCall(self.mailbox[kwargs["id"]])
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+class _History:
+    def __init__(self, gmail):
+        self.gmail = gmail
+
+    def list(self, **kwargs):
+        self.gmail.history_calls += 1
+        if self.gmail.history_expired:
+            return FakeCall(HttpError(httplib2.Response({"status": 404}), b"history expired"))
+        records, self.gmail.records = self.gmail.records, []
+        return FakeCall({"history": records, "historyId": self.gmail.history_id})
+
+
+@pytest.fixture
+def gmail():
+    return FakeGmail([
+        message("m1", "Quarterly report", 1000),
+        message("m2", "Lunch on Friday?", 2000, sender="bob@example.com"),
+        message("m3", "Quarterly report v2", 3000),
+    ])
+
+
+@pytest.fixture
+def index(gmail, tmp_path):
+    index = MailboxIndex(lambda: gmail, db_path=str(tmp_path / "mailbox.db"))
+    index.sync(force=True)
+    return index
+
+
+def test_full_sync_indexes_subjects_newest_first(index):
+    assert index.find_by_subject("Quarterly report") == "m3"
+    assert index.find_by_subject("lunch") == "m2"
+    assert index.find_by_subject("invoice") is None
+    assert [m["id"] for m in index.search("bob")] == ["m2"]
+
+
+def test_incremental_sync_applies_history(gmail, index):
+    gmail.mailbox["m4"] = message("m4", "Invoice 42", 4000)
+    del gmail.mailbox["m1"]
+    gmail.history_id = "101"
+    gmail.records = [
+        {"messagesAdded": [{"message": {"id": "m4"}}]},
+        {"messagesDeleted": [{"message": {"id": "m1"}}]},
+        {"labelsRemoved": [{"message": {"id": "m2", "labelIds": []}}]},
+    ]
+
+    index.sync(force=True)
+
+    assert index.find_by_subject("Invoice") == "m4"
+    assert index.find_by_subject("Quarterly report") == "m3"
+    assert [m["id"] for m in index.search("Quarterly")] == ["m3"]
+    assert index.search("Lunch")[0]["labelIds"] == []
+
+
+def test_syncs_closer_together_than_the_interval_are_skipped(gmail, index):
+    index.sync()
+    assert gmail.history_calls == 0
+
+    index.sync(force=True)
+    assert gmail.history_calls == 1
+
+
+def test_expired_history_falls_back_to_a_full_sync_keeping_bodies(gmail, index):
+    index.store_body("m2", "See you at noon")
+    gmail.history_expired = True
+    del gmail.mailbox["m1"]
+
+    index.sync(force=True)
+
+    assert index.find_by_subject("Quarterly report") == "m3"
+    assert [m["id"] for m in index.search("Quarterly")] == ["m3"]
+    assert index.get_body("m2") == "See you at noon"
+
+
+def test_local_label_changes_apply_immediately(index):
+    index.update_labels("m3", add=["STARRED"], remove=["INBOX"])
+
+    assert index.search("v2")[0]["labelIds"] == ["STARRED"]
+
+
+def test_subject_with_quotes_is_matched_as_a_phrase(gmail, tmp_path):
+    gmail.mailbox["m5"] = message("m5", 'Re: "Budget" AND plan', 5000)
+    index = MailboxIndex(lambda: gmail, db_path=str(tmp_path / "mailbox.db"))
+    index.sync(force=True)
+
+    assert index.find_by_subject('"Budget" AND plan') == "m5"
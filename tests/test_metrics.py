@@ -0,0 +1,91 @@
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+import metrics
+from metrics import record_cache, record_llm_usage, track, track_llm, tracked
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_track_times_stages_and_counts_errors():
+    before = sample("stage_duration_seconds_count", stage="test_stage")
+    errors = sample("stage_errors_total", stage="test_stage")
+
+    with track("test_stage"):
+        assert sample("stage_in_flight", stage="test_stage") == 1
+    with pytest.raises(ValueError):
+        with track("test_stage"):
+            raise ValueError("boom")
+
+    assert sample("stage_duration_seconds_count", stage="test_stage") == before + 2
+    assert sample("stage_errors_total", stage="test_stage") == errors + 1
+    assert sample("stage_in_flight", stage="test_stage") == 0
+
+
+def test_tracked_keeps_the_function_and_its_result():
+    @tracked("test_decorated")
+    def double(x):
+        """Double x."""
+        return 2 * x
+
+    assert double(21) == 42
+    assert double.__name__ == "double" and double.__doc__ == "Double x."
+    assert sample("stage_duration_seconds_count", stage="test_decorated") == 1
+
+
+def test_llm_calls_are_labelled_with_the_current_route_and_status():
+    token = metrics.current_route.set("/test-route")
+    try:
+        with track_llm("test-backend"):
+            pass
+        with track_llm("test-backend") as status:
+            status["ok"] = False
+        with pytest.raises(RuntimeError):
+            with track_llm("test-backend"):
+                raise RuntimeError("timeout")
+    finally:
+        metrics.current_route.reset(token)
+
+    labels = {"backend": "test-backend", "route": "/test-route"}
+    assert sample("llm_calls_total", status="ok", **labels) == 1
+    assert sample("llm_calls_total", status="error", **labels) == 2
+    assert sample("llm_call_duration_seconds_count", **labels) == 3
+    assert sample("llm_calls_in_flight", backend="test-backend") == 0
+
+
+def test_usage_tokens_are_counted_by_kind():
+    class Usage:
+        input_tokens = 12
+        cache_read_input_tokens = 3000
+        cache_creation_input_tokens = None
+        output_tokens = 40
+
+    record_llm_usage("test-usage", Usage())
+
+    assert sample("llm_tokens_total", backend="test-usage", kind="input") == 12
+    assert sample("llm_tokens_total", backend="test-usage", kind="cache_read") == 3000
+    assert sample("llm_tokens_total", backend="test-usage", kind="cache_write") == 0
+    assert sample("llm_tokens_total", backend="test-usage", kind="output") == 40
+
+
+def test_cache_lookups_are_counted_as_hits_and_misses():
+    record_cache("test_cache", True)
+    record_cache("test_cache", True)
+    record_cache("test_cache", False)
+
+    assert sample("cache_requests_total", cache="test_cache", result="hit") == 2
+    assert sample("cache_requests_total", cache="test_cache", result="miss") == 1
+
+
+def test_metrics_endpoint_reports_request_latency(api):
+    client = TestClient(api.app)
+    client.get("/metrics")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/metrics",status="200"}' in response.text
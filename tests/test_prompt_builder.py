@@ -0,0 +1,65 @@
+from prompt_builder import Section, build_prompt, count_tokens, fit_text, pack_chunks
+
+TEMPLATE = "Question: {query}\n\nContext:\n{context}\n\nNotes:\n{notes}"
+
+
+def test_prompt_that_fits_is_unchanged():
+    prompt = build_prompt(TEMPLATE, [
+        Section("query", "why?", required=True),
+        Section("context", "some log lines"),
+        Section("notes", "none"),
+    ], budget=1000)
+
+    assert prompt == TEMPLATE.format(query="why?", context="some log lines", notes="none")
+
+
+def test_sections_are_trimmed_to_the_budget_by_priority():
+    budget = 200
+    prompt = build_prompt(TEMPLATE, [
+        Section("query", "why did it fail?", required=True),
+        Section("context", "x" * 5000, priority=1),
+        Section("notes", "y" * 5000, priority=2, min_tokens=20),
+    ], budget=budget)
+
+    assert count_tokens(prompt) <= budget
+    assert "why did it fail?" in prompt
+    # The higher priority section takes the rest, the lower one keeps its reservation
+    assert prompt.count("x") > prompt.count("y") > 0
+
+
+def test_required_section_is_never_truncated():
+    question = "q" * 2000
+    prompt = build_prompt(TEMPLATE, [
+        Section("query", question, required=True),
+        Section("context", "z" * 2000),
+    ], budget=100)
+
+    assert question in prompt
+    assert "z" not in prompt
+
+
+def test_chunks_are_kept_whole_in_ranked_order():
+    chunks = ["a" * 70, "b" * 70, "c" * 70]
+
+    assert pack_chunks(chunks, count_tokens(chunks[0]) * 2 + 1) == chunks[:2]
+    assert pack_chunks(chunks, 1) == []
+
+
+
+def test_chunk_section_that_fits_keeps_every_chunk():
+    # Joined, "a0" and "User" merge across the newline into fewer tokens than the parts
+    turns = ["User: q0\nAssistant: a0", "User: q1\nAssistant: a1"]
+
+    prompt = build_prompt("Turns:\n{turns}", [Section("turns", chunks=turns, separator="\n")], budget=1000)
+
+    assert prompt == "Turns:\n" + "\n".join(turns)
+
+def test_fit_text_keeps_the_requested_end():
+    text = "".join(str(i % 10) for i in range(1000))
+
+    head = fit_text(text, 50, keep="head")
+    tail = fit_text(text, 50, keep="tail")
+
+    assert head.startswith(text[:20]) and "Truncated" in head
+    assert tail.endswith(text[-20:]) and "Truncated" in tail
+    assert count_tokens(head) <= 50 and count_tokens(tail) <= 50
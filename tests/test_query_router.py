@@ -0,0 +1,54 @@
+import time
+
+from conftest import HashingEncoder
+from query_router import GENERAL_CHAT, LOG_ANALYSIS, TOOLS, QueryRouter
+
+ROUTING_TARGET_MS = 10
+
+
+def make_router():
+    calls = []
+
+    def llm(prompt):
+        calls.append(prompt)
+        return GENERAL_CHAT
+
+    encoder = HashingEncoder()
+    router = QueryRouter(lambda: encoder, llm=llm)
+    router.warm()
+    return router, calls
+
+
+def fastest_ms(func, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best
+
+
+def test_confident_query_is_routed_without_the_llm_within_target():
+    router, calls = make_router()
+    query = "show me the exceptions from the application log"
+
+    assert router.route(query) == LOG_ANALYSIS
+    # Router overhead on the fast path: prototype scoring, no LLM call (encoder time excluded)
+    assert fastest_ms(lambda: router.route(query)) < ROUTING_TARGET_MS
+    assert calls == []
+
+
+def test_intent_parser_match_skips_the_encoder():
+    router, calls = make_router()
+    router.model_getter = lambda: (_ for _ in ()).throw(AssertionError("encoder should not run"))
+
+    assert router.route("add 3 and 5") == TOOLS
+    assert fastest_ms(lambda: router.route("weather in Paris")) < ROUTING_TARGET_MS
+    assert calls == []
+
+
+def test_low_confidence_query_asks_the_llm():
+    router, calls = make_router()
+
+    assert router.route("zebra quantum marmalade") == GENERAL_CHAT
+    assert len(calls) == 1
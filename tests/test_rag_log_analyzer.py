@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+import rag_log_analyzer
+from conftest import HashingEncoder
+from encoder_backend import EncoderEmbeddings
+from rag_log_analyzer import build_vectorstore_from_all_logs, get_qa_chain, has_log_index, log_index_version
+
+
+@pytest.fixture(autouse=True)
+def log_index(tmp_path, monkeypatch):
+    directory = str(tmp_path / "embeddings")
+    monkeypatch.setattr(rag_log_analyzer, "LOG_INDEX_DIR", directory)
+    monkeypatch.setattr(rag_log_analyzer, "LOG_LOCK_FILE", os.path.join(directory, ".lock"))
+    embeddings = EncoderEmbeddings(HashingEncoder())
+    monkeypatch.setattr(rag_log_analyzer, "get_embeddings", lambda: embeddings)
+    monkeypatch.setattr(rag_log_analyzer, "_qa_chain", None)
+    return directory
+
+
+def write_logs(directory, **files):
+    directory.mkdir(exist_ok=True)
+    for name, text in files.items():
+        (directory / f"{name}.log").write_text(text)
+    return str(directory)
+
+
+def test_questions_retrieve_the_matching_log_lines(tmp_path):
+    logs = write_logs(tmp_path / "logs", app="ERROR database connection refused on port 5432", web="INFO nginx served index page")
+
+    build_vectorstore_from_all_logs(logs)
+
+    docs = get_qa_chain().retrieve_many(["database connection refused", "nginx index page"])
+    assert "database" in docs[0][0].page_content
+    assert "nginx" in docs[1][0].page_content
+    assert has_log_index()
+
+
+def test_chain_is_reused_until_the_index_changes_on_disk(tmp_path):
+    build_vectorstore_from_all_logs(write_logs(tmp_path / "logs", app="ERROR disk full on /var"))
+    chain = get_qa_chain()
+    assert get_qa_chain() is chain and chain.version == log_index_version()
+
+    # Another worker rebuilds the index; this one still holds the old chain
+    build_vectorstore_from_all_logs(write_logs(tmp_path / "logs", web="WARN certificate expires in 3 days"))
+    rag_log_analyzer._qa_chain = chain
+
+    reloaded = get_qa_chain()
+    assert reloaded is not chain and reloaded.version == log_index_version()
+    contents = [doc.page_content for doc in reloaded.retrieve_many(["certificate expires"])[0]]
+    assert any("certificate" in content for content in contents)
+
+
+def test_building_without_logs_is_an_error(tmp_path):
+    with pytest.raises(ValueError):
+        build_vectorstore_from_all_logs(write_logs(tmp_path / "logs"))
+    assert log_index_version() == "none"
@@ -0,0 +1,89 @@
+import pytest
+
+import summary_cache
+from llm_backend import LLMResult
+from summary_cache import SummaryCache, content_hash
+
+TEMPLATE = "Summarize:\n{text}"
+
+
+class FakeLLM:
+    def __init__(self, model="sonnet", ok=True):
+        self.model = model
+        self.ok = ok
+        self.prompts = []
+
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        if not self.ok:
+            return LLMResult("Error: backend down", False, None)
+        return LLMResult(f"  summary {len(self.prompts)} by {self.model}\n", True, self.model)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # Failover order of the SUMMARY task: the primary model first
+    monkeypatch.setattr(summary_cache, "models_for", lambda task: ["sonnet", "sonnet-api"])
+    return SummaryCache(str(tmp_path / "summaries.db"))
+
+
+def test_content_hash_ignores_line_endings_and_surrounding_whitespace():
+    assert content_hash("a\r\nb\n") == content_hash("  a\nb")
+    assert content_hash("a b") != content_hash("a  b")
+
+
+def test_same_content_is_summarized_once(cache):
+    llm = FakeLLM()
+
+    first = cache.summarize("Quarterly numbers are up.", TEMPLATE, "v1", llm)
+    second = cache.summarize("Quarterly numbers are up.\r\n", TEMPLATE, "v1", llm)
+
+    assert first == second == LLMResult("summary 1 by sonnet", True, "sonnet")
+    assert llm.prompts == ["Summarize:\nQuarterly numbers are up."]
+
+
+def test_new_template_version_or_content_misses(cache):
+    llm = FakeLLM()
+    cache.summarize("text", TEMPLATE, "v1", llm)
+
+    cache.summarize("text", TEMPLATE, "v2", llm)
+    cache.summarize("other text", TEMPLATE, "v1", llm)
+
+    assert len(llm.prompts) == 3
+
+
+def test_summary_is_keyed_on_the_model_that_answered(cache, monkeypatch):
+    # Written after a failover to the API backend
+    cache.summarize("text", TEMPLATE, "v1", FakeLLM(model="sonnet-api"))
+    assert cache.summarize("text", TEMPLATE, "v1", FakeLLM()).model == "sonnet-api"
+
+    # A model that may no longer answer the task doesn't serve its old summaries
+    monkeypatch.setattr(summary_cache, "models_for", lambda task: ["haiku"])
+    llm = FakeLLM(model="haiku")
+    assert cache.summarize("text", TEMPLATE, "v1", llm).model == "haiku"
+    assert len(llm.prompts) == 1
+
+
+def test_failures_are_not_cached(cache):
+    failing = FakeLLM(ok=False)
+    result = cache.summarize("text", TEMPLATE, "v1", failing)
+    assert not result.ok and result.text.startswith("Error")
+
+    llm = FakeLLM()
+    assert cache.summarize("text", TEMPLATE, "v1", llm).ok
+    assert len(llm.prompts) == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr(summary_cache.time, "time", lambda: next(clock))
+    cache = SummaryCache(str(tmp_path / "summaries.db"), max_entries=2)
+    cache.put("a", "v1", "m", "A")
+    cache.put("b", "v1", "m", "B")
+    cache.get("a", "v1", "m")  # a is now more recent than b
+
+    cache.put("c", "v1", "m", "C")
+
+    assert cache.get("a", "v1", "m") == "A"
+    assert cache.get("b", "v1", "m") is None
+    assert cache.get("c", "v1", "m") == "C"
@@ -0,0 +1,42 @@
+import json
+
+from tool_schemas import parse_tool_reply
+
+
+def test_tool_calls_are_parsed_in_order():
+    reply = json.dumps({"tool_calls": [
+        {"tool": "get_weather", "args": {"city": "Paris"}},
+        {"tool": "get_weather", "args": {"city": "Tokyo"}},
+    ]})
+
+    assert parse_tool_reply(reply) == {"type": "tool_use", "tool_calls": [
+        {"name": "get_weather", "input": {"city": "Paris"}},
+        {"name": "get_weather", "input": {"city": "Tokyo"}},
+    ]}
+
+
+def test_single_tool_object_and_surrounding_text_are_accepted():
+    reply = 'Sure:\n```json\n{"tool": "add_numbers", "args": {"numbers": [1, 2]}}\n```'
+
+    assert parse_tool_reply(reply) == {
+        "type": "tool_use", "tool_calls": [{"name": "add_numbers", "input": {"numbers": [1, 2]}}],
+    }
+
+
+def test_malformed_calls_are_skipped():
+    reply = json.dumps({"tool_calls": [{"args": {}}, "oops", {"tool": "multiply"}]})
+
+    assert parse_tool_reply(reply) == {"type": "tool_use", "tool_calls": [{"name": "multiply", "input": {}}]}
+
+
+def test_direct_answer():
+    assert parse_tool_reply('{"tool_calls": [], "answer": "Hello!"}') == {"type": "text", "content": "Hello!"}
+
+
+def test_reply_without_calls_or_answer_falls_back_to_the_raw_text():
+    assert parse_tool_reply(' {"tool_calls": []} ') == {"type": "text", "content": '{"tool_calls": []}'}
+
+
+def test_non_json_reply_is_the_answer():
+    assert parse_tool_reply("  It is sunny.  ") == {"type": "text", "content": "It is sunny."}
+    assert parse_tool_reply("{not json}") == {"type": "text", "content": "{not json}"}
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(api, tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(api.doc_extract, "EXTRACT_CACHE_DIR", str(tmp_path / "extracted"))
+    return TestClient(api.app)
+
+
+@pytest.fixture
+def indexed(api, monkeypatch):
+    added = []
+    monkeypatch.setattr(api.doc_index, "add_document", lambda text, source, digest: added.append((source, digest)))
+    return added
+
+
+def test_document_is_summarized_and_indexed(client, api, monkeypatch, indexed):
+    monkeypatch.setattr(api, "summarize_document", lambda text, detail: f" {detail}: {text} ")
+
+    response = client.post("/upload?detail=brief", files={"file": ("notes.txt", b"hello world")})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["summary"] == "brief: hello world"
+    assert indexed == [("notes.txt", body["document_id"])]
+
+
+def test_unsupported_format_is_rejected_without_summary_or_document_id(client, api, monkeypatch, indexed):
+    monkeypatch.setattr(api, "summarize_document", lambda text, detail: pytest.fail("LLM called"))
+
+    response = client.post("/upload", files={"file": ("slides.pptx", b"PK\x03\x04")})
+
+    assert response.status_code == 415
+    assert "document_id" not in response.json()
+    assert indexed == []
+    assert os.listdir(api.UPLOAD_DIR) == []
@@ -0,0 +1,112 @@
+import os
+
+import faiss
+import numpy as np
+import pytest
+
+import vector_compression
+from vector_compression import (
+    EXACT_VECTORS_FILE, build_index, index_type, is_exact, load_exact_vectors, rerank, save_exact_vectors, search
+)
+
+
+def unit_vectors(n, dim=32, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class PaddedIndex:
+    """An index that, like IVF with few lists probed, returns fewer hits than asked, padded with -1."""
+
+    def __init__(self, ids, ntotal=10):
+        self.ids = np.array(ids, dtype=np.int64)
+        self.ntotal = ntotal
+
+    def search(self, queries, k):
+        return None, np.tile(self.ids[:k], (len(queries), 1))
+
+
+def test_index_type_names_are_validated():
+    assert index_type(None) == "flat" and index_type("INT8") == "int8"
+    with pytest.raises(ValueError):
+        index_type("hnsw")
+
+
+@pytest.mark.parametrize("kind", ["flat", "fp16", "int8"])
+def test_every_index_type_finds_a_vector_itself(kind):
+    vectors = unit_vectors(200)
+
+    index = build_index(vectors, kind)
+
+    assert index.ntotal == 200 and is_exact(index) == (kind == "flat")
+    assert [row[0] for row in search(index, vectors[:5], 3)] == [0, 1, 2, 3, 4]
+
+
+def test_ivfpq_falls_back_to_int8_for_small_collections():
+    index = build_index(unit_vectors(50), "ivfpq")
+
+    assert isinstance(index, faiss.IndexScalarQuantizer)
+
+
+def test_missing_hits_are_dropped_not_returned_as_row_minus_one():
+    index = PaddedIndex([3, 1, -1, -1])
+
+    assert search(index, unit_vectors(1), 4)[0].tolist() == [3, 1]
+
+
+def test_rerank_orders_candidates_by_exact_score_and_skips_padding():
+    exact = np.eye(4, dtype=np.float32)
+    query = np.array([[0.1, 0.2, 0.9, 0.0]], dtype=np.float32)
+
+    ranked = rerank(query, np.array([[0, 2, -1, 1, 2]]), exact, 2)
+
+    assert ranked[0].tolist() == [2, 1]
+    assert rerank(query, np.array([[-1, -1]]), exact, 2)[0].tolist() == []
+
+
+def test_compressed_search_fetches_extra_candidates_for_reranking(monkeypatch):
+    monkeypatch.setattr(vector_compression, "RERANK_FACTOR", 3)
+    vectors = unit_vectors(100)
+    index = build_index(vectors, "int8")
+    asked = []
+    original = index.search
+    monkeypatch.setattr(index, "search", lambda q, k: asked.append(k) or original(q, k))
+
+    ids = search(index, vectors[:2], 4, exact=vectors)
+
+    assert asked == [12]
+    assert [row.tolist()[0] for row in ids] == [0, 1] and all(len(row) == 4 for row in ids)
+
+
+def test_empty_index_returns_no_ids():
+    index = build_index(np.zeros((0, 8), dtype=np.float32))
+
+    assert [row.tolist() for row in search(index, unit_vectors(2, dim=8), 5)] == [[], []]
+
+
+def test_exact_vectors_are_saved_memory_mapped_and_removed(tmp_path):
+    directory = str(tmp_path / "index")
+    vectors = unit_vectors(10)
+
+    save_exact_vectors(directory, vectors)
+    loaded = load_exact_vectors(directory)
+    assert isinstance(loaded, np.memmap) and np.array_equal(loaded, vectors)
+
+    save_exact_vectors(directory, None)  # the index became exact
+    assert load_exact_vectors(directory) is None
+
+
+def test_failed_save_keeps_the_previous_vectors_and_no_temp_file(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    save_exact_vectors(directory, unit_vectors(10))
+
+    def broken_save(f, array):
+        f.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(vector_compression.np, "save", broken_save)
+    with pytest.raises(OSError):
+        save_exact_vectors(directory, unit_vectors(10, seed=1))
+
+    assert os.listdir(directory) == [EXACT_VECTORS_FILE]
+    assert np.array_equal(load_exact_vectors(directory), unit_vectors(10))
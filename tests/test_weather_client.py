@@ -0,0 +1,59 @@
+import asyncio
+
+import weather_client
+from weather_client import StubWeatherBackend, WeatherService
+
+
+def make_service(ttl=600, latency=0.05):
+    backends = []
+
+    def factory():
+        backends.append(StubWeatherBackend(latency=latency))
+        return backends[-1]
+
+    return WeatherService(factory, ttl=ttl), backends
+
+
+def test_concurrent_lookups_of_one_city_share_one_fetch():
+    service, backends = make_service()
+
+    async def lookups():
+        return await asyncio.gather(*(service.get(city) for city in ["Paris", "paris", " PARIS "] * 10))
+
+    reports = asyncio.run(lookups())
+
+    assert len(set(reports)) == 1
+    assert sum(backend.fetches for backend in backends) == 1
+
+
+def test_report_is_fetched_again_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(weather_client.time, "monotonic", lambda: now[0])
+    service, backends = make_service(ttl=60, latency=0)
+
+    async def lookups():
+        await service.get("Berlin")
+        now[0] += 59
+        await service.get("Berlin")  # still fresh
+        fetches_within_ttl = backends[0].fetches
+        now[0] += 2
+        await service.get("Berlin")  # expired
+        return fetches_within_ttl
+
+    assert asyncio.run(lookups()) == 1
+    assert backends[0].fetches == 2
+
+
+def test_new_event_loop_closes_the_previous_backend():
+    closed = []
+
+    class ClosingBackend(StubWeatherBackend):
+        async def close(self):
+            closed.append(self)
+
+    service = WeatherService(ClosingBackend)
+    asyncio.run(service.get("Tokyo"))
+    first = service._backend
+    asyncio.run(service.get("Oslo"))
+
+    assert closed == [first]
@@ -0,0 +1,155 @@
+"""
+Tool Schemas Module
+Builds Claude tool definitions (name, description, JSON schema of the
+arguments) from plain Python functions, so the tool catalogue sent to the
+model always matches the functions in ``tool_registry``.
+
+The description is the first paragraph of the docstring, parameter
+descriptions come from its ``Args:`` section and parameter types from the
+annotations (``str``, ``int``, ``float``, ``bool``, ``List[...]``,
+``Literal[...]``, ``Optional[...]``). Parameters without a default are
+required.
+
+For backends without native tool use (the Claude CLI), ``tool_reply_schema``
+describes a single JSON reply that either lists independent tool calls or
+answers directly, and ``parse_tool_reply`` turns that reply into the same
+shape the API returns.
+"""
+
+import inspect
+import json
+import re
+import typing
+from typing import Callable, Dict, List
+
+_SIMPLE_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", dict: "object"}
+_ARG_LINE = re.compile(r"^\s*(\w+)\s*(?:\([^)]*\))?:\s*(.+)$")
+
+
+def type_schema(annotation) -> dict:
+    """JSON schema for a parameter annotation; unannotated parameters are strings."""
+    if annotation is inspect.Parameter.empty:
+        return {"type": "string"}
+    if annotation in _SIMPLE_TYPES:
+        return {"type": _SIMPLE_TYPES[annotation]}
+
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Literal:
+        return {"type": "string", "enum": list(args)}
+    if origin is typing.Union:
+        # Optional[X]: the model simply leaves the parameter out
+        non_null = [a for a in args if a is not type(None)]
+        return type_schema(non_null[0]) if len(non_null) == 1 else {}
+    if origin in (list, List) or annotation is list:
+        return {"type": "array", "items": type_schema(args[0]) if args else {}}
+    return {"type": "string"}
+
+
+def _parse_docstring(doc: str):
+    """Return (description, {parameter: description}) of a Google-style docstring."""
+    doc = inspect.cleandoc(doc or "")
+    description = doc.split("\n\n", 1)[0].replace("\n", " ").strip()
+
+    params = {}
+    in_args = False
+    for line in doc.splitlines():
+        if line.strip() in ("Args:", "Arguments:"):
+            in_args = True
+            continue
+        if in_args:
+            if line.strip().endswith(":") and not line.startswith(" "):
+                break  # next section (Returns:, Raises:)
+            match = _ARG_LINE.match(line)
+            if match:
+                params[match.group(1)] = match.group(2).strip()
+    return description, params
+
+
+def tool_schema(name: str, func: Callable) -> dict:
+    """Claude tool definition for one function."""
+    description, param_docs = _parse_docstring(func.__doc__)
+    hints = typing.get_type_hints(func)
+    properties, required = {}, []
+    for param in inspect.signature(func).parameters.values():
+        schema = type_schema(hints.get(param.name, param.annotation))
+        if param.name in param_docs:
+            schema["description"] = param_docs[param.name]
+        properties[param.name] = schema
+        if param.default is inspect.Parameter.empty:
+            required.append(param.name)
+
+    return {
+        "name": name,
+        "description": description or name,
+        "input_schema": {"type": "object", "properties": properties, "required": required},
+    }
+
+
+def build_tool_schemas(registry: Dict[str, Callable]) -> List[dict]:
+    """Tool definitions for every function in a ``name -> function`` registry."""
+    return [tool_schema(name, func) for name, func in registry.items()]
+
+
+def tool_reply_schema(tools: List[dict]) -> dict:
+    """JSON schema of a reply that calls some of ``tools`` or answers directly."""
+    return {
+        "type": "object",
+        "properties": {
+            "tool_calls": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "tool": {"type": "string", "enum": [tool["name"] for tool in tools]},
+                        "args": {"type": "object"},
+                    },
+                    "required": ["tool", "args"],
+                },
+            },
+            "answer": {"type": "string"},
+        },
+        "required": ["tool_calls"],
+    }
+
+
+def render_tools_prompt(tools: List[dict]) -> str:
+    """Tool catalogue and reply format as prompt text, for backends without native tool use."""
+    lines = ["Available tools (arguments as JSON schema):"]
+    for tool in tools:
+        lines.append(f"- {tool['name']}: {tool['description']}\n  args: {json.dumps(tool['input_schema'])}")
+    lines.append(
+        "Reply with ONLY a JSON object matching this schema, no markdown:\n"
+        f"{json.dumps(tool_reply_schema(tools))}\n"
+        'To use tools: {"tool_calls": [{"tool": "<tool name>", "args": {...}}, ...]}, one entry per call; '
+        'a request for several things (e.g. the weather in two cities) needs several calls. '
+        'If no tool fits, answer the user directly: {"tool_calls": [], "answer": "<your answer>"}.'
+    )
+    return "\n".join(lines)
+
+
+def parse_tool_reply(text: str) -> dict:
+    """
+    Turn a reply in the ``tool_reply_schema`` format into a tool decision.
+
+    Returns:
+        {"type": "tool_use", "tool_calls": [{"name", "input"}, ...]} or
+        {"type": "text", "content": answer}. A reply that isn't JSON, or has
+        neither tool calls nor an answer, is taken as a direct answer as is, so
+        it never costs a second LLM call.
+    """
+    stripped = text.strip()
+    start, end = stripped.find("{"), stripped.rfind("}")
+    try:
+        reply = json.loads(stripped[start:end + 1]) if start != -1 else None
+    except json.JSONDecodeError:
+        reply = None
+    if not isinstance(reply, dict) or not ("tool_calls" in reply or "tool" in reply):
+        return {"type": "text", "content": stripped}
+
+    # A single {"tool": ..., "args": ...} object is accepted as well
+    calls = reply.get("tool_calls") or ([reply] if reply.get("tool") else [])
+    calls = [{"name": c["tool"], "input": c.get("args") or {}} for c in calls if isinstance(c, dict) and c.get("tool")]
+    if calls:
+        return {"type": "tool_use", "tool_calls": calls}
+    return {"type": "text", "content": reply.get("answer") or stripped}
@@ -1,42 +1,136 @@
 # File: training_store.py
 
 import json
+import os
+import threading
 from pathlib import Path
-from sentence_transformers import SentenceTransformer, util
-import torch
+
+import numpy as np
+
+from file_lock import file_lock
+from metrics import record_cache, track
+from index_server import enabled as index_server_enabled, remote
+from vector_compression import build_index, index_type, is_exact, load_exact_vectors, save_exact_vectors, search
 
 TRAINING_FILE = Path("training_data.json")
+TRAINING_VECTORS_DIR = "training_embeddings"  # exact vectors for re-ranking a compressed index
+# Without the index server every worker updates these files
+TRAINING_LOCK_FILE = os.path.join(TRAINING_VECTORS_DIR, ".lock")
+# flat (exact float32), fp16, int8 or ivfpq; see vector_compression
+TRAINING_INDEX_TYPE = index_type(os.getenv("TRAINING_INDEX_TYPE", "flat"))
 
+@remote
 def save_issue_resolution(issue, resolution):
-    training_data = []
-    if TRAINING_FILE.exists():
-        training_data = json.loads(TRAINING_FILE.read_text())
+    # Read-modify-write under the lock, so entries other workers append are not lost
+    with file_lock(TRAINING_LOCK_FILE):
+        training_data = []
+        if TRAINING_FILE.exists():
+            training_data = json.loads(TRAINING_FILE.read_text())
+
+        training_data.append({
+            "issue": issue,
+            "resolution": resolution
+        })
+        tmp_path = TRAINING_FILE.with_name(f"{TRAINING_FILE.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(training_data, indent=2))
+        os.replace(tmp_path, TRAINING_FILE)
+
+
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """
+    Shared MiniLM encoder, also used by the /ask query router and the log and
+    document indexes.
 
-    training_data.append({
-        "issue": issue,
-        "resolution": resolution
-    })
-    TRAINING_FILE.write_text(json.dumps(training_data, indent=2))
+    sentence-transformers (and torch or ONNX Runtime, see EMBEDDING_BACKEND)
+    are imported and the model is loaded on first use, so importing this
+    module stays cheap.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from encoder_backend import load_encoder
+                _model = load_encoder()
+    return _model
 
+def get_encoder():
+    """
+    Encoder for callers outside this module (the /ask query router): the local
+    model, or a proxy to the index server's model when one is configured.
+    """
+    return _REMOTE_ENCODER if index_server_enabled() else get_model()
 
+@remote
+def encode(sentences, normalize_embeddings=False):
+    return get_model().encode(sentences, normalize_embeddings=normalize_embeddings)
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+class _RemoteEncoder:
+    """Stands in for the SentenceTransformer when the index server owns the model."""
+
+    def encode(self, sentences, normalize_embeddings=False, **kwargs):
+        return encode(sentences, normalize_embeddings=normalize_embeddings)
+
+_REMOTE_ENCODER = _RemoteEncoder()
+
+# Index of the issue embeddings in the current training file, reused until the file changes
+_corpus_cache = {"key": None, "index": None, "exact": None}
+_corpus_lock = threading.Lock()
+
+def _corpus_index(issues):
+    stat = TRAINING_FILE.stat()
+    key = (stat.st_mtime_ns, stat.st_size, len(issues))
+    with _corpus_lock:
+        hit = _corpus_cache["key"] == key
+        record_cache("training_corpus", hit)
+        if not hit:
+            with track("embedding_encode"):
+                vectors = np.asarray(get_model().encode(issues, normalize_embeddings=True), dtype=np.float32)
+            index = build_index(vectors, TRAINING_INDEX_TYPE)
+            # Save and map back in one step, so another worker's save can't slip in between
+            with file_lock(TRAINING_LOCK_FILE):
+                save_exact_vectors(TRAINING_VECTORS_DIR, None if is_exact(index) else vectors)
+                exact = load_exact_vectors(TRAINING_VECTORS_DIR)
+            _corpus_cache.update(key=key, index=index, exact=exact)
+        return _corpus_cache["index"], _corpus_cache["exact"]
+
+def _search_issues(data, queries, top_k):
+    index, exact = _corpus_index([item["issue"] for item in data])
+    with track("embedding_encode"):
+        query_vectors = np.asarray(get_model().encode(list(queries), normalize_embeddings=True), dtype=np.float32)
+    with track("index_search"):
+        rows = search(index, query_vectors, top_k, exact)
+    return [[data[int(i)] for i in row] for row in rows]
+
+def training_data_version():
+    """Changes whenever training_data.json is written."""
+    if not TRAINING_FILE.exists():
+        return "none"
+    stat = TRAINING_FILE.stat()
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
 
 def load_training_data():
     if TRAINING_FILE.exists():
         return json.loads(TRAINING_FILE.read_text())
     return []
 
+@remote
 def find_similar_issues(query, top_k=3):
     data = load_training_data()
     if not data:
         return []
 
-    issues = [item["issue"] for item in data]
-    corpus_embeddings = model.encode(issues, convert_to_tensor=True)
-    query_embedding = model.encode(query, convert_to_tensor=True)
+    return _search_issues(data, [query], top_k)[0]
 
-    hits = util.semantic_search(query_embedding, corpus_embeddings, top_k=top_k)[0]
 
-    return [data[hit['corpus_id']] for hit in hits]
+@remote
+def find_similar_issues_batch(queries, top_k=3):
+    """Like find_similar_issues, but encodes all queries in one pass."""
+    data = load_training_data()
+    if not data:
+        return [[] for _ in queries]
 
+    return _search_issues(data, queries, top_k)
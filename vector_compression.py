@@ -0,0 +1,159 @@
+"""
+Vector Compression Module
+Compressed FAISS indexes for the log and training-issue embeddings.
+
+A float32 MiniLM vector takes 1.5KB. The compressed index types keep a much
+smaller code per vector in RAM:
+
+    flat    float32, exact (the default, 1536 bytes/vector)
+    fp16    float16 scalar quantization (768 bytes/vector)
+    int8    8-bit scalar quantization (384 bytes/vector)
+    ivfpq   inverted lists + product quantization (PQ_SUBVECTORS bytes/vector)
+
+Searches over a compressed index fetch RERANK_FACTOR times more candidates
+than needed. The final top-k is re-ranked against the exact float32 vectors,
+which stay on disk and are memory-mapped, so only the candidate rows are read.
+"""
+
+import math
+import os
+import tempfile
+from typing import List, Optional
+
+import numpy as np
+
+# Configuration
+INDEX_TYPES = ("flat", "fp16", "int8", "ivfpq")
+RERANK_FACTOR = int(os.getenv("RERANK_FACTOR", "5"))  # candidates fetched per final result
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))  # inverted lists visited per query
+PQ_SUBVECTORS = int(os.getenv("PQ_SUBVECTORS", "48"))  # code bytes per vector; must divide the dimension
+PQ_BITS = 8
+MIN_IVFPQ_VECTORS = 10000  # below this, PQ codebooks cannot be trained well; int8 is used instead
+EXACT_VECTORS_FILE = "exact_vectors.npy"
+
+_FACTORY = {"flat": "Flat", "fp16": "SQfp16", "int8": "SQ8"}
+
+
+def index_type(name: Optional[str]) -> str:
+    """Validate an index type name (e.g. from an environment variable)."""
+    name = (name or "flat").lower()
+    if name not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {name!r}, expected one of {INDEX_TYPES}")
+    return name
+
+
+def build_index(vectors: np.ndarray, kind: str = "flat"):
+    """
+    Build and fill a FAISS index of the given type.
+
+    Args:
+        vectors: float32 matrix of normalized embeddings, one row per item
+        kind: One of INDEX_TYPES
+
+    Returns:
+        A FAISS index whose ids are the row numbers of ``vectors``
+    """
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    kind = index_type(kind)
+
+    if kind == "ivfpq" and (n < MIN_IVFPQ_VECTORS or dim % PQ_SUBVECTORS):
+        print(f"[WARNING] IVF-PQ needs at least {MIN_IVFPQ_VECTORS} vectors and a dimension divisible "
+              f"by {PQ_SUBVECTORS}; using int8 for {n} vectors")
+        kind = "int8"
+
+    if kind == "ivfpq":
+        nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))
+        factory = f"IVF{nlist},PQ{PQ_SUBVECTORS}x{PQ_BITS}"
+    else:
+        factory = _FACTORY[kind]
+    index = faiss.index_factory(dim, factory, faiss.METRIC_L2)
+
+    if not index.is_trained:
+        # A sample is enough to train the quantizers
+        sample = vectors
+        if n > 256 * 1024:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(n, 256 * 1024, replace=False)]
+        index.train(sample)
+    index.add(vectors)
+    set_search_params(index)
+    return index
+
+
+def set_search_params(index):
+    """Apply IVF_NPROBE to IVF indexes (it is not restored when an index is loaded)."""
+    import faiss
+
+    try:
+        faiss.extract_index_ivf(index).nprobe = IVF_NPROBE
+    except RuntimeError:
+        pass  # not an IVF index
+
+
+def is_exact(index) -> bool:
+    import faiss
+
+    return isinstance(index, faiss.IndexFlat)
+
+
+def save_exact_vectors(directory: str, vectors: Optional[np.ndarray]):
+    """Store the float32 vectors used for re-ranking, or remove stale ones when ``vectors`` is None."""
+    path = os.path.join(directory, EXACT_VECTORS_FILE)
+    if vectors is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    os.makedirs(directory, exist_ok=True)
+    # Unique temp name, then an atomic rename: several workers may save at once, and
+    # readers that memory-mapped the previous file keep reading it intact
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{EXACT_VECTORS_FILE}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.asarray(vectors, dtype=np.float32))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_exact_vectors(directory: str) -> Optional[np.ndarray]:
+    """Memory-map the re-ranking vectors saved next to an index, if there are any."""
+    path = os.path.join(directory, EXACT_VECTORS_FILE)
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode="r")
+
+
+def search(index, query_vectors: np.ndarray, k: int, exact: Optional[np.ndarray] = None) -> List[np.ndarray]:
+    """
+    Top-k row ids per query, re-ranked against ``exact`` when it is given.
+
+    Returns:
+        One array of ids per query, best first
+    """
+    query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+    k = min(k, index.ntotal)
+    if k <= 0:
+        return [np.empty(0, dtype=np.int64) for _ in query_vectors]
+
+    fetch = k if exact is None else min(k * RERANK_FACTOR, index.ntotal)
+    _, ids = index.search(query_vectors, fetch)
+    if exact is None:
+        return [row[row != -1] for row in ids]
+    return rerank(query_vectors, ids, exact, k)
+
+
+def rerank(query_vectors: np.ndarray, candidate_ids: np.ndarray, exact: np.ndarray, k: int) -> List[np.ndarray]:
+    """Order candidates by their exact inner product with the query and keep the best k."""
+    results = []
+    for query, ids in zip(query_vectors, candidate_ids):
+        ids = np.unique(ids[ids != -1])  # sorted, so memory-mapped reads are sequential
+        if len(ids) == 0:
+            results.append(ids)
+            continue
+        scores = np.asarray(exact[ids], dtype=np.float32) @ query
+        results.append(ids[np.argsort(-scores)[:k]])
+    return results
@@ -0,0 +1,175 @@
+"""
+Weather Client Module
+Weather lookups for the ``get_weather`` tool through one long-lived client:
+
+- the python_weather HTTP session is kept open and reused across lookups,
+- reports are cached per city for ``WEATHER_CACHE_TTL`` seconds (LRU-bounded),
+- concurrent lookups for the same city share one in-flight fetch.
+
+``WEATHER_BACKEND=stub`` serves deterministic made-up reports without network
+access, for tests and benchmarks.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from metrics import record_cache, track
+
+# Configuration
+WEATHER_BACKEND = os.getenv("WEATHER_BACKEND", "python_weather")  # python_weather or stub
+CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", "600"))  # seconds
+CACHE_SIZE = int(os.getenv("WEATHER_CACHE_SIZE", "256"))  # cities
+STUB_LATENCY = float(os.getenv("WEATHER_STUB_LATENCY", "0"))  # seconds per stub fetch
+
+
+class WeatherReport(NamedTuple):
+    temperature: float
+    description: str
+    humidity: float
+    wind_speed: float
+
+
+class PythonWeatherBackend:
+    """python_weather with one client session per event loop."""
+
+    def __init__(self):
+        self._client = None
+
+    async def fetch(self, city: str) -> WeatherReport:
+        if self._client is None:
+            import python_weather
+            self._client = python_weather.Client(unit=python_weather.METRIC)
+        weather = await self._client.get(city)
+        return WeatherReport(weather.temperature, weather.description, weather.humidity, weather.wind_speed)
+
+    async def close(self):
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.close()
+
+
+class StubWeatherBackend:
+    """Deterministic reports derived from the city name, no network access."""
+
+    DESCRIPTIONS = ("Sunny", "Partly cloudy", "Cloudy", "Light rain", "Clear")
+
+    def __init__(self, latency: float = STUB_LATENCY):
+        self.latency = latency
+        self.fetches = 0
+
+    async def fetch(self, city: str) -> WeatherReport:
+        self.fetches += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        seed = int(hashlib.sha256(city.lower().encode("utf-8")).hexdigest(), 16)
+        return WeatherReport(
+            temperature=seed % 35,
+            description=self.DESCRIPTIONS[seed % len(self.DESCRIPTIONS)],
+            humidity=40 + seed % 50,
+            wind_speed=seed % 30,
+        )
+
+    async def close(self):
+        pass
+
+
+BACKENDS = {"python_weather": PythonWeatherBackend, "stub": StubWeatherBackend}
+
+
+class WeatherService:
+    """Cached, coalescing weather lookups over one backend."""
+
+    def __init__(self, backend_factory=None, ttl: int = CACHE_TTL, max_entries: int = CACHE_SIZE):
+        if backend_factory is None:
+            if WEATHER_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown weather backend {WEATHER_BACKEND!r}, expected one of {list(BACKENDS)}")
+            backend_factory = BACKENDS[WEATHER_BACKEND]
+        self.backend_factory = backend_factory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache = OrderedDict()  # city key -> (expires at, report)
+        self._backend = None
+        self._loop = None
+        self._in_flight = {}  # city key -> task, on self._loop
+
+    async def _bind_loop(self):
+        # Sessions and tasks belong to one event loop; the CLI entry point runs a new loop per
+        # query, so start over there (the cache itself is loop independent)
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        old_backend, old_loop = self._backend, self._loop
+        self._loop = loop
+        self._backend = self.backend_factory()
+        self._in_flight = {}
+        if old_backend is not None:
+            await self._close_backend(old_backend, old_loop)
+
+    @staticmethod
+    async def _close_backend(backend, loop):
+        """Close a backend bound to another event loop, so its session doesn't leak."""
+        try:
+            if loop is not None and loop.is_running():
+                # Still serving in another thread: close it there
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(backend.close(), loop))
+            else:
+                await backend.close()
+        except Exception as e:
+            print(f"[WARNING] Could not close the previous weather session: {e}")
+
+    async def get(self, city: str) -> WeatherReport:
+        """
+        Current weather for ``city``.
+
+        Raises:
+            Whatever the backend raises; failed lookups are not cached
+        """
+        key = " ".join(city.lower().split())
+        cached = self._cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            record_cache("weather", True)
+            return cached[1]
+        record_cache("weather", False)
+
+        await self._bind_loop()
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, city, self._backend))
+            self._in_flight[key] = task
+        # shield: one caller being cancelled must not cancel the fetch the others wait for
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str, city: str, backend) -> WeatherReport:
+        try:
+            with track("weather_fetch"):
+                report = await backend.fetch(city)
+            self._cache[key] = (time.monotonic() + self.ttl, report)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            return report
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def close(self):
+        """Close the backend session (on application shutdown)."""
+        if self._backend is not None and self._loop is asyncio.get_running_loop():
+            await self._backend.close()
+        self._backend = None
+        self._loop = None
+
+
+_default_service = None
+
+
+def get_weather_service() -> WeatherService:
+    """Return the process-wide weather service, creating it on first use."""
+    global _default_service
+    if _default_service is None:
+        _default_service = WeatherService()
+    return _default_service